@@ -0,0 +1,82 @@
+import os
+
+from django.conf import settings
+from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html
+
+from .models import QueuedEmail, RequestProfile, Task
+from .profiler import QUERY_PARAM, profile_token
+
+
+@admin.register(QueuedEmail)
+class QueuedEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'status', 'attempts',
+                    'next_attempt', 'sent',)
+    list_filter = ('status',)
+    search_fields = ('recipients', 'subject')
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'priority', 'status', 'attempts', 'run_at',
+                    'created', 'last_error',)
+    list_filter = ('status', 'priority')
+    search_fields = ('name',)
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        updated = queryset.update(
+            status=Task.STATUS_QUEUED, attempts=0, run_at=timezone.now())
+        self.message_user(request, f'Задач возвращено в очередь: {updated}')
+    retry.short_description = 'Запустить заново'
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created', 'path', 'view_name', 'user', 'status_code',
+                    'duration_ms', 'query_count', 'query_time_ms', 'files',)
+    list_filter = ('view_name',)
+    search_fields = ('path',)
+    list_select_related = ('user',)
+    change_list_template = 'admin/core/requestprofile/change_list.html'
+
+    def has_add_permission(self, request):
+        return False
+
+    def files(self, obj):
+        return format_html(
+            '<a href="{}">флеймграф</a> / <a href="{}">.prof</a>',
+            reverse('admin:core_requestprofile_file', args=(obj.pk, 'html')),
+            reverse('admin:core_requestprofile_file', args=(obj.pk, 'prof')),
+        )
+    files.short_description = 'Результаты'
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/<str:kind>/',
+                 self.admin_site.admin_view(self.file_view),
+                 name='core_requestprofile_file'),
+        ] + super().get_urls()
+
+    def file_view(self, request, pk, kind):
+        if kind not in ('html', 'prof'):
+            raise Http404
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        filename = os.path.join(
+            settings.PROFILES_DIR, f'{profile.name}.{kind}')
+        if not os.path.exists(filename):
+            raise Http404
+        return FileResponse(
+            open(filename, 'rb'), as_attachment=kind == 'prof',
+            content_type='text/html' if kind == 'html' else None)
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {
+            **(extra_context or {}),
+            'profile_param': f'{QUERY_PARAM}={profile_token()}',
+        }
+        return super().changelist_view(request, extra_context)
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import tasks  # noqa: F401
+        from .slowlog import install
+        from .sqlite import configure_connection
+        connection_created.connect(configure_connection)
+        connection_created.connect(install)
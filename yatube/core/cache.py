@@ -0,0 +1,271 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .metrics import registry
+
+MISSING = object()
+
+# PRAGMA соединений кэша: данные можно потерять при сбое питания,
+# но не целостность файла
+CACHE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+}
+# сколько ключей подставлять в один запрос IN (...)
+KEYS_PER_QUERY = 500
+# UPDATE ... RETURNING появился в SQLite 3.35
+HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35)
+
+
+class MetricsCacheMixin:
+    """Считает попадания и промахи кэша.
+
+    Имя кэша для меток задаётся в OPTIONS['ALIAS'].
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        params = args[-1] if args else kwargs['params']
+        self.alias = params.get('OPTIONS', {}).get('ALIAS', 'default')
+
+    def record(self, hits, misses):
+        if hits:
+            registry.inc('cache_requests_total', (self.alias, 'hit'), hits)
+        if misses:
+            registry.inc(
+                'cache_requests_total', (self.alias, 'miss'), misses)
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, MISSING, version)
+        if value is MISSING:
+            self.record(0, 1)
+            return default
+        self.record(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        self.record(len(found), len(set(keys)) - len(found))
+        return found
+
+
+class LocMemMetricsCache(MetricsCacheMixin, LocMemCache):
+    pass
+
+
+def dump(value):
+    """Целые числа хранятся как есть, чтобы incr шёл одним UPDATE."""
+    if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def load(value):
+    if isinstance(value, int):
+        return value
+    return pickle.loads(value)
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite, общий для всех процессов на одном хосте.
+
+    LOCATION — путь к файлу. В режиме WAL читатели не ждут писателей,
+    а запись идёт короткими транзакциями. Просроченные записи
+    пропускаются при чтении и удаляются при отсечении: когда записей
+    больше MAX_ENTRIES, удаляется 1/CULL_FREQUENCY с ближайшим сроком.
+    Число записей считается не на каждую запись, а раз в CULL_EVERY
+    записей процесса, поэтому между проверками предел может быть
+    превышен на столько же записей каждого воркера.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self.local = threading.local()
+        options = params.get('OPTIONS', {})
+        self.cull_every = int(options.get('CULL_EVERY', 100))
+        self.writes = 0
+
+    @property
+    def db(self):
+        # после fork соединение родителя использовать нельзя
+        if getattr(self.local, 'pid', None) != os.getpid():
+            self.local.pid = os.getpid()
+            self.local.db = self.connect()
+        return self.local.db
+
+    def connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        for name, value in CACHE_PRAGMAS.items():
+            db.execute(f'PRAGMA {name} = {value}')
+        db.execute('CREATE TABLE IF NOT EXISTS cache ('
+                   'key TEXT PRIMARY KEY, value BLOB, expires REAL'
+                   ') WITHOUT ROWID')
+        db.execute('CREATE INDEX IF NOT EXISTS cache_expires '
+                   'ON cache (expires)')
+        return db
+
+    @contextmanager
+    def write(self):
+        """Транзакция записи: BEGIN IMMEDIATE сразу берёт блокировку."""
+        db = self.db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        row = self.db.execute(
+            'SELECT value FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time())).fetchone()
+        return default if row is None else load(row[0])
+
+    def get_many(self, keys, version=None):
+        made = {}
+        for key in keys:
+            made[self.make_key(key, version)] = key
+        for key in made:
+            self.validate_key(key)
+        found = {}
+        names = list(made)
+        now = time.time()
+        for start in range(0, len(names), KEYS_PER_QUERY):
+            chunk = names[start:start + KEYS_PER_QUERY]
+            rows = self.db.execute(
+                f'SELECT key, value FROM cache '
+                f'WHERE key IN ({", ".join("?" * len(chunk))}) '
+                f'AND (expires IS NULL OR expires > ?)', (*chunk, now))
+            for key, value in rows:
+                found[made[key]] = load(value)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        rows = []
+        expires = self.get_backend_timeout(timeout)
+        for key, value in data.items():
+            key = self.make_key(key, version)
+            self.validate_key(key)
+            rows.append((key, dump(value), expires))
+        with self.write() as db:
+            db.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)', rows)
+            self.cull(db)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        with self.write() as db:
+            db.execute('DELETE FROM cache WHERE key = ? AND expires <= ?',
+                       (key, time.time()))
+            added = db.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                (key, dump(value), self.get_backend_timeout(timeout))).rowcount
+            if added:
+                self.cull(db)
+        return bool(added)
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарно увеличивает целое значение; срок жизни не меняется.
+
+        С SQLite 3.35+ это один UPDATE ... RETURNING, в старых версиях —
+        UPDATE и SELECT в той же транзакции записи.
+        """
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        update = ('UPDATE cache SET value = value + ? WHERE key = ? '
+                  "AND typeof(value) = 'integer' "
+                  'AND (expires IS NULL OR expires > ?)')
+        params = (delta, key, time.time())
+        with self.write() as db:
+            if HAS_RETURNING:
+                rows = db.execute(f'{update} RETURNING value',
+                                  params).fetchall()
+            elif db.execute(update, params).rowcount:
+                rows = db.execute('SELECT value FROM cache WHERE key = ?',
+                                  (key,)).fetchall()
+            else:
+                rows = []
+        if not rows:
+            raise ValueError(f"Key '{key}' not found")
+        return rows[0][0]
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        expires = self.get_backend_timeout(timeout)
+        with self.write() as db:
+            return bool(db.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (expires, key, time.time())).rowcount)
+
+    def has_key(self, key, version=None):
+        return self.get(key, MISSING, version) is not MISSING
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        names = []
+        for key in keys:
+            names.append(self.make_key(key, version))
+            self.validate_key(names[-1])
+        with self.write() as db:
+            db.executemany('DELETE FROM cache WHERE key = ?',
+                           [(key,) for key in names])
+
+    def clear(self):
+        with self.write() as db:
+            db.execute('DELETE FROM cache')
+
+    def cull(self, db):
+        # COUNT(*) обходит всю таблицу, поэтому не на каждую запись
+        self.writes += 1
+        if self.writes % self.cull_every:
+            return
+        count = db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        db.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        count = db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            db.execute('DELETE FROM cache')
+            return
+        db.execute(
+            'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+            'ORDER BY expires IS NULL, expires LIMIT ?)',
+            (count // self._cull_frequency,))
+
+    def close(self, **kwargs):
+        # соединение живёт всё время процесса, как LocMemCache
+        pass
+
+
+class SQLiteMetricsCache(MetricsCacheMixin, SQLiteCache):
+    pass
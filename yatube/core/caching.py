@@ -0,0 +1,130 @@
+import functools
+import hashlib
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .tags import tag_versions
+
+ENTRY_KEY = 'cached:{}:{}'
+LOCK_KEY = 'lock:{}'
+MISSING = object()
+# методы, ответы на которые можно кэшировать
+CACHEABLE_METHODS = ('GET', 'HEAD')
+
+
+def entry_key(name, vary=()):
+    digest = hashlib.md5(
+        ':'.join(str(part) for part in vary).encode()).hexdigest()
+    return ENTRY_KEY.format(name, digest)
+
+
+def is_fresh(entry):
+    """Не пора ли пересчитать значение (XFetch).
+
+    Чем дольше пересчёт и чем ближе срок, тем вероятнее обновление до
+    него: ключи с одинаковым сроком обновляются в разное время, а не
+    все разом.
+    """
+    expires, delta, versions = entry[1:]
+    early = -delta * settings.CACHE_EARLY_REFRESH_BETA * math.log(
+        random.random() or 1e-12)
+    if time.time() + early >= expires:
+        return False
+    return not versions or tag_versions(versions) == versions
+
+
+def wait_for(key):
+    """Ждёт значение, которое считает другой запрос."""
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(settings.CACHE_LOCK_POLL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    return MISSING
+
+
+def get_or_compute(key, compute, timeout, tags=(), cacheable=None):
+    """Значение из кэша или результат compute().
+
+    Пересчитывает только один запрос на ключ: он берёт блокировку в
+    кэше, остальные получают прежнее значение, пока оно не пересчитано,
+    а без него ждут до CACHE_LOCK_WAIT сек. Значение хранится ещё
+    CACHE_STALE_TIMEOUT сек после срока, чтобы было что отдать.
+
+    Значение устаревает и при смене версии одного из tags. Теги,
+    добавленные в tags во время compute (например, в request.cache_tags),
+    тоже учитываются. cacheable(value) решает, сохранять ли результат.
+
+    Без SHARED_CACHE версии тегов у каждого процесса свои и сброс в
+    одном воркере не виден другим, поэтому значение просто считается.
+    """
+    if not settings.SHARED_CACHE:
+        return compute()
+    entry = cache.get(key)
+    if entry is not None and is_fresh(entry):
+        return entry[0]
+    lock = LOCK_KEY.format(key)
+    locked = cache.add(lock, 1, settings.CACHE_LOCK_TIMEOUT)
+    if not locked:
+        if entry is not None:
+            return entry[0]
+        value = wait_for(key)
+        if value is not MISSING:
+            return value
+    try:
+        versions = tag_versions(tags)
+        start = time.perf_counter()
+        value = compute()
+        delta = time.perf_counter() - start
+        versions.update(tag_versions(set(tags) - set(versions)))
+        if cacheable is None or cacheable(value):
+            cache.set(key, (value, time.time() + timeout, delta, versions),
+                      timeout + settings.CACHE_STALE_TIMEOUT)
+        return value
+    finally:
+        if locked:
+            cache.delete(lock)
+
+
+def add_tags(request, *tags):
+    """Добавляет зависимости ответа, известные только внутри view.
+
+    Их версии читаются после загрузки данных, поэтому изменение в этом
+    промежутке может продержаться в кэше до истечения timeout.
+    """
+    if hasattr(request, 'cache_tags'):
+        request.cache_tags.update(tags)
+
+
+def is_cacheable(response):
+    return (response.status_code == 200 and not response.streaming
+            and not response.cookies)
+
+
+def cache_tagged(timeout, tags=None):
+    """Кэширует ответ view до изменения его тегов.
+
+    tags(request, *args, **kwargs) возвращает зависимости, известные до
+    вызова view, остальные view добавляет через add_tags. Ключ зависит
+    только от адреса, поэтому декоратор подходит для ответов, одинаковых
+    для всех пользователей.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in CACHEABLE_METHODS:
+                return view(request, *args, **kwargs)
+            request.cache_tags = set(
+                tags(request, *args, **kwargs) if tags else ())
+            return get_or_compute(
+                entry_key(f'{view.__module__}.{view.__name__}',
+                          [request.get_full_path()]),
+                lambda: view(request, *args, **kwargs),
+                timeout, request.cache_tags, is_cacheable)
+        return wrapper
+    return decorator
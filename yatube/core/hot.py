@@ -0,0 +1,101 @@
+import re
+import threading
+from collections import Counter
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import QueryDict
+from django.urls import Resolver404, resolve
+
+HOT_KEY = 'hot_urls'
+# заголовок X-Warmup запросов прогрева в request.META: их
+# HotUrlMiddleware не считает
+WARMUP_HEADER = 'HTTP_X_WARMUP'
+# запрос в логе доступа: "GET /path HTTP/1.1" 200
+LOG_LINE = re.compile(r'"GET (?P<path>\S+) HTTP/[\d.]+" (?P<status>\d{3})')
+
+
+def page_path(path, page):
+    """Адрес страницы ленты: из параметров остаётся только page."""
+    if page and page.isdigit() and page != '1':
+        return f"{path}?{urlencode({'page': page})}"
+    return path
+
+
+def normalize(path):
+    """Адрес страницы для прогрева или None.
+
+    Из параметров остаётся только page, чтобы метки рекламы и прочий
+    шум не дробили счётчики.
+    """
+    parts = urlsplit(path)
+    try:
+        match = resolve(parts.path)
+    except Resolver404:
+        return None
+    if match.view_name not in settings.WARM_CACHE_VIEWS:
+        return None
+    return page_path(parts.path, QueryDict(parts.query).get('page'))
+
+
+def count_paths(paths):
+    counter = Counter()
+    for path in paths:
+        path = normalize(path)
+        if path is not None:
+            counter[path] += 1
+    return counter
+
+
+def parse_access_log(lines):
+    """Счётчик успешных GET-запросов страниц из лога доступа.
+
+    Подходит формат common/combined, в том числе лог gunicorn.
+    """
+    return count_paths(
+        match['path'] for match in map(LOG_LINE.search, lines)
+        if match and match['status'] == '200')
+
+
+def hot_urls():
+    """Самые посещаемые страницы по счётчику HotUrlMiddleware."""
+    return Counter(cache.get(HOT_KEY, {}))
+
+
+class HotUrlMiddleware:
+    """Считает успешные GET-запросы страниц из WARM_CACHE_VIEWS.
+
+    View берётся из request.resolver_match, повторно адрес не
+    разбирается. Запросы прогрева с заголовком WARMUP_HEADER не
+    считаются, иначе warm_cache сам поддерживал бы свой топ.
+
+    Счётчик копится в процессе и раз в HOT_URLS_FLUSH_EVERY запросов
+    складывается в общий кэш. Слияние не атомарно, поэтому при гонке
+    воркеров часть счётчиков теряется: для выбора горячих страниц этого
+    достаточно.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.counter = Counter()
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        if (request.method == 'GET' and response.status_code == 200
+                and match and match.view_name in settings.WARM_CACHE_VIEWS
+                and not request.META.get(WARMUP_HEADER)):
+            self.count(page_path(request.path, request.GET.get('page')))
+        return response
+
+    def count(self, path):
+        with self.lock:
+            self.counter[path] += 1
+            if sum(self.counter.values()) < settings.HOT_URLS_FLUSH_EVERY:
+                return
+            counter, self.counter = self.counter, Counter()
+        counter.update(hot_urls())
+        cache.set(HOT_KEY, dict(counter.most_common(settings.HOT_URLS_KEEP)),
+                  settings.HOT_URLS_TIMEOUT)
@@ -0,0 +1,192 @@
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+
+from .models import QueuedEmail, Task
+from .tasks import task
+
+# поля письма, которые меняет попытка отправки
+ATTEMPT_FIELDS = ('attempts', 'status', 'next_attempt', 'last_error', 'sent')
+
+
+def serialize_attachment(attachment):
+    """Вложение (имя, содержимое, тип) в виде, пригодном для JSON."""
+    if not isinstance(attachment, tuple):
+        raise ValueError(
+            'Очередь писем принимает вложения только как '
+            '(имя, содержимое, тип), а не MIME-объекты')
+    filename, content, mimetype = attachment
+    binary = isinstance(content, bytes)
+    return {
+        'filename': filename,
+        'content': base64.b64encode(
+            content if binary else content.encode()).decode(),
+        'mimetype': mimetype,
+        'binary': binary,
+    }
+
+
+def deserialize_attachment(data):
+    content = base64.b64decode(data['content'])
+    return (data['filename'],
+            content if data['binary'] else content.decode(),
+            data['mimetype'])
+
+
+def serialize_message(message):
+    """Переводит письмо в JSON для хранения в очереди.
+
+    ValueError, если вложение нельзя сохранить.
+    """
+    return json.dumps({
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+        'attachments': [serialize_attachment(attachment)
+                        for attachment in message.attachments],
+    })
+
+
+def deserialize_message(payload):
+    """Собирает письмо обратно из JSON."""
+    data = json.loads(payload)
+    alternatives = data.pop('alternatives')
+    attachments = data.pop('attachments', [])
+    return EmailMultiAlternatives(
+        alternatives=[tuple(item) for item in alternatives],
+        attachments=[deserialize_attachment(item) for item in attachments],
+        **data
+    )
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Сохраняет письма в очередь и сразу возвращает управление.
+
+    Доставкой занимается задача ``deliver_mail`` в воркерах
+    ``run_workers`` или команда ``send_queued_mail``.
+    """
+
+    def send_messages(self, email_messages):
+        now = timezone.now()
+        queued = [
+            QueuedEmail(
+                subject=message.subject[:255],
+                from_email=message.from_email,
+                recipients=', '.join(message.recipients()),
+                payload=serialize_message(message),
+                next_attempt=now,
+            )
+            for message in email_messages
+            if message.recipients()
+        ]
+        QueuedEmail.objects.bulk_create(queued)
+        if queued:
+            deliver_mail.schedule(unique=True)
+        return len(queued)
+
+
+def retry_delay(attempts):
+    """Экспоненциальная задержка перед следующей попыткой."""
+    delay = settings.QUEUED_EMAIL_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.QUEUED_EMAIL_MAX_DELAY))
+
+
+def claim(email):
+    """Арендует письмо, чтобы его не взял параллельный воркер.
+
+    Если воркер упадёт, письмо вернётся в работу по истечении аренды.
+    Аренда отсчитывается от захвата письма: долгая пачка не должна
+    отдавать другим воркерам письма, которые ещё отправляются.
+    """
+    lease = timezone.now() + timedelta(seconds=settings.QUEUED_EMAIL_LEASE)
+    return QueuedEmail.objects.filter(
+        pk=email.pk,
+        status=QueuedEmail.STATUS_QUEUED,
+        next_attempt=email.next_attempt,
+    ).update(next_attempt=lease) == 1
+
+
+def postpone(email, error):
+    """Записывает неудачную попытку: письмо ждёт следующей или брошено."""
+    email.last_error = f'{type(error).__name__}: {error}'
+    if email.attempts >= settings.QUEUED_EMAIL_MAX_ATTEMPTS:
+        email.status = QueuedEmail.STATUS_FAILED
+    else:
+        email.next_attempt = timezone.now() + retry_delay(email.attempts)
+
+
+def reopen(connection):
+    """(Пере)открывает соединение; ошибку возвращает, а не бросает."""
+    try:
+        connection.close()
+        connection.open()
+    except Exception as error:
+        return error
+    return None
+
+
+def deliver_queued(batch_size=None):
+    """Отправляет пачку писем из очереди через одно соединение.
+
+    Если почтовый сервер недоступен, письма пачки откладываются как
+    неудачная попытка, и пачка заканчивается без исключения. Возвращает
+    пару (отправлено, ошибок).
+    """
+    batch_size = batch_size or settings.QUEUED_EMAIL_BATCH_SIZE
+    batch = list(QueuedEmail.objects.filter(
+        status=QueuedEmail.STATUS_QUEUED,
+        next_attempt__lte=timezone.now(),
+    )[:batch_size])
+    if not batch:
+        return 0, 0
+    sent = failed = 0
+    connection = get_connection(
+        settings.QUEUED_EMAIL_DELIVERY_BACKEND, fail_silently=False)
+    # ошибка открытия соединения: остальные письма пачки откладываются
+    error = reopen(connection)
+    try:
+        for email in batch:
+            if not claim(email):
+                continue
+            email.attempts += 1
+            if error is not None:
+                failed += 1
+                postpone(email, error)
+                email.save(update_fields=ATTEMPT_FIELDS)
+                continue
+            try:
+                connection.send_messages(
+                    [deserialize_message(email.payload)])
+            except Exception as send_error:
+                failed += 1
+                postpone(email, send_error)
+                email.save(update_fields=ATTEMPT_FIELDS)
+                # соединение могло оборваться вместе с письмом
+                error = reopen(connection)
+                continue
+            sent += 1
+            email.status = QueuedEmail.STATUS_SENT
+            email.sent = timezone.now()
+            email.last_error = ''
+            email.save(update_fields=ATTEMPT_FIELDS)
+    finally:
+        connection.close()
+    return sent, failed
+
+
+@task(priority=Task.PRIORITY_HIGH)
+def deliver_mail():
+    """Разбирает очередь писем, пока в ней есть готовые к отправке."""
+    while any(deliver_queued()):
+        pass
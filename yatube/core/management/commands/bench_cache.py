@@ -0,0 +1,110 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+# бэкенды для сравнения: (название, класс, нужен ли файл или каталог)
+BACKENDS = (
+    ('LocMemCache',
+     'django.core.cache.backends.locmem.LocMemCache', None),
+    ('FileBasedCache',
+     'django.core.cache.backends.filebased.FileBasedCache', 'files'),
+    ('SQLiteCache', 'core.cache.SQLiteCache', 'cache.sqlite3'),
+)
+
+
+def make_cache(path, location, keys):
+    return import_string(path)(location, {
+        'TIMEOUT': 300, 'OPTIONS': {'MAX_ENTRIES': keys * 2}})
+
+
+def fill(path, location, keys):
+    make_cache(path, location, keys).set_many(
+        {f'key:{index}': {'value': index} for index in range(keys)})
+
+
+def worker(path, location, keys, rounds, start, results):
+    """Операции одного процесса; доля попаданий — по чужим ключам."""
+    cache = make_cache(path, location, keys)
+    names = [f'key:{index}' for index in range(keys)]
+    start.wait()
+    timings = {}
+    began = time.perf_counter()
+    hits = 0
+    for _ in range(rounds):
+        for name in names:
+            hits += cache.get(name) is not None
+    timings['get'] = time.perf_counter() - began
+    began = time.perf_counter()
+    for _ in range(rounds):
+        for index in range(0, keys, 20):
+            cache.get_many(names[index:index + 20])
+    timings['get_many'] = time.perf_counter() - began
+    began = time.perf_counter()
+    for _ in range(rounds):
+        cache.set_many({name: {'value': name} for name in names[:100]})
+    timings['set_many'] = time.perf_counter() - began
+    cache.add('counter', 0)
+    began = time.perf_counter()
+    for _ in range(rounds * 10):
+        cache.incr('counter')
+    timings['incr'] = time.perf_counter() - began
+    results.put((timings, hits / (keys * rounds)))
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает SQLiteCache с LocMemCache и FileBasedCache '
+            'при одновременной работе нескольких процессов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--keys', type=int, default=1000)
+        parser.add_argument('--rounds', type=int, default=5)
+
+    def run_backend(self, directory, path, filename, options):
+        location = os.path.join(directory, filename) if filename else ''
+        keys, rounds = options['keys'], options['rounds']
+        # ключи пишет отдельный процесс: их увидят только в общем кэше
+        filler = multiprocessing.Process(
+            target=fill, args=(path, location, keys))
+        filler.start()
+        filler.join()
+        start = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(
+                path, location, keys, rounds, start, results))
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        start.set()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        return collected
+
+    def rate(self, collected, kind, count):
+        """Операций в секунду всеми процессами вместе."""
+        slowest = max(timings[kind] for timings, _ in collected)
+        return count * len(collected) / slowest
+
+    def handle(self, *args, **options):
+        rounds, keys = options['rounds'], options['keys']
+        # число операций каждого вида в одном процессе
+        counts = {'get': rounds * keys, 'get_many': rounds * keys,
+                  'set_many': rounds * 100, 'incr': rounds * 10}
+        with tempfile.TemporaryDirectory() as directory:
+            for title, path, filename in BACKENDS:
+                collected = self.run_backend(
+                    directory, path, filename, options)
+                rates = ', '.join(
+                    f'{kind} {self.rate(collected, kind, count):.0f}/с'
+                    for kind, count in counts.items())
+                ratio = sum(hit for _, hit in collected) / len(collected)
+                self.stdout.write(
+                    f'{title}: {rates}, попаданий в чужие ключи '
+                    f'{ratio:.0%}')
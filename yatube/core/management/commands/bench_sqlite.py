@@ -0,0 +1,117 @@
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sqlite import WriteLock
+
+# режимы замера: (название, PRAGMA, общая блокировка записи)
+MODES = (
+    ('rollback journal', {'journal_mode': 'DELETE'}, False),
+    ('WAL + PRAGMA + блокировка записи', None, True),
+)
+
+
+def connect(path, pragmas):
+    db = sqlite3.connect(path, timeout=5, isolation_level=None)
+    for name, value in pragmas.items():
+        db.execute(f'PRAGMA {name} = {value}')
+    return db
+
+
+def reader(path, pragmas, seconds, results):
+    db = connect(path, pragmas)
+    done = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            db.execute(
+                'SELECT id, text FROM post ORDER BY id DESC LIMIT 10'
+            ).fetchall()
+            db.execute('SELECT COUNT(*) FROM post').fetchone()
+            done += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    results.put(('read', done, errors))
+
+
+def writer(path, pragmas, lock_path, seconds, results):
+    """Транзакция как у Django: сначала чтение, затем запись."""
+    db = connect(path, pragmas)
+    done = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            with WriteLock(lock_path) if lock_path else nullcontext():
+                db.execute('BEGIN')
+                db.execute('SELECT COUNT(*) FROM post').fetchone()
+                db.execute("INSERT INTO post (text) VALUES ('комментарий')")
+                db.execute('COMMIT')
+            done += 1
+        except sqlite3.OperationalError:
+            if db.in_transaction:
+                db.execute('ROLLBACK')
+            errors += 1
+    results.put(('write', done, errors))
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает одновременные чтение и запись в SQLite в режиме '
+            'по умолчанию и с настройками SQLITE_PRAGMAS')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument(
+            '--seconds', type=float, default=3,
+            help='Длительность замера каждого режима')
+
+    def run_mode(self, directory, index, pragmas, locked, options):
+        path = os.path.join(directory, f'bench-{index}.sqlite3')
+        db = connect(path, pragmas)
+        db.execute('CREATE TABLE post '
+                   '(id INTEGER PRIMARY KEY AUTOINCREMENT, text TEXT)')
+        db.executemany('INSERT INTO post (text) VALUES (?)',
+                       [('пост',)] * 1000)
+        db.close()
+        lock_path = os.path.join(directory, 'write.lock') if locked else None
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=reader, args=(
+                path, pragmas, options['seconds'], results))
+            for _ in range(options['readers'])
+        ] + [
+            multiprocessing.Process(target=writer, args=(
+                path, pragmas, lock_path, options['seconds'], results))
+            for _ in range(options['writers'])
+        ]
+        for process in processes:
+            process.start()
+        totals = {'read': [0, 0], 'write': [0, 0]}
+        for _ in processes:
+            kind, done, errors = results.get()
+            totals[kind][0] += done
+            totals[kind][1] += errors
+        for process in processes:
+            process.join()
+        return totals
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            for index, (title, pragmas, locked) in enumerate(MODES):
+                totals = self.run_mode(
+                    directory, index,
+                    pragmas if pragmas is not None
+                    else settings.SQLITE_PRAGMAS,
+                    locked, options)
+                seconds = options['seconds']
+                self.stdout.write(
+                    f"{title}: чтений {totals['read'][0] / seconds:.0f}/с, "
+                    f"записей {totals['write'][0] / seconds:.0f}/с, "
+                    f"ошибок database is locked: "
+                    f"{totals['read'][1] + totals['write'][1]}")
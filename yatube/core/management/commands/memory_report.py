@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from core.memory import tracker
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет страницы через приложение с tracemalloc и '
+            'показывает память по URL и растущие места выделения')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*', default=['/'],
+            help='Адреса страниц, по умолчанию главная')
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Сколько раз запросить каждую страницу')
+        parser.add_argument(
+            '--user', default=None,
+            help='Имя пользователя, от которого делать запросы')
+
+    def handle(self, *args, **options):
+        client = Client()
+        if options['user']:
+            user = get_user_model().objects.filter(
+                username=options['user']).first()
+            if user is None:
+                raise CommandError(
+                    f"Пользователь {options['user']} не найден")
+            client.force_login(user)
+        interval = max(options['requests'] * len(options['paths']) // 5, 1)
+        with override_settings(MEMORY_TRACKING=True,
+                               MEMORY_SNAPSHOT_INTERVAL=interval):
+            tracker.start()
+            tracker.reset()
+            # прогрев: кэши шаблонов и URL не должны считаться утечкой
+            for path in options['paths']:
+                client.get(path)
+            tracker.reset()
+            tracker.snapshot()
+            for _ in range(options['requests']):
+                for path in options['paths']:
+                    client.get(path)
+            tracker.snapshot()
+        self.stdout.write(tracker.report())
@@ -0,0 +1,89 @@
+import multiprocessing
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.tasks import LANES, work
+
+
+def worker_loop(priorities, batch_size, interval):
+    """Цикл дочернего процесса; SIGTERM дожидается конца текущей пачки."""
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while not stopping:
+        if not work(priorities, batch_size):
+            time.sleep(interval)
+
+
+class Command(BaseCommand):
+    help = 'Запускает пул процессов, выполняющих задачи из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help='Сколько процессов запустить (по умолчанию TASK_WORKERS)')
+        parser.add_argument(
+            '--lanes', default=None,
+            help=f"Приоритеты через запятую: {', '.join(LANES)}")
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Сколько задач забирать за один проход')
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Пауза при пустой очереди, секунды')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать готовые задачи в текущем процессе и выйти')
+
+    def handle(self, *args, **options):
+        priorities = None
+        if options['lanes']:
+            try:
+                priorities = [LANES[name.strip()]
+                              for name in options['lanes'].split(',')]
+            except KeyError as error:
+                raise CommandError(f'Неизвестный приоритет {error}')
+        if options['once']:
+            self.run_once(priorities, options['batch_size'])
+        else:
+            self.run_pool(
+                options['processes'] or settings.TASK_WORKERS,
+                (priorities, options['batch_size'],
+                 options['interval'] or settings.TASK_POLL_INTERVAL))
+
+    def run_once(self, priorities, batch_size):
+        total = 0
+        while True:
+            processed = work(priorities, batch_size)
+            if not processed:
+                break
+            total += processed
+        self.stdout.write(f'Выполнено задач: {total}')
+
+    def run_pool(self, count, worker_args):
+        """Держит count дочерних процессов, перезапуская упавшие."""
+        # соединения с БД не должны наследоваться дочерними процессами
+        connections.close_all()
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        pool = []
+        try:
+            while True:
+                pool = [process for process in pool if process.is_alive()]
+                for _ in range(count - len(pool)):
+                    process = multiprocessing.Process(
+                        target=worker_loop, args=worker_args, daemon=True)
+                    process.start()
+                    pool.append(process)
+                    self.stdout.write(f'Запущен воркер {process.pid}')
+                time.sleep(1)
+        except KeyboardInterrupt:
+            self.stdout.write('Остановка воркеров')
+        finally:
+            for process in pool:
+                process.terminate()
+            for process in pool:
+                process.join()
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.mail import deliver_queued
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди пачками через одно соединение'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Сколько писем отправлять за один проход')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Работать постоянно, опрашивая очередь')
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза между проходами в режиме --loop, секунды')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = deliver_queued(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f'Отправлено: {sent}, ошибок: {failed}')
+            if not options['loop']:
+                break
+            if not sent and not failed:
+                time.sleep(options['interval'])
@@ -0,0 +1,61 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+def log_files(path):
+    """Текущий лог и его ротированные копии, от старых к новым."""
+    files = [f'{path}.{index}' for index in
+             range(settings.SLOW_QUERY_LOG_BACKUPS, 0, -1)]
+    return [name for name in files + [path] if os.path.exists(name)]
+
+
+class Command(BaseCommand):
+    help = 'Самые тяжёлые формы SQL-запросов из лога медленных запросов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--log', default=None,
+            help='Путь к логу (по умолчанию SLOW_QUERY_LOG)')
+        parser.add_argument(
+            '--limit', type=int, default=10,
+            help='Сколько форм запросов показать')
+
+    def handle(self, *args, **options):
+        shapes = {}
+        for path in log_files(options['log'] or settings.SLOW_QUERY_LOG):
+            with open(path, encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    shape = shapes.setdefault(entry['shape_id'], {
+                        'shape': entry['shape'],
+                        'count': 0,
+                        'total': 0,
+                        'max': 0,
+                        'views': set(),
+                        'plan': None,
+                    })
+                    shape['count'] += 1
+                    shape['total'] += entry['duration_ms']
+                    shape['max'] = max(shape['max'], entry['duration_ms'])
+                    shape['views'].add(entry['view'])
+                    shape['plan'] = entry.get('plan') or shape['plan']
+        ranked = sorted(
+            shapes.items(), key=lambda item: item[1]['total'], reverse=True)
+        for key, shape in ranked[:options['limit']]:
+            self.stdout.write(
+                f"[{key}] всего {shape['total']:.1f} мс, "
+                f"запросов {shape['count']}, "
+                f"среднее {shape['total'] / shape['count']:.1f} мс, "
+                f"максимум {shape['max']:.1f} мс")
+            self.stdout.write(f"  views: {', '.join(sorted(shape['views']))}")
+            self.stdout.write(f"  {shape['shape']}")
+            for line in shape['plan'] or ():
+                self.stdout.write(f'    {line}')
+        if not ranked:
+            self.stdout.write('Медленных запросов не найдено')
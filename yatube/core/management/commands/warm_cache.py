@@ -0,0 +1,86 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.hot import hot_urls, parse_access_log
+from yatube.warmup import wsgi_get
+
+
+class RateLimiter:
+    """Не больше rate запросов в секунду на все потоки вместе."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.lock = threading.Lock()
+        self.next_at = time.monotonic()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            at = max(self.next_at, now)
+            self.next_at = at + self.interval
+        time.sleep(max(at - now, 0))
+
+
+class Command(BaseCommand):
+    help = ('Прогревает кэш самыми посещаемыми страницами лент и постов '
+            'из логов доступа или счётчика HotUrlMiddleware')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--log', action='append', default=[],
+            help='Лог доступа (common/combined), можно несколько')
+        parser.add_argument('--top', type=int, default=100,
+                            help='Сколько страниц прогреть')
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument(
+            '--rate', type=float, default=10,
+            help='Не больше стольких запросов в секунду, 0 — без ограничения')
+
+    def top_paths(self, options):
+        if not options['log']:
+            return hot_urls().most_common(options['top'])
+        counter = None
+        for path in options['log']:
+            try:
+                with open(path, encoding='utf-8', errors='replace') as log:
+                    parsed = parse_access_log(log)
+            except OSError as error:
+                raise CommandError(f'Не удалось прочитать {path}: {error}')
+            counter = parsed if counter is None else counter + parsed
+        return counter.most_common(options['top'])
+
+    def handle(self, *args, **options):
+        paths = self.top_paths(options)
+        if not paths:
+            self.stdout.write('Нет данных о посещаемых страницах')
+            return
+        application = WSGIHandler()
+        limiter = RateLimiter(options['rate'])
+
+        def warm(path):
+            limiter.wait()
+            start = time.perf_counter()
+            try:
+                return path, wsgi_get(application, path), (
+                    time.perf_counter() - start)
+            finally:
+                # у каждого потока своё соединение с БД
+                connection.close()
+
+        start = time.perf_counter()
+        statuses = {}
+        with ThreadPoolExecutor(options['threads']) as pool:
+            for path, status, duration in pool.map(
+                    warm, [path for path, _ in paths]):
+                statuses[status] = statuses.get(status, 0) + 1
+                self.stdout.write(f'{status} {duration:.3f} с {path}')
+        summary = ', '.join(
+            f'{status}: {count}' for status, count in sorted(statuses.items()))
+        self.stdout.write(
+            f'Прогрето {len(paths)} страниц за '
+            f'{time.perf_counter() - start:.1f} с ({summary})')
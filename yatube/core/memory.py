@@ -0,0 +1,151 @@
+import linecache
+import threading
+import tracemalloc
+
+from django.conf import settings
+
+from .metrics import collectors
+
+# сколько растущих мест выделения памяти хранить и показывать
+TOP_SITES = 20
+IGNORED_FILES = (
+    tracemalloc.__file__,
+    linecache.__file__,
+    '<frozen importlib._bootstrap>',
+    '<frozen importlib._bootstrap_external>',
+    '<unknown>',
+)
+
+
+class MemoryTracker:
+    """Память, выделенная при обработке запросов, по имени URL.
+
+    peak — максимум выделенного сверх уровня на начало запроса,
+    retained — сколько осталось занято после ответа. Раз в
+    MEMORY_SNAPSHOT_INTERVAL запросов снимок tracemalloc сравнивается с
+    первым, и места с наибольшим ростом сохраняются для отчёта.
+
+    При нескольких потоках в воркере цифры запросов смешиваются, так что
+    замеры стоит снимать на воркере с одним потоком.
+    """
+
+    def __init__(self):
+        self.views = {}
+        self.requests = 0
+        self.baseline = None
+        self.growth = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(settings.MEMORY_TRACE_FRAMES)
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+            self.requests = 0
+            self.baseline = None
+            self.growth = []
+
+    def before_request(self):
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+    def after_request(self, view, before):
+        current, peak = tracemalloc.get_traced_memory()
+        if not hasattr(tracemalloc, 'reset_peak'):
+            # без reset_peak пик общий для процесса и только растёт
+            peak = current
+        with self.lock:
+            stats = self.views.setdefault(view, {
+                'requests': 0,
+                'peak_max': 0,
+                'peak_total': 0,
+                'retained_total': 0,
+            })
+            stats['requests'] += 1
+            stats['peak_max'] = max(stats['peak_max'], peak - before)
+            stats['peak_total'] += peak - before
+            stats['retained_total'] += current - before
+            self.requests += 1
+            take = self.requests % settings.MEMORY_SNAPSHOT_INTERVAL == 0
+        if take:
+            self.snapshot()
+
+    def snapshot(self):
+        """Снимок памяти; первый становится точкой отсчёта роста."""
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, name) for name in IGNORED_FILES])
+        if self.baseline is None:
+            self.baseline = snapshot
+            return
+        growth = [
+            stat for stat in snapshot.compare_to(self.baseline, 'lineno')
+            if stat.size_diff > 0
+        ]
+        self.growth = growth[:TOP_SITES]
+
+    def report(self):
+        """Текстовый отчёт: память по URL и растущие места выделения."""
+        lines = [
+            f'Запросов: {self.requests}, '
+            f'занято сейчас: {tracemalloc.get_traced_memory()[0]} байт',
+            '',
+            'view | запросов | пик макс. | пик средн. | остаётся средн.',
+        ]
+        ranked = sorted(self.views.items(),
+                        key=lambda item: -item[1]['retained_total'])
+        for view, stats in ranked:
+            count = stats['requests']
+            lines.append(
+                f"{view} | {count} | {stats['peak_max']} | "
+                f"{stats['peak_total'] // count} | "
+                f"{stats['retained_total'] // count}")
+        lines += ['', 'Рост относительно первого снимка:']
+        for stat in self.growth:
+            frame = stat.traceback[0]
+            lines.append(
+                f'+{stat.size_diff} байт, +{stat.count_diff} блоков: '
+                f'{frame.filename}:{frame.lineno}')
+        if not self.growth:
+            lines.append('нет данных, снимков меньше двух')
+        return '\n'.join(lines) + '\n'
+
+
+tracker = MemoryTracker()
+
+
+def collect():
+    with tracker.lock:
+        views = dict(tracker.views)
+    if not views:
+        return []
+    return [(
+        'memory_retained_bytes_avg',
+        'Память, остающаяся после запроса, в среднем',
+        {(view,): stats['retained_total'] // stats['requests']
+         for view, stats in views.items()},
+        ('view',),
+    )]
+
+
+collectors.append(collect)
+
+
+class MemoryTrackingMiddleware:
+    """Замеры tracemalloc для каждого запроса при MEMORY_TRACKING."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.MEMORY_TRACKING:
+            return self.get_response(request)
+        tracker.start()
+        before = tracker.before_request()
+        response = self.get_response(request)
+        match = request.resolver_match
+        tracker.after_request(
+            match.view_name if match else 'unresolved', before)
+        return response
@@ -0,0 +1,242 @@
+import atexit
+import glob
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+
+from .sqlite import WriteLock
+
+PREFIX = 'yatube_'
+DURATION_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# имя метрики: (тип, описание, имена меток, границы корзин)
+METRICS = {
+    'http_requests_total': (
+        'counter', 'Ответы по имени URL и статусу', ('view', 'status'), None),
+    'http_request_duration_seconds': (
+        'histogram', 'Время обработки запроса', ('view',), DURATION_BUCKETS),
+    'db_query_duration_seconds': (
+        'histogram', 'Время одного SQL-запроса', (), DURATION_BUCKETS),
+    'db_queries_per_request': (
+        'histogram', 'Число SQL-запросов за запрос', ('view',),
+        COUNT_BUCKETS),
+    'cache_requests_total': (
+        'counter', 'Обращения к кэшу', ('alias', 'result'), None),
+    'thumbnails_generated_total': (
+        'counter', 'Созданные миниатюры', (), None),
+    'tasks_processed_total': (
+        'counter', 'Выполненные задачи очереди', ('task', 'result'), None),
+    'task_duration_seconds': (
+        'histogram', 'Время выполнения задачи', ('task',), DURATION_BUCKETS),
+    'template_render_duration_seconds': (
+        'histogram', 'Время рендеринга шаблона', ('template',),
+        DURATION_BUCKETS),
+}
+
+# значения завершившихся процессов, сложенные в один файл
+FOLDED = 'folded.json'
+FILE_PID = re.compile(r'metrics-(\d+)')
+
+# функции, возвращающие значения gauge-метрик на момент выгрузки:
+# [(имя, описание, {(значения меток): значение}, имена меток)]
+collectors = []
+
+
+class Registry:
+    """Метрики текущего процесса.
+
+    Значения копятся в памяти и не чаще раза в METRICS_FLUSH_INTERVAL
+    секунд сбрасываются в файл процесса в METRICS_DIR. В имени файла
+    кроме pid есть случайная метка: процесс с повторно выданным pid не
+    затрёт счётчики прежнего. Выгрузка суммирует файлы всех воркеров.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.lock = threading.Lock()
+        self.flushed = 0
+        self.pid = self.token = None
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, tuple(labels))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        buckets = METRICS[name][3]
+        key = (name, tuple(labels))
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                # счётчики корзин, затем +Inf, сумма
+                series = self.values[key] = [0] * (len(buckets) + 2)
+            series[bisect_left(buckets, value)] += 1
+            series[-1] += value
+
+    def path(self):
+        pid = os.getpid()
+        if self.pid != pid:
+            # после fork у процесса свой файл
+            self.pid, self.token = pid, uuid.uuid4().hex[:12]
+        return os.path.join(
+            settings.METRICS_DIR, f'metrics-{pid}-{self.token}.json')
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self.flushed = now
+        with self.lock:
+            data = [[name, list(labels), value]
+                    for (name, labels), value in self.values.items()]
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = self.path()
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump(data, file)
+        os.replace(f'{path}.tmp', path)
+
+
+registry = Registry()
+atexit.register(lambda: registry.values and registry.flush(force=True))
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # процесс есть, но чужой
+        return True
+    return True
+
+
+def read_series(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def add_series(total, data):
+    for name, labels, value in data:
+        if name not in METRICS:
+            continue
+        key = (name, tuple(labels))
+        if isinstance(value, list):
+            current = total.setdefault(key, [0] * len(value))
+            for index, item in enumerate(value):
+                current[index] += item
+        else:
+            total[key] = total.get(key, 0) + value
+
+
+def fold_dead(paths):
+    """Складывает файлы завершившихся процессов в FOLDED и удаляет их.
+
+    Счётчики умерших воркеров остаются в сумме и не растут заново,
+    а число файлов не копится.
+    """
+    dead = []
+    for path in paths:
+        match = FILE_PID.match(os.path.basename(path))
+        if match and not process_alive(int(match[1])):
+            dead.append(path)
+    if not dead:
+        return
+    folded_path = os.path.join(settings.METRICS_DIR, FOLDED)
+    folded = {}
+    add_series(folded, read_series(folded_path) or [])
+    removed = []
+    for path in dead:
+        data = read_series(path)
+        if data is not None:
+            add_series(folded, data)
+            removed.append(path)
+    with open(f'{folded_path}.tmp', 'w') as file:
+        json.dump([[name, list(labels), value]
+                   for (name, labels), value in folded.items()], file)
+    os.replace(f'{folded_path}.tmp', folded_path)
+    for path in removed:
+        os.remove(path)
+
+
+def aggregate():
+    """Суммирует метрики из файлов всех процессов.
+
+    Файлы читаются под блокировкой, чтобы параллельная выгрузка не
+    застала файл умершего процесса уже удалённым, но ещё не сложенным.
+    """
+    registry.flush(force=True)
+    total = {}
+    pattern = os.path.join(settings.METRICS_DIR, 'metrics-*.json')
+    with WriteLock(os.path.join(settings.METRICS_DIR, 'fold.lock')):
+        fold_dead(glob.glob(pattern))
+        for path in [*glob.glob(pattern),
+                     os.path.join(settings.METRICS_DIR, FOLDED)]:
+            add_series(total, read_series(path) or [])
+    return total
+
+
+def escape(value):
+    return (str(value).replace('\\', '\\\\')
+            .replace('\n', '\\n').replace('"', '\\"'))
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+
+def render():
+    """Метрики в текстовом формате Prometheus."""
+    total = aggregate()
+    lines = []
+    for name, (kind, help_text, label_names, buckets) in METRICS.items():
+        full_name = PREFIX + name
+        lines.append(f'# HELP {full_name} {help_text}')
+        lines.append(f'# TYPE {full_name} {kind}')
+        series = sorted(
+            (labels, value) for (metric, labels), value in total.items()
+            if metric == name)
+        for labels, value in series:
+            if kind == 'counter':
+                lines.append(
+                    f'{full_name}{format_labels(label_names, labels)} '
+                    f'{value}')
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), value):
+                cumulative += count
+                lines.append(
+                    f'{full_name}_bucket'
+                    f'{format_labels(label_names, labels, [("le", bound)])}'
+                    f' {cumulative}')
+            lines.append(
+                f'{full_name}_sum{format_labels(label_names, labels)} '
+                f'{value[-1]}')
+            lines.append(
+                f'{full_name}_count{format_labels(label_names, labels)} '
+                f'{cumulative}')
+    for collect in collectors:
+        for name, help_text, values, label_names in collect():
+            full_name = PREFIX + name
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} gauge')
+            for labels, value in sorted(values.items()):
+                lines.append(
+                    f'{full_name}{format_labels(label_names, labels)} '
+                    f'{value}')
+    return '\n'.join(lines) + '\n'
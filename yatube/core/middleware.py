@@ -0,0 +1,40 @@
+import time
+
+from django.db import connection
+
+from .metrics import registry
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+class MetricsMiddleware:
+    """Время ответа, статусы и SQL-запросы по имени URL."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = []
+
+        def observe_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                duration = time.perf_counter() - start
+                queries.append(duration)
+                registry.observe('db_query_duration_seconds', duration)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(observe_query):
+            response = self.get_response(request)
+        name = view_name(request)
+        registry.observe('http_request_duration_seconds',
+                         time.perf_counter() - start, (name,))
+        registry.inc('http_requests_total', (name, response.status_code))
+        registry.observe('db_queries_per_request', len(queries), (name,))
+        registry.flush()
+        return response
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 
 
@@ -10,3 +11,108 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class QueuedEmail(CreatedModel):
+    """Письмо, ожидающее отправки воркером очереди."""
+    STATUS_QUEUED = 'queued'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, 'В очереди'),
+        (STATUS_SENT, 'Отправлено'),
+        (STATUS_FAILED, 'Ошибка'),
+    )
+
+    subject = models.CharField('Тема', max_length=255, blank=True)
+    from_email = models.CharField('Отправитель', max_length=255)
+    recipients = models.TextField('Получатели')
+    payload = models.TextField('Содержимое письма')
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_QUEUED,
+    )
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    next_attempt = models.DateTimeField('Следующая попытка')
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    sent = models.DateTimeField('Дата отправки', blank=True, null=True)
+
+    def __str__(self):
+        return self.subject[:30]
+
+    class Meta:
+        ordering = ['next_attempt']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt']),
+        ]
+
+
+class RequestProfile(CreatedModel):
+    """Профиль одного запроса, снятый по запросу сотрудника."""
+    path = models.CharField('Адрес', max_length=500)
+    view_name = models.CharField('Имя URL', max_length=200, blank=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='request_profiles',
+        verbose_name='Пользователь'
+    )
+    status_code = models.PositiveSmallIntegerField('Статус ответа')
+    duration_ms = models.FloatField('Время ответа, мс')
+    query_count = models.PositiveIntegerField('SQL-запросов')
+    query_time_ms = models.FloatField('Время SQL, мс')
+    name = models.CharField('Имя файлов профиля', max_length=100)
+
+    def __str__(self):
+        return self.path
+
+    class Meta:
+        ordering = ['-created']
+
+
+class Task(CreatedModel):
+    """Задача очереди, выполняемая командой run_workers."""
+    PRIORITY_HIGH = 0
+    PRIORITY_DEFAULT = 1
+    PRIORITY_LOW = 2
+    PRIORITY_CHOICES = (
+        (PRIORITY_HIGH, 'high'),
+        (PRIORITY_DEFAULT, 'default'),
+        (PRIORITY_LOW, 'low'),
+    )
+    STATUS_QUEUED = 'queued'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, 'В очереди'),
+        (STATUS_FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Задача', max_length=200)
+    arguments = models.TextField('Аргументы', default='{}')
+    priority = models.PositiveSmallIntegerField(
+        'Приоритет',
+        choices=PRIORITY_CHOICES,
+        default=PRIORITY_DEFAULT,
+    )
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_QUEUED,
+    )
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Предел попыток')
+    run_at = models.DateTimeField('Следующий запуск')
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['priority', 'run_at']
+        indexes = [
+            models.Index(fields=['status', 'priority', 'run_at']),
+        ]
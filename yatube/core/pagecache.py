@@ -0,0 +1,111 @@
+import base64
+import json
+import re
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.urls import Resolver404, resolve
+from django.utils.safestring import mark_safe
+
+from .caching import (CACHEABLE_METHODS, entry_key, get_or_compute,
+                      is_cacheable)
+
+# место личного фрагмента в общей странице: имя и аргументы в base64
+HOLE = '<!--hole:{}:{}-->'
+HOLE_RE = re.compile(r'<!--hole:(\w+):([\w=-]*)-->')
+HOLES = {}
+
+
+def hole(name):
+    """Регистрирует фрагмент страницы, свой для каждого пользователя.
+
+    Функция получает request и аргументы из шаблона (строки и числа)
+    и возвращает HTML.
+    """
+    def decorator(func):
+        HOLES[name] = func
+        return func
+    return decorator
+
+
+def render_hole(request, name, args):
+    return mark_safe(HOLES[name](request, *args))
+
+
+def hole_marker(name, args):
+    payload = base64.urlsafe_b64encode(json.dumps(args).encode()).decode()
+    return mark_safe(HOLE.format(name, payload))
+
+
+def fill_holes(request, response):
+    """Копия общей страницы с личными фрагментами для request."""
+    def fill(match):
+        args = json.loads(base64.urlsafe_b64decode(match[2]))
+        return render_hole(request, match[1], args)
+
+    content = HOLE_RE.sub(fill, response.content.decode(response.charset))
+    filled = HttpResponse(content, status=response.status_code)
+    for header, value in response.items():
+        filled[header] = value
+    filled.cookies.update(response.cookies)
+    return filled
+
+
+@hole('header')
+def header(request):
+    return render_to_string('includes/header.html', request=request)
+
+
+class PageCacheMiddleware:
+    """Кэш целых страниц из PAGE_CACHE_VIEWS, общий для всех посетителей.
+
+    Страница рендерится один раз с метками {% hole %} вместо шапки,
+    кнопок и формы комментария и хранится до изменения тегов, которые
+    view добавил через add_tags. На каждый запрос метки заменяются
+    фрагментами для текущего пользователя: гость и автор получают одну
+    и ту же закэшированную страницу. Ключ — адрес страницы и значения
+    кук из PAGE_CACHE_VARY_COOKIES.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        match = self.match(request)
+        if match is None:
+            return self.get_response(request)
+        request.resolver_match = match
+        request.page_shell = True
+        request.cache_tags = set()
+        key = entry_key('page', [
+            request.get_full_path(),
+            *(request.COOKIES.get(name, '')
+              for name in settings.PAGE_CACHE_VARY_COOKIES),
+        ])
+        response = get_or_compute(
+            key, lambda: self.get_response(request),
+            settings.PAGE_CACHE_TIMEOUT, request.cache_tags, is_shell)
+        request.page_shell = False
+        if response.streaming or not is_html(response):
+            return response
+        return fill_holes(request, response)
+
+    def match(self, request):
+        if not settings.PAGE_CACHE or request.method not in CACHEABLE_METHODS:
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        if match.view_name not in settings.PAGE_CACHE_VIEWS:
+            return None
+        return match
+
+
+def is_html(response):
+    return response.get('Content-Type', '').startswith('text/html')
+
+
+def is_shell(response):
+    return is_cacheable(response) and is_html(response)
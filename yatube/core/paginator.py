@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.core.paginator import EmptyPage, Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+
+def estimated_count(queryset):
+    """Оценка числа строк таблицы без её обхода или None.
+
+    Оценку даёт статистика планировщика: pg_class в PostgreSQL и
+    sqlite_stat1 в SQLite. Статистику обновляет refresh_estimates;
+    пока её нет, оценки тоже нет.
+    """
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples FROM pg_class WHERE relname = %s'
+    elif connection.vendor == 'sqlite':
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        # в SQLite таблицы sqlite_stat1 нет до первого ANALYZE
+        return None
+    if row is None:
+        return None
+    # в sqlite_stat1 первое число строки stat — число строк таблицы
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+def refresh_estimates(*models):
+    """Обновляет статистику, по которой считается estimated_count."""
+    for model in models:
+        connection = connections[model._default_manager.db]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'ANALYZE ' + connection.ops.quote_name(model._meta.db_table))
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор списков админки для больших таблиц.
+
+    Без фильтров число строк оценивается по estimated_count, с фильтрами
+    и поиском считается не дальше ADMIN_COUNT_LIMIT строк: тогда count —
+    нижняя граница (capped). Страницы за оценкой или пределом
+    открываются: число строк досчитывается до запрошенной страницы и
+    одной строки за ней, чтобы работала ссылка на следующую.
+    """
+    capped = estimated = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = settings.ADMIN_COUNT_LIMIT
+        if not queryset.query.where:
+            estimate = estimated_count(queryset)
+            if estimate is not None and estimate > limit:
+                self.estimated = True
+                return estimate
+        count = queryset.order_by()[:limit + 1].count()
+        self.capped = count > limit
+        return min(count, limit)
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if not (self.capped or self.estimated):
+                raise
+        number = int(number)
+        bottom = (number - 1) * self.per_page
+        rows = self.object_list.order_by()[
+            bottom:bottom + self.per_page + 1].count()
+        if not rows:
+            raise EmptyPage(_('That page contains no results'))
+        self.__dict__['count'] = bottom + rows
+        self.__dict__.pop('num_pages', None)
+        return number
@@ -0,0 +1,155 @@
+import cProfile
+import os
+import pstats
+import time
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core import signing
+from django.db import connection
+from django.template.loader import render_to_string
+
+from .models import RequestProfile
+
+SIGNING_SALT = 'core.profiler'
+QUERY_PARAM = '_profile'
+HEADER = 'HTTP_X_PROFILE'
+# глубина и минимальная ширина (доля от общего времени) кадров флеймграфа
+MAX_DEPTH = 60
+MIN_WIDTH = 0.002
+FRAME_HEIGHT = 18
+
+
+def profile_token():
+    """Подписанное значение для ?_profile= в ссылке на страницу."""
+    return signing.Signer(salt=SIGNING_SALT).sign('1')
+
+
+def is_requested(request):
+    """Дешёвая проверка флага; пользователь загружается только при нём."""
+    token = request.GET.get(QUERY_PARAM)
+    if token is None and HEADER not in request.META:
+        return False
+    if not request.user.is_staff:
+        return False
+    if token is None:
+        return True
+    try:
+        signing.Signer(salt=SIGNING_SALT).unsign(token)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name
+    return f'{name} ({os.path.basename(filename)}:{line})'
+
+
+def flame_frames(stats):
+    """Кадры флеймграфа из pstats: отступ сверху, начало и ширина в %.
+
+    cProfile хранит только рёбра вызовов, поэтому время вложенных
+    кадров распределяется пропорционально времени ребра.
+    """
+    children = defaultdict(list)
+    roots = []
+    for func, (_, _, _, cumulative, callers) in stats.stats.items():
+        if not callers:
+            roots.append((func, cumulative))
+        for caller, edge in callers.items():
+            children[caller].append((func, edge[3]))
+    total = sum(cumulative for _, cumulative in roots) or 1
+    frames = []
+
+    def walk(func, width, depth, start, path):
+        if width / total < MIN_WIDTH or depth > MAX_DEPTH:
+            return
+        frames.append({
+            'depth': depth,
+            'top': depth * FRAME_HEIGHT,
+            'left': start / total * 100,
+            'width': width / total * 100,
+            'name': label(func),
+        })
+        own = stats.stats[func][3] or 1
+        offset = start
+        for child, edge in sorted(children[func], key=lambda c: -c[1]):
+            if child in path:
+                continue
+            child_width = width * min(edge / own, 1)
+            walk(child, child_width, depth + 1, offset, path | {child})
+            offset += child_width
+
+    offset = 0
+    for func, cumulative in sorted(roots, key=lambda r: -r[1]):
+        walk(func, cumulative, 0, offset, {func})
+        offset += cumulative
+    return frames
+
+
+class ProfilerMiddleware:
+    """Профилирует запрос сотрудника с заголовком X-Profile или
+    подписанным параметром ?_profile=.
+
+    Для остальных запросов стоит одну проверку словаря.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_requested(request):
+            return self.get_response(request)
+        queries = []
+
+        def capture(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries.append(
+                    (sql, (time.perf_counter() - start) * 1000))
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        with connection.execute_wrapper(capture):
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duration = (time.perf_counter() - start) * 1000
+        self.save(request, response, profiler, queries, duration)
+        return response
+
+    def save(self, request, response, profiler, queries, duration):
+        os.makedirs(settings.PROFILES_DIR, exist_ok=True)
+        name = f'{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:8]}'
+        base = os.path.join(settings.PROFILES_DIR, name)
+        profiler.dump_stats(f'{base}.prof')
+        stats = pstats.Stats(profiler)
+        match = request.resolver_match
+        record = RequestProfile.objects.create(
+            path=request.get_full_path()[:500],
+            view_name=match.view_name if match else '',
+            user=request.user,
+            status_code=response.status_code,
+            duration_ms=duration,
+            query_count=len(queries),
+            query_time_ms=sum(ms for _, ms in queries),
+            name=name,
+        )
+        frames = flame_frames(stats)
+        html = render_to_string('core/profile.html', {
+            'profile': record,
+            'frames': frames,
+            'height': max((f['top'] for f in frames), default=0)
+            + FRAME_HEIGHT,
+            'queries': queries,
+        })
+        with open(f'{base}.html', 'w', encoding='utf-8') as file:
+            file.write(html)
@@ -0,0 +1,33 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.urls import get_script_prefix, get_urlconf, reverse
+
+# сколько разных адресов держать в кэше процесса
+CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _reverse(urlconf, prefix, viewname, args, kwargs):
+    return reverse(viewname, urlconf=urlconf, args=args, kwargs=dict(kwargs))
+
+
+def cached_reverse(viewname, *args, **kwargs):
+    """reverse() с кэшем по имени URL и аргументам.
+
+    Адрес зависит только от схемы URL и префикса скрипта, поэтому они
+    входят в ключ вместе с аргументами.
+    """
+    return _reverse(
+        get_urlconf() or settings.ROOT_URLCONF, get_script_prefix(),
+        viewname, tuple(str(arg) for arg in args),
+        tuple(sorted((key, str(value)) for key, value in kwargs.items())))
+
+
+def clear_cache(*, setting, **kwargs):
+    if setting == 'ROOT_URLCONF':
+        _reverse.cache_clear()
+
+
+setting_changed.connect(clear_cache)
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_RE = re.compile(r'%s')
+IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+SPACE_RE = re.compile(r'\s+')
+# длина одного параметра в логе
+PARAM_LIMIT = 100
+
+logger = logging.getLogger('yatube.slow_queries')
+logger.propagate = False
+local = threading.local()
+explained = set()
+
+
+def normalize(sql):
+    """Форма запроса: литералы и параметры заменены на ?."""
+    shape = STRING_RE.sub('?', sql)
+    shape = PLACEHOLDER_RE.sub('?', shape)
+    shape = NUMBER_RE.sub('?', shape)
+    shape = IN_LIST_RE.sub('(...)', shape)
+    return SPACE_RE.sub(' ', shape).strip()
+
+
+def shape_id(shape):
+    return hashlib.md5(shape.encode()).hexdigest()[:12]
+
+
+def configure_handler():
+    """Подключает ротируемый файл лога, если путь в настройках сменился."""
+    path = settings.SLOW_QUERY_LOG
+    if getattr(logger, 'log_path', None) == path:
+        return
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handler = RotatingFileHandler(
+        path, maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+        backupCount=settings.SLOW_QUERY_LOG_BACKUPS)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.log_path = path
+
+
+def explain(connection, sql, params):
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    prefix = (
+        'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN ')
+    local.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return [' '.join(map(str, row)) for row in cursor.fetchall()]
+    except Exception as error:
+        return [f'EXPLAIN failed: {error}']
+    finally:
+        local.explaining = False
+
+
+def record(connection, sql, params, duration):
+    shape = normalize(sql)
+    key = shape_id(shape)
+    entry = {
+        'time': time.time(),
+        'view': getattr(local, 'view', None) or 'unresolved',
+        'shape_id': key,
+        'shape': shape,
+        'params': [repr(param)[:PARAM_LIMIT] for param in params or ()],
+        'duration_ms': round(duration * 1000, 3),
+    }
+    if key not in explained:
+        explained.add(key)
+        entry['plan'] = explain(connection, sql, params)
+    configure_handler()
+    logger.info(json.dumps(entry, ensure_ascii=False))
+
+
+def log_slow_queries(execute, sql, params, many, context):
+    """Обёртка SQL-запросов, записывающая медленные в лог."""
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold is None or getattr(local, 'explaining', False):
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - start
+    if duration * 1000 >= threshold and not many:
+        record(context['connection'], sql, params, duration)
+    return result
+
+
+def install(sender, connection, **kwargs):
+    """Подключает обёртку к каждому новому соединению с БД."""
+    if log_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, log_slow_queries)
+
+
+class SlowQueryMiddleware:
+    """Запоминает имя URL, чтобы связать медленный запрос с view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            local.view = None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        local.view = request.resolver_match.view_name
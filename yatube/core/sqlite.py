@@ -0,0 +1,84 @@
+import functools
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+try:
+    import fcntl
+except ImportError:
+    # без fcntl запись сериализуется только внутри процесса
+    fcntl = None
+
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+local_lock = threading.Lock()
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Применяет SQLITE_PRAGMAS к каждому новому соединению с SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+class WriteLock:
+    """Межпроцессная блокировка на файле path, по умолчанию —
+    SQLITE_WRITE_LOCK.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or settings.SQLITE_WRITE_LOCK
+
+    def __enter__(self):
+        if fcntl is None:
+            local_lock.acquire()
+            return self
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, 'a')
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is None:
+            local_lock.release()
+            return
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+def is_locked_error(error):
+    return 'database is locked' in str(error)
+
+
+def serialized_write(view=None, *, methods=WRITE_METHODS):
+    """Выполняет изменяющий запрос под общей блокировкой записи.
+
+    SQLite допускает одного писателя: транзакции воркеров, начатые
+    параллельно, падают с database is locked, не дожидаясь busy_timeout.
+    Под блокировкой писатели идут по очереди, читатели в режиме WAL их
+    не ждут. Если база всё же занята (например, командой), запрос
+    повторяется SQLITE_WRITE_RETRIES раз с растущей паузой.
+
+    Блокируются только запросы с методами из methods.
+    """
+    if view is None:
+        return functools.partial(serialized_write, methods=methods)
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in methods or connection.vendor != 'sqlite':
+            return view(request, *args, **kwargs)
+        for attempt in range(settings.SQLITE_WRITE_RETRIES + 1):
+            try:
+                with WriteLock(), transaction.atomic():
+                    return view(request, *args, **kwargs)
+            except OperationalError as error:
+                if (not is_locked_error(error)
+                        or attempt == settings.SQLITE_WRITE_RETRIES):
+                    raise
+            time.sleep(settings.SQLITE_WRITE_RETRY_DELAY * 2 ** attempt)
+    return wrapper
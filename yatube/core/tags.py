@@ -0,0 +1,47 @@
+import functools
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+TAG_KEY = 'tag:{}'
+
+
+def new_version():
+    # версия от времени: если счётчик вытеснят из кэша, новый начнётся
+    # с большего значения и старые записи не оживут
+    return time.time_ns()
+
+
+def tag_versions(tags):
+    """Текущие версии тегов одним get_many; недостающие создаются."""
+    keys = {TAG_KEY.format(tag): tag for tag in tags}
+    versions = {keys[key]: version
+                for key, version in cache.get_many(keys).items()}
+    for key, tag in keys.items():
+        if tag not in versions:
+            version = new_version()
+            cache.add(key, version, None)
+            versions[tag] = cache.get(key, version)
+    return versions
+
+
+def bump(*tags):
+    """Сбрасывает всё, что зависит от тегов, без обхода ключей."""
+    for tag in tags:
+        key = TAG_KEY.format(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, new_version(), None)
+
+
+def invalidate(*tags):
+    """Сбрасывает теги сразу и ещё раз после коммита транзакции.
+
+    Запрос, прочитавший старые данные до коммита, мог сохранить их уже
+    с новой версией тегов; повторный сброс убирает такую запись.
+    """
+    bump(*tags)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(functools.partial(bump, *tags))
@@ -0,0 +1,172 @@
+import functools
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .metrics import collectors, registry
+from .models import Task
+
+LANE_NAMES = dict(Task.PRIORITY_CHOICES)
+LANES = {name: value for value, name in Task.PRIORITY_CHOICES}
+
+
+class TaskFunction:
+    """Функция, которую можно поставить в очередь через delay()."""
+
+    def __init__(self, func, priority, max_attempts):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.priority = priority
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.schedule(args, kwargs)
+
+    def schedule(self, args=(), kwargs=None, priority=None, countdown=0,
+                 unique=False):
+        """Ставит задачу в очередь.
+
+        Задача видна воркерам только после коммита текущей транзакции.
+        С unique=True задача не дублируется, если такая же ещё ждёт.
+        """
+        arguments = json.dumps({'args': list(args), 'kwargs': kwargs or {}})
+        if unique:
+            pending = Task.objects.filter(
+                name=self.name, arguments=arguments,
+                status=Task.STATUS_QUEUED, attempts=0).first()
+            if pending is not None:
+                return pending
+        return Task.objects.create(
+            name=self.name,
+            arguments=arguments,
+            priority=self.priority if priority is None else priority,
+            max_attempts=self.max_attempts or settings.TASK_MAX_ATTEMPTS,
+            run_at=timezone.now() + timedelta(seconds=countdown),
+        )
+
+
+def task(func=None, *, priority=Task.PRIORITY_DEFAULT, max_attempts=None):
+    """Регистрирует функцию как задачу очереди.
+
+    Аргументы задачи должны сериализоваться в JSON.
+    """
+    if func is None:
+        return functools.partial(
+            task, priority=priority, max_attempts=max_attempts)
+    return TaskFunction(func, priority, max_attempts)
+
+
+def retry_delay(attempts):
+    """Экспоненциальная задержка перед следующей попыткой."""
+    delay = settings.TASK_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.TASK_MAX_DELAY))
+
+
+def claim(item):
+    """Арендует задачу; после падения воркера она вернётся в очередь.
+
+    Поэтому задача может выполниться больше одного раза и должна
+    переносить повторный запуск. Аренда отсчитывается от момента
+    захвата, а не от начала пачки. Задача, на которой воркер падал
+    max_attempts раз, не арендуется, а помечается проваленной.
+    """
+    rows = Task.objects.filter(
+        pk=item.pk,
+        status=Task.STATUS_QUEUED,
+        run_at=item.run_at,
+    )
+    if item.attempts >= item.max_attempts:
+        rows.update(status=Task.STATUS_FAILED,
+                    last_error='Воркер не завершил задачу')
+        return False
+    lease = timezone.now() + timedelta(seconds=settings.TASK_LEASE)
+    return rows.update(run_at=lease, attempts=F('attempts') + 1) == 1
+
+
+def resolve(name):
+    func = import_string(name)
+    if not isinstance(func, TaskFunction):
+        raise ImportError(f'{name} не зарегистрирована как задача')
+    return func
+
+
+def execute(item):
+    """Выполняет арендованную задачу; успешная удаляется из очереди."""
+    item.attempts += 1
+    failure = None
+    start = time.perf_counter()
+    try:
+        func = resolve(item.name)
+    except ImportError as error:
+        # задача не появится при повторе, ждать нечего
+        item.attempts = item.max_attempts
+        failure = error
+    else:
+        data = json.loads(item.arguments)
+        try:
+            func.func(*data['args'], **data['kwargs'])
+        except Exception as error:
+            failure = error
+    registry.observe('task_duration_seconds',
+                     time.perf_counter() - start, (item.name,))
+    if failure is None:
+        registry.inc('tasks_processed_total', (item.name, 'ok'))
+        item.delete()
+        return True
+    registry.inc('tasks_processed_total', (item.name, 'error'))
+    item.last_error = f'{type(failure).__name__}: {failure}'
+    if item.attempts >= item.max_attempts:
+        item.status = Task.STATUS_FAILED
+    else:
+        item.run_at = timezone.now() + retry_delay(item.attempts)
+    item.save(update_fields=['attempts', 'status', 'run_at', 'last_error'])
+    return False
+
+
+def work(priorities=None, batch_size=None):
+    """Выполняет пачку готовых задач, старшие приоритеты первыми.
+
+    Возвращает число выполненных задач.
+    """
+    ready = Task.objects.filter(
+        status=Task.STATUS_QUEUED, run_at__lte=timezone.now())
+    if priorities is not None:
+        ready = ready.filter(priority__in=priorities)
+    batch = list(ready.order_by('priority', 'run_at')[
+        :batch_size or settings.TASK_BATCH_SIZE])
+    processed = 0
+    for item in batch:
+        if claim(item):
+            execute(item)
+            processed += 1
+    registry.flush()
+    return processed
+
+
+def collect():
+    queued = (
+        Task.objects.filter(status=Task.STATUS_QUEUED,
+                            run_at__lte=timezone.now())
+        .order_by().values_list('priority').annotate(total=Count('id'))
+    )
+    depth = {(LANE_NAMES[priority],): 0 for priority in LANE_NAMES}
+    depth.update(
+        {(LANE_NAMES[priority],): total for priority, total in queued})
+    failed = Task.objects.filter(status=Task.STATUS_FAILED).count()
+    return [
+        ('task_queue_depth', 'Готовые к запуску задачи по приоритетам',
+         depth, ('lane',)),
+        ('tasks_failed', 'Задачи, исчерпавшие попытки', {(): failed}, ()),
+    ]
+
+
+collectors.append(collect)
@@ -0,0 +1,28 @@
+import time
+
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from .metrics import registry
+
+
+class MetricsTemplate(Template):
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            registry.observe(
+                'template_render_duration_seconds',
+                time.perf_counter() - start, (self.origin.template_name,))
+
+
+class MetricsDjangoTemplates(DjangoTemplates):
+    """Движок шаблонов Django с замером времени рендеринга."""
+
+    def get_template(self, template_name):
+        try:
+            return MetricsTemplate(
+                self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -0,0 +1,11 @@
+from django import template
+
+from core.reverse import cached_reverse
+
+register = template.Library()
+
+
+@register.simple_tag
+def cached_url(viewname, *args, **kwargs):
+    """Как {% url %}, но адрес берётся из кэша процесса."""
+    return cached_reverse(viewname, *args, **kwargs)
@@ -0,0 +1,18 @@
+from django import template
+
+from core.pagecache import hole_marker, render_hole
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, *args):
+    """Личный фрагмент страницы, см. core.pagecache.
+
+    {% hole 'name' [arg ...] %} — в кэшируемой странице остаётся метка,
+    иначе фрагмент рендерится сразу.
+    """
+    request = context.get('request')
+    if getattr(request, 'page_shell', False):
+        return hole_marker(name, args)
+    return render_hole(request, name, args)
@@ -0,0 +1,54 @@
+from django import template
+
+from core.caching import entry_key, get_or_compute
+
+register = template.Library()
+
+
+class TaggedCacheNode(template.Node):
+    def __init__(self, nodelist, timeout, name, vary, tags):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.name = name
+        self.vary = vary
+        self.tags = tags
+
+    def resolve_tags(self, context):
+        tags = []
+        for expression in self.tags:
+            value = expression.resolve(context)
+            if isinstance(value, (list, tuple, set)):
+                tags.extend(value)
+            else:
+                tags.append(value)
+        return tags
+
+    def render(self, context):
+        return get_or_compute(
+            entry_key(self.name,
+                      [var.resolve(context) for var in self.vary]),
+            lambda: self.nodelist.render(context),
+            self.timeout.resolve(context), self.resolve_tags(context))
+
+
+@register.tag('tagged_cache')
+def do_tagged_cache(parser, token):
+    """Кэширует фрагмент шаблона до изменения его тегов.
+
+    {% tagged_cache timeout name [vary ...] tags tag [tag ...] %}
+    Тег может быть строкой или списком строк.
+    """
+    bits = token.split_contents()
+    if 'tags' not in bits or bits.index('tags') < 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' ожидает timeout, имя фрагмента и tags")
+    split = bits.index('tags')
+    nodelist = parser.parse(('endtagged_cache',))
+    parser.delete_first_token()
+    return TaggedCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        bits[2],
+        [parser.compile_filter(bit) for bit in bits[3:split]],
+        [parser.compile_filter(bit) for bit in bits[split + 1:]],
+    )
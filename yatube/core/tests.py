@@ -1,4 +1,98 @@
-from django.test import Client, TestCase
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+from email.mime.text import MIMEText
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import OperationalError, connection
+from django.db.models import F
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import (Client, RequestFactory, TestCase,
+                         TransactionTestCase, override_settings)
+from django.urls import reverse
+from django.utils import timezone
+from posts.models import Group, Post
+from yatube.warmup import warm_up, wsgi_get
+
+from . import metrics, slowlog
+from .cache import SQLiteCache, SQLiteMetricsCache
+from .hot import hot_urls, parse_access_log
+from .memory import tracker
+from .mail import claim as claim_email, deliver_queued
+from .models import QueuedEmail, RequestProfile, Task
+from .profiler import profile_token
+from .reverse import cached_reverse
+from .sqlite import serialized_write
+from .caching import add_tags, cache_tagged, entry_key, get_or_compute
+from .tags import bump
+from .tasks import claim, task, work
+
+TEMP_METRICS_DIR = tempfile.mkdtemp()
+TEMP_LOG_DIR = tempfile.mkdtemp()
+TEMP_PROFILES_DIR = tempfile.mkdtemp()
+TEMP_LOCK_DIR = tempfile.mkdtemp()
+TEMP_CACHE_DIR = tempfile.mkdtemp()
+
+User = get_user_model()
+CALLS = []
+
+
+@task
+def record_call(value):
+    CALLS.append(value)
+
+
+@task(priority=Task.PRIORITY_HIGH)
+def record_urgent(value):
+    CALLS.append(value)
+
+
+@task(max_attempts=2)
+def always_fail():
+    raise ValueError('boom')
+
+
+def increment_shared(location):
+    cache = SQLiteCache(location, {})
+    for _ in range(50):
+        cache.incr('counter')
+
+
+class BrokenEmailBackend(BaseEmailBackend):
+    """Почтовый сервер, который всегда отвечает ошибкой."""
+
+    def send_messages(self, email_messages):
+        raise ConnectionError('smtp is down')
+
+
+class UnreachableEmailBackend(BaseEmailBackend):
+    """Почтовый сервер, к которому нельзя подключиться после opened
+    успешных подключений; отправка через него всегда падает.
+    """
+    opened = 0
+
+    def open(self):
+        if not UnreachableEmailBackend.opened:
+            raise ConnectionRefusedError('connection refused')
+        UnreachableEmailBackend.opened -= 1
+        return True
+
+    def send_messages(self, email_messages):
+        raise ConnectionError('connection lost')
 
 
 class CoreTemplateTests(TestCase):
@@ -9,3 +103,663 @@ class CoreTemplateTests(TestCase):
         """Проверка кастомного шаблона 404."""
         response = self.guest_client.get('/unexisting_url/')
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+@override_settings(
+    QUEUED_EMAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.'
+                                  'EmailBackend')
+class QueuedEmailTests(TestCase):
+    def setUp(self):
+        self.connection = get_connection('core.mail.QueuedEmailBackend')
+
+    def queue_message(self):
+        return self.connection.send_messages([EmailMessage(
+            'Сброс пароля', 'Ссылка', 'from@yatube.ru', ['to@yatube.ru'])])
+
+    def test_backend_queues_without_sending(self):
+        """Бэкенд кладёт письмо в очередь и ничего не отправляет."""
+        self.assertEqual(self.queue_message(), 1)
+        self.assertEqual(QueuedEmail.objects.count(), 1)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_worker_delivers_queue(self):
+        """Воркер доставляет письма и помечает их отправленными."""
+        self.queue_message()
+        self.queue_message()
+        self.assertEqual(deliver_queued(), (2, 0))
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].subject, 'Сброс пароля')
+        self.assertFalse(QueuedEmail.objects.exclude(
+            status=QueuedEmail.STATUS_SENT).exists())
+        self.assertEqual(deliver_queued(), (0, 0))
+
+    @override_settings(
+        QUEUED_EMAIL_DELIVERY_BACKEND='core.tests.BrokenEmailBackend',
+        QUEUED_EMAIL_MAX_ATTEMPTS=2)
+    def test_worker_retries_with_backoff(self):
+        """Неудачная отправка откладывается, затем письмо помечается
+        ошибочным.
+        """
+        self.queue_message()
+        self.assertEqual(deliver_queued(), (0, 1))
+        email = QueuedEmail.objects.get()
+        self.assertEqual(email.status, QueuedEmail.STATUS_QUEUED)
+        self.assertGreater(email.next_attempt, email.created)
+        self.assertIn('smtp is down', email.last_error)
+        self.assertEqual(deliver_queued(), (0, 0))
+
+        QueuedEmail.objects.update(next_attempt=email.created)
+        deliver_queued()
+        email.refresh_from_db()
+        self.assertEqual(email.status, QueuedEmail.STATUS_FAILED)
+        self.assertEqual(email.attempts, 2)
+
+    @override_settings(
+        QUEUED_EMAIL_DELIVERY_BACKEND='core.tests.UnreachableEmailBackend')
+    def test_unreachable_server_postpones_batch(self):
+        """Недоступный сервер не роняет доставку: попытки записаны."""
+        self.queue_message()
+        self.assertEqual(deliver_queued(), (0, 1))
+        email = QueuedEmail.objects.get()
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('ConnectionRefusedError', email.last_error)
+        self.assertGreater(email.next_attempt, timezone.now())
+
+    @override_settings(
+        QUEUED_EMAIL_DELIVERY_BACKEND='core.tests.UnreachableEmailBackend')
+    def test_failed_reopen_saves_attempt(self):
+        """Письмо, на котором оборвалось соединение, не остаётся в аренде."""
+        UnreachableEmailBackend.opened = 1
+        self.queue_message()
+        self.queue_message()
+        self.assertEqual(deliver_queued(), (0, 2))
+        first, second = QueuedEmail.objects.order_by('pk')
+        self.assertIn('connection lost', first.last_error)
+        self.assertIn('connection refused', second.last_error)
+        self.assertEqual([first.attempts, second.attempts], [1, 1])
+
+    def test_lease_counted_from_claim(self):
+        """Аренда письма отсчитывается от его захвата."""
+        self.queue_message()
+        email = QueuedEmail.objects.get()
+        start = timezone.now()
+        self.assertTrue(claim_email(email))
+        email.refresh_from_db()
+        self.assertGreaterEqual(
+            email.next_attempt,
+            start + timedelta(seconds=settings.QUEUED_EMAIL_LEASE))
+
+    def test_attachments_kept(self):
+        message = EmailMessage(
+            'Архив', 'Данные', 'from@yatube.ru', ['to@yatube.ru'])
+        message.attach('notes.txt', 'текст', 'text/plain')
+        message.attach('data.bin', b'\x00\xff', 'application/octet-stream')
+        self.connection.send_messages([message])
+        deliver_queued()
+        self.assertEqual(mail.outbox[0].attachments, [
+            ('notes.txt', 'текст', 'text/plain'),
+            ('data.bin', b'\x00\xff', 'application/octet-stream')])
+        message.attachments = [MIMEText('текст')]
+        with self.assertRaises(ValueError):
+            self.connection.send_messages([message])
+
+
+@override_settings(METRICS_DIR=TEMP_METRICS_DIR)
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_METRICS_DIR, ignore_errors=True)
+
+    def setUp(self):
+        metrics.registry.values.clear()
+        shutil.rmtree(TEMP_METRICS_DIR, ignore_errors=True)
+        os.makedirs(TEMP_METRICS_DIR)
+        cache.clear()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_metrics_endpoint(self):
+        """Запросы, SQL, кэш и шаблоны попадают в выгрузку."""
+        cache.get('missing-key')
+        self.staff_client.get(reverse('posts:index'))
+        response = self.staff_client.get(reverse('metrics'))
+        content = response.content.decode()
+        self.assertIn(
+            'yatube_http_requests_total{view="posts:index",status="200"} 1',
+            content)
+        self.assertIn('yatube_http_request_duration_seconds_bucket'
+                      '{view="posts:index",le="+Inf"} 1', content)
+        self.assertIn('yatube_db_queries_per_request_count'
+                      '{view="posts:index"} 1', content)
+        self.assertIn('yatube_cache_requests_total'
+                      '{alias="default",result="miss"}', content)
+        self.assertIn('yatube_template_render_duration_seconds_count'
+                      '{template="posts/index.html"} 1', content)
+
+    def test_metrics_summed_across_workers(self):
+        """Файлы других воркеров суммируются с текущим процессом."""
+        with open(f'{TEMP_METRICS_DIR}/metrics-1.json', 'w') as file:
+            file.write('[["thumbnails_generated_total", [], 2]]')
+        metrics.registry.inc('thumbnails_generated_total')
+        self.assertIn('yatube_thumbnails_generated_total 3',
+                      metrics.render())
+
+    def test_dead_worker_files_folded(self):
+        """Файл завершившегося процесса складывается в общий и удаляется."""
+        dead = f'{TEMP_METRICS_DIR}/metrics-999999999-dead.json'
+        with open(dead, 'w') as file:
+            file.write('[["thumbnails_generated_total", [], 2]]')
+        metrics.registry.inc('thumbnails_generated_total')
+        for _ in range(2):
+            self.assertIn('yatube_thumbnails_generated_total 3',
+                          metrics.render())
+        self.assertFalse(os.path.exists(dead))
+        self.assertIn(metrics.registry.token, metrics.registry.path())
+
+    def test_metrics_for_staff_only(self):
+        response = Client().get(reverse('metrics'))
+        self.assertEqual(response.status_code, 302)
+
+
+@override_settings(
+    SLOW_QUERY_THRESHOLD_MS=0,
+    SLOW_QUERY_LOG=os.path.join(TEMP_LOG_DIR, 'slow.log'))
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_LOG_DIR, ignore_errors=True)
+
+    def setUp(self):
+        slowlog.explained.clear()
+        # иначе лента главной отдаётся из кэша без запросов
+        cache.clear()
+
+    def test_normalize(self):
+        """Литералы и списки IN сворачиваются в одну форму."""
+        self.assertEqual(
+            slowlog.normalize(
+                "SELECT * FROM t WHERE a = 'x' AND b IN (%s, %s)\n LIMIT 21"),
+            'SELECT * FROM t WHERE a = ? AND b IN (...) LIMIT ?')
+
+    def test_report_ranks_shapes_with_plan(self):
+        """Запросы view попадают в лог, отчёт показывает форму и план."""
+        Client().get(reverse('posts:index'))
+        out = StringIO()
+        call_command('slow_query_report', stdout=out)
+        report = out.getvalue()
+        self.assertIn('views: posts:index', report)
+        self.assertIn('FROM "posts_post"', report)
+        self.assertIn('SCAN', report)
+
+
+@override_settings(PROFILES_DIR=TEMP_PROFILES_DIR)
+class ProfilerTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        cls.user = User.objects.create_user(username='user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_PROFILES_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def test_header_profiles_request(self):
+        """Запрос сотрудника с X-Profile сохраняет профиль и флеймграф."""
+        self.admin_client.get(reverse('posts:index'), HTTP_X_PROFILE='1')
+        profile = RequestProfile.objects.get()
+        self.assertEqual(profile.view_name, 'posts:index')
+        self.assertEqual(profile.user, self.admin)
+        self.assertGreater(profile.query_count, 0)
+        for kind in ('prof', 'html'):
+            self.assertTrue(os.path.exists(
+                os.path.join(TEMP_PROFILES_DIR, f'{profile.name}.{kind}')))
+        response = self.admin_client.get(reverse(
+            'admin:core_requestprofile_file', args=(profile.pk, 'html')))
+        self.assertContains(response, 'class="frame"')
+
+    def test_cached_page_profiled(self):
+        """Ответ из кэша страниц тоже профилируется."""
+        for _ in range(2):
+            self.admin_client.get(reverse('posts:index'), HTTP_X_PROFILE='1')
+        self.assertEqual(RequestProfile.objects.count(), 2)
+
+    def test_signed_param_profiles_request(self):
+        self.admin_client.get(
+            reverse('posts:index'), {'_profile': profile_token()})
+        self.assertEqual(RequestProfile.objects.count(), 1)
+
+    def test_profile_not_taken(self):
+        """Неверная подпись и обычный пользователь профиль не снимают."""
+        self.admin_client.get(reverse('posts:index'), {'_profile': '1:bad'})
+        user_client = Client()
+        user_client.force_login(self.user)
+        user_client.get(reverse('posts:index'), HTTP_X_PROFILE='1')
+        self.assertFalse(RequestProfile.objects.exists())
+
+
+@override_settings(MEMORY_TRACKING=True, MEMORY_SNAPSHOT_INTERVAL=2)
+class MemoryTrackingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        tracemalloc.stop()
+
+    def setUp(self):
+        tracker.reset()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_memory_endpoint(self):
+        """Замеры по URL и рост между снимками видны на странице."""
+        for _ in range(4):
+            self.staff_client.get(reverse('posts:index'))
+        self.assertEqual(tracker.views['posts:index']['requests'], 4)
+        self.assertIsNotNone(tracker.baseline)
+        response = self.staff_client.get(reverse('memory'))
+        self.assertContains(response, 'posts:index | 4 |')
+        self.assertContains(response, 'Рост относительно первого снимка')
+
+    @override_settings(MEMORY_TRACKING=False)
+    def test_tracking_disabled(self):
+        self.staff_client.get(reverse('posts:index'))
+        self.assertEqual(tracker.views, {})
+
+    def test_memory_report_command(self):
+        out = StringIO()
+        call_command('memory_report', '/', requests=3, stdout=out)
+        self.assertIn('posts:index | 3 |', out.getvalue())
+
+
+class CachedReverseTests(TestCase):
+    def test_cached_url_tag(self):
+        """Тег даёт тот же адрес, что и {% url %}."""
+        template = Template(
+            "{% load cached_urls %}{% cached_url 'posts:profile' name %}|"
+            "{% url 'posts:profile' name %}")
+        first, second = template.render(Context({'name': 'leo'})).split('|')
+        self.assertEqual(first, second)
+
+    def test_cache_depends_on_urlconf(self):
+        self.assertEqual(cached_reverse('about:author'), '/about/author/')
+        with override_settings(ROOT_URLCONF='about.urls'):
+            self.assertEqual(cached_reverse('author'), '/author/')
+        self.assertEqual(cached_reverse('about:author'), '/about/author/')
+
+
+@override_settings(WARMUP_FEED_PAGES=2, WARMUP_GROUPS=1)
+class WarmUpTests(TransactionTestCase):
+    def test_warm_up_reports_steps(self):
+        """Все шаги выполнены, ленты прогнаны через приложение."""
+        user = User.objects.create_user(username='author')
+        group = Group.objects.create(title='Группа', slug='warm')
+        Post.objects.create(text='Текст', author=user, group=group)
+        report = warm_up(WSGIHandler())
+        steps = {name: count for name, count, _ in report}
+        self.assertEqual(
+            list(steps), ['templates', 'urls', 'thumbnails', 'feeds',
+                          'database'])
+        self.assertGreater(steps['templates'], 0)
+        self.assertGreater(steps['urls'], 0)
+        self.assertEqual(steps['feeds'], 3)
+
+
+class WarmCacheTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='author')
+        self.group = Group.objects.create(title='Группа', slug='warm')
+        self.post = Post.objects.create(
+            text='Текст', author=self.user, group=self.group)
+
+    def test_access_log_parsed(self):
+        lines = [
+            f'1.2.3.4 - - [19/Oct/2026:10:00:00 +0000] "GET {path} '
+            f'HTTP/1.1" {status} 512 "-" "agent"'
+            for path, status in [
+                ('/?page=2&utm_source=x', 200), ('/?page=2', 200),
+                ('/group/warm/', 200), ('/group/warm/', 404),
+                ('/create/', 200), ('/static/app.css', 200),
+            ]
+        ]
+        self.assertEqual(parse_access_log(lines),
+                         {'/?page=2': 2, '/group/warm/': 1})
+
+    @override_settings(HOT_URLS_FLUSH_EVERY=2)
+    def test_middleware_counts_pages(self):
+        client = Client()
+        for path in ('/', '/', f'/posts/{self.post.pk}/', '/about/author/'):
+            client.get(path)
+        self.assertEqual(hot_urls(), {'/': 2})
+
+    @override_settings(HOT_URLS_FLUSH_EVERY=1)
+    def test_middleware_skips_warmup_requests(self):
+        """Запросы прогрева не попадают в счётчик и не зовут resolve."""
+        wsgi_get(WSGIHandler(), '/group/warm/')
+        self.assertEqual(hot_urls(), {})
+        with mock.patch('core.hot.resolve') as resolve:
+            Client().get('/group/warm/?page=1&utm_source=x')
+        resolve.assert_not_called()
+        self.assertEqual(hot_urls(), {'/group/warm/': 1})
+
+    def test_command_renders_top_pages(self):
+        log = os.path.join(TEMP_LOG_DIR, 'access.log')
+        os.makedirs(TEMP_LOG_DIR, exist_ok=True)
+        with open(log, 'w') as file:
+            for path in ('/', '/', '/group/warm/', '/profile/author/'):
+                file.write(f'"GET {path} HTTP/1.1" 200 10\n')
+        out = StringIO()
+        call_command('warm_cache', log=[log], top=2, threads=2, rate=0,
+                     stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith('200 '))
+        self.assertTrue(lines[0].endswith(' /'))
+        self.assertIn('Прогрето 2 страниц', lines[-1])
+        self.assertIsNotNone(cache.get(entry_key('index_cards', [1])))
+
+
+class TaskQueueTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_METRICS_DIR, ignore_errors=True)
+
+    def setUp(self):
+        CALLS.clear()
+
+    def test_tasks_run_by_priority(self):
+        """Старший приоритет выполняется первым, готовые задачи удаляются."""
+        record_call.delay('default')
+        record_call.schedule(['low'], priority=Task.PRIORITY_LOW)
+        record_urgent.delay('high')
+        record_call.schedule(['later'], countdown=60)
+        self.assertEqual(work(), 3)
+        self.assertEqual(CALLS, ['high', 'default', 'low'])
+        self.assertEqual(Task.objects.get().name, 'core.tests.record_call')
+
+    def test_unique_schedule(self):
+        record_call.schedule([1], unique=True)
+        record_call.schedule([1], unique=True)
+        record_call.schedule([2], unique=True)
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_retry_with_backoff_then_fail(self):
+        item = always_fail.delay()
+        work()
+        item.refresh_from_db()
+        self.assertEqual(item.attempts, 1)
+        self.assertEqual(item.status, Task.STATUS_QUEUED)
+        self.assertGreater(item.run_at, timezone.now())
+        self.assertEqual(item.last_error, 'ValueError: boom')
+        Task.objects.update(run_at=timezone.now())
+        work()
+        item.refresh_from_db()
+        self.assertEqual(item.status, Task.STATUS_FAILED)
+
+    def test_expired_lease_returns_task(self):
+        """Задача упавшего воркера выполняется снова после аренды."""
+        record_call.delay('again')
+        Task.objects.update(attempts=1, run_at=timezone.now())
+        work()
+        self.assertEqual(CALLS, ['again'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_lease_counted_from_claim(self):
+        """Аренда отсчитывается от захвата задачи, а не от начала пачки."""
+        item = record_call.delay('late')
+        start = timezone.now()
+        self.assertTrue(claim(item))
+        item.refresh_from_db()
+        self.assertGreaterEqual(
+            item.run_at, start + timedelta(seconds=settings.TASK_LEASE))
+
+    def test_crashing_task_fails_after_max_attempts(self):
+        """Задача, ронявшая воркер каждый раз, больше не арендуется."""
+        record_call.delay('crash')
+        Task.objects.update(attempts=F('max_attempts'),
+                            run_at=timezone.now())
+        self.assertEqual(work(), 0)
+        self.assertEqual(CALLS, [])
+        self.assertEqual(Task.objects.get().status, Task.STATUS_FAILED)
+
+    def test_unknown_task_fails_at_once(self):
+        Task.objects.create(name='core.tests.missing', max_attempts=5,
+                            run_at=timezone.now())
+        work()
+        self.assertEqual(Task.objects.get().status, Task.STATUS_FAILED)
+
+    def test_run_workers_once(self):
+        record_call.delay(1)
+        record_call.delay(2)
+        out = StringIO()
+        call_command('run_workers', once=True, lanes='default', stdout=out)
+        self.assertIn('Выполнено задач: 2', out.getvalue())
+
+    @override_settings(METRICS_DIR=TEMP_METRICS_DIR)
+    def test_queue_depth_metric(self):
+        record_urgent.delay(1)
+        self.assertIn('yatube_task_queue_depth{lane="high"} 1',
+                      metrics.render())
+
+
+@override_settings(
+    SQLITE_WRITE_LOCK=os.path.join(TEMP_LOCK_DIR, 'write.lock'),
+    SQLITE_WRITE_RETRY_DELAY=0)
+class SQLiteTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_LOCK_DIR, ignore_errors=True)
+
+    def test_pragmas_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+    def test_write_retried_when_locked(self):
+        """Запись повторяется, если база занята; чтение не блокируется."""
+        calls = []
+
+        @serialized_write
+        def view(request):
+            calls.append(request.method)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return HttpResponse('ok')
+
+        factory = RequestFactory()
+        self.assertEqual(view(factory.post('/')).content, b'ok')
+        self.assertEqual(calls, ['POST', 'POST'])
+        self.assertTrue(os.path.exists(os.path.join(TEMP_LOCK_DIR,
+                                                    'write.lock')))
+
+    @override_settings(SQLITE_WRITE_RETRIES=1)
+    def test_other_errors_not_retried(self):
+        calls = []
+
+        @serialized_write
+        def view(request):
+            calls.append(request.method)
+            raise OperationalError('no such table: post')
+
+        with self.assertRaises(OperationalError):
+            view(RequestFactory().post('/'))
+        self.assertEqual(len(calls), 1)
+
+
+class SQLiteCacheTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.location = os.path.join(
+            TEMP_CACHE_DIR, f'{self._testMethodName}.sqlite3')
+        self.cache = SQLiteCache(self.location, {})
+
+    def test_values_shared_between_instances(self):
+        """Запись одного экземпляра (процесса) видна другому."""
+        other = SQLiteCache(self.location, {})
+        self.cache.set_many({'a': {'list': [1]}, 'b': 'текст', 'c': 2})
+        self.assertEqual(other.get_many(['a', 'b', 'c', 'd']),
+                         {'a': {'list': [1]}, 'b': 'текст', 'c': 2})
+        other.delete('a')
+        self.assertIsNone(self.cache.get('a'))
+        self.assertFalse(self.cache.add('b', 'другой'))
+        self.assertTrue(self.cache.add('d', True))
+        self.assertIs(other.get('d'), True)
+
+    def test_expired_values_missing(self):
+        self.cache.set('old', 1, timeout=0)
+        self.assertIsNone(self.cache.get('old'))
+        self.assertTrue(self.cache.add('old', 2))
+        self.assertEqual(self.cache.get('old'), 2)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_incr_atomic_across_processes(self):
+        self.cache.set('counter', 0)
+        processes = [
+            multiprocessing.Process(
+                target=increment_shared, args=(self.location,))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_cull_keeps_size_limit(self):
+        """Размер проверяется раз в CULL_EVERY записей."""
+        cache = SQLiteCache(self.location, {'OPTIONS': {
+            'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2, 'CULL_EVERY': 4}})
+        cache.set('forever', 0, timeout=None)
+        for index in range(19):
+            cache.set(f'key:{index}', index)
+        count = cache.db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        self.assertLessEqual(count, 10)
+        self.assertEqual(cache.get('forever'), 0)
+        self.assertEqual(cache.get('key:18'), 18)
+
+    def test_get_many_counted_in_metrics(self):
+        metrics.registry.values.clear()
+        cache = SQLiteMetricsCache(self.location, {
+            'OPTIONS': {'ALIAS': 'shared'}})
+        cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(len(cache.get_many(['a', 'b', 'c'])), 2)
+        values = metrics.registry.values
+        self.assertEqual(
+            values[('cache_requests_total', ('shared', 'hit'))], 2)
+        self.assertEqual(
+            values[('cache_requests_total', ('shared', 'miss'))], 1)
+
+
+class TaggedCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_fragment_cached_until_tag_bumped(self):
+        template = Template(
+            '{% load tagged_cache %}'
+            '{% tagged_cache 60 card vary tags tag extra %}'
+            '{{ value }}{% endtagged_cache %}')
+
+        def render(value, vary=1):
+            return template.render(Context({
+                'value': value, 'vary': vary,
+                'tag': 'post:1', 'extra': ['author:1', 'group:a']}))
+
+        self.assertEqual(render('old'), 'old')
+        self.assertEqual(render('new'), 'old')
+        self.assertEqual(render('new', vary=2), 'new')
+        bump('group:a')
+        self.assertEqual(render('new'), 'new')
+
+    def test_view_cached_with_tags_added_inside(self):
+        calls = []
+
+        @cache_tagged(60, lambda request: ['feed:global'])
+        def view(request):
+            calls.append(request.path)
+            add_tags(request, 'author:1')
+            return HttpResponse(str(len(calls)))
+
+        factory = RequestFactory()
+        self.assertEqual(view(factory.get('/')).content, b'1')
+        self.assertEqual(view(factory.get('/')).content, b'1')
+        bump('author:1')
+        self.assertEqual(view(factory.get('/')).content, b'2')
+        self.assertEqual(view(factory.post('/')).content, b'3')
+        self.assertEqual(view(factory.get('/')).content, b'2')
+
+
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_stale_value_served_while_locked(self):
+        """Пока значение пересчитывает другой запрос, отдаётся старое."""
+        self.assertEqual(get_or_compute('key', lambda: 'old', 60), 'old')
+        bump('feed:global')
+        get_or_compute('tagged', lambda: 'old', 60, ['feed:global'])
+        bump('feed:global')
+        cache.add('lock:tagged', 1)
+        self.assertEqual(
+            get_or_compute('tagged', lambda: 'new', 60, ['feed:global']),
+            'old')
+        cache.delete('lock:tagged')
+        self.assertEqual(
+            get_or_compute('tagged', lambda: 'new', 60, ['feed:global']),
+            'new')
+
+    @override_settings(CACHE_LOCK_WAIT=0.2, CACHE_LOCK_POLL=0.01)
+    def test_cold_key_waits_for_leader(self):
+        cache.add('lock:cold', 1)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return 'value'
+
+        # лидер так и не записал значение: запрос считает сам
+        self.assertEqual(get_or_compute('cold', compute, 60), 'value')
+        self.assertEqual(calls, [1])
+        # блокировку держит чужой запрос, её нельзя снимать
+        self.assertTrue(cache.get('lock:cold'))
+
+    @override_settings(SHARED_CACHE=False)
+    def test_not_cached_without_shared_cache(self):
+        """Сброс тегов в одном воркере не виден другим: кэша нет."""
+        get_or_compute('key', lambda: 'old', 60)
+        self.assertEqual(get_or_compute('key', lambda: 'new', 60), 'new')
+        self.assertIsNone(cache.get('key'))
+
+    @override_settings(CACHE_EARLY_REFRESH_BETA=1.0)
+    def test_early_refresh_near_expiry(self):
+        """Долгий пересчёт обновляет значение заранее."""
+        cache.set('slow', ('old', time.time() + 1, 1e6, {}), 60)
+        self.assertEqual(get_or_compute('slow', lambda: 'new', 60), 'new')
+        cache.set('quick', ('old', time.time() + 60, 0.0, {}), 60)
+        self.assertEqual(get_or_compute('quick', lambda: 'new', 60), 'old')
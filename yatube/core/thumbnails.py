@@ -0,0 +1,11 @@
+from sorl.thumbnail.base import ThumbnailBackend
+
+from .metrics import registry
+
+
+class MetricsThumbnailBackend(ThumbnailBackend):
+    """Считает реально сгенерированные миниатюры."""
+
+    def _create_thumbnail(self, *args, **kwargs):
+        registry.inc('thumbnails_generated_total')
+        return super()._create_thumbnail(*args, **kwargs)
@@ -1,5 +1,11 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from .memory import tracker
+from .metrics import render as render_metrics
+
 
 def page_not_found(request, exception):
     """Страница не найдена."""
@@ -18,3 +24,20 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+@staff_member_required
+def metrics(request):
+    """Метрики всех воркеров в формате Prometheus."""
+    return HttpResponse(
+        render_metrics(), content_type='text/plain; version=0.0.4')
+
+
+@staff_member_required
+def memory(request):
+    """Память по URL и растущие места выделения этого воркера."""
+    if not settings.MEMORY_TRACKING:
+        return HttpResponse('Замеры памяти выключены (MEMORY_TRACKING)\n',
+                            content_type='text/plain; charset=utf-8')
+    return HttpResponse(
+        tracker.report(), content_type='text/plain; charset=utf-8')
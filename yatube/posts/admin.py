@@ -1,17 +1,60 @@
+from django.conf import settings
 from django.contrib import admin
+from django.db import transaction
+from django.template.response import TemplateResponse
+from django.urls import path
 
+from core.paginator import EstimatedCountPaginator
+from core.tags import invalidate
+
+from .cache_tags import post_tag
 from .models import Comment, Follow, Group, Post
+from .simhash import duplicate_clusters
 
 EMPTY_DATA = '-пусто-'
 
 
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список без полного COUNT(*) таблицы на каждой странице."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(LargeTableAdmin):
     list_display = ('pk', 'text', 'created', 'author', 'group',)
-    list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('group',)
     search_fields = ('text',)
     list_filter = ('created',)
+    date_hierarchy = 'created'
     empty_value_display = EMPTY_DATA
+    change_list_template = 'admin/posts/post/change_list.html'
+
+    def get_urls(self):
+        return [
+            path('duplicates/',
+                 self.admin_site.admin_view(self.duplicates_view),
+                 name='posts_post_duplicates'),
+        ] + super().get_urls()
+
+    def duplicates_view(self, request):
+        """Группы почти одинаковых постов по SimHash."""
+        clusters = duplicate_clusters()
+        posts = Post.objects.select_related('author').in_bulk(
+            [post_id for cluster in clusters for post_id in cluster])
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Дубликаты постов',
+            'clusters': [
+                [posts[post_id] for post_id in cluster if post_id in posts]
+                for cluster in clusters
+            ],
+        }
+        return TemplateResponse(
+            request, 'admin/posts/post/duplicates.html', context)
 
 
 @admin.register(Group)
@@ -22,18 +65,53 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = EMPTY_DATA
 
 
+def set_active(queryset, active):
+    """Меняет active пачками по ADMIN_ACTION_BATCH_SIZE строк.
+
+    Каждая пачка — короткая транзакция, поэтому модерация тысяч
+    комментариев не держит блокировку записи. update() минует сигналы,
+    поэтому кэш страниц постов сбрасывается здесь же.
+    """
+    pending = queryset.exclude(active=active).order_by().values_list(
+        'id', 'post_id')
+    updated = 0
+    while True:
+        # изменённые строки выпадают из pending, следующая пачка — новая
+        batch = list(pending[:settings.ADMIN_ACTION_BATCH_SIZE])
+        if not batch:
+            return updated
+        with transaction.atomic():
+            updated += Comment.objects.filter(
+                id__in=[pk for pk, _ in batch]).update(active=active)
+            invalidate(*{post_tag(post_id) for _, post_id in batch})
+
+
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
-    list_display = ('text', 'author', 'post', 'created',)
-    list_filter = ('created',)
-    search_fields = ('author', 'text')
-    actions = ['approve_comments']
+class CommentAdmin(LargeTableAdmin):
+    list_display = ('text', 'author', 'post', 'created', 'active',)
+    list_select_related = ('author', 'post')
+    raw_id_fields = ('author', 'post')
+    list_filter = ('active', 'created')
+    search_fields = ('=author__username', 'text')
+    date_hierarchy = 'created'
+    actions = ('approve_comments', 'hide_comments')
 
     def approve_comments(self, request, queryset):
-        queryset.update(active=True)
+        updated = set_active(queryset, True)
+        self.message_user(request, f'Опубликовано комментариев: {updated}')
+    approve_comments.short_description = 'Опубликовать комментарии'
+
+    def hide_comments(self, request, queryset):
+        updated = set_active(queryset, False)
+        self.message_user(request, f'Скрыто комментариев: {updated}')
+    hide_comments.short_description = 'Скрыть комментарии'
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     list_display = ('user', 'author',)
-    list_filter = ('user', 'author')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    # точное совпадение идёт по индексу username, фильтр по всем
+    # пользователям в боковой панели не нужен
+    search_fields = ('=user__username', '=author__username')
@@ -0,0 +1,47 @@
+from django.db import transaction
+from django.http import Http404
+
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+
+POST_FIELDS = ('id', 'created', 'text', 'author_id', 'group_id', 'image')
+COMMENT_FIELDS = ('id', 'created', 'post_id', 'author_id', 'text',
+                  'active')
+
+
+def archive_posts(before, batch_size=500):
+    """Переносит посты старше ``before`` вместе с комментариями в архив.
+
+    Каждая пачка переносится в своей транзакции. Возвращает число
+    перенесённых постов.
+    """
+    total = 0
+    while True:
+        ids = list(
+            Post.objects.filter(created__lt=before)
+            .order_by('created')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return total
+        with transaction.atomic():
+            ArchivedPost.objects.bulk_create(
+                ArchivedPost(**values) for values in
+                Post.objects.filter(id__in=ids).values(*POST_FIELDS)
+            )
+            ArchivedComment.objects.bulk_create(
+                ArchivedComment(**values) for values in
+                Comment.objects.filter(post_id__in=ids).values(
+                    *COMMENT_FIELDS)
+            )
+            Post.objects.filter(id__in=ids).delete()
+        total += len(ids)
+
+
+def get_post_or_archived(post_id):
+    """Ищет пост в горячей таблице, затем в архиве."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        post = ArchivedPost.objects.filter(pk=post_id).first()
+    if post is None:
+        raise Http404('Пост не найден')
+    return post
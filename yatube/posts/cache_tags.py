@@ -0,0 +1,24 @@
+FEED_TAG = 'feed:global'
+
+
+def post_tag(post_id):
+    return f'post:{post_id}'
+
+
+def author_tag(author_id):
+    return f'author:{author_id}'
+
+
+def group_tag(group_id):
+    return f'group:{group_id}'
+
+
+def page_tags(posts):
+    """Зависимости карточек постов: сам пост, его автор и группа."""
+    tags = set()
+    for post in posts:
+        tags.add(post_tag(post.pk))
+        tags.add(author_tag(post.author_id))
+        if post.group_id is not None:
+            tags.add(group_tag(post.group_id))
+    return sorted(tags)
@@ -0,0 +1,112 @@
+import json
+import re
+import zipfile
+from urllib.parse import quote
+
+from django.core.files.storage import default_storage
+from django.db.models import Q
+
+from .models import ArchivedComment, ArchivedPost, Comment, Follow, Post
+
+# сколько байт копить перед отдачей очередной порции клиенту
+CHUNK_SIZE = 64 * 1024
+
+POST_FIELDS = ('id', 'created', 'text', 'group__slug', 'image')
+COMMENT_FIELDS = ('id', 'created', 'post_id', 'text')
+
+
+def content_disposition(filename):
+    """Заголовок вложения по RFC 6266: ASCII-имя для старых клиентов и
+    полное имя в UTF-8 в filename* (RFC 5987).
+    """
+    fallback = re.sub(r'[^\x20-\x7e]|["\\]', '_', filename)
+    return (f'attachment; filename="{fallback}"; '
+            f"filename*=UTF-8''{quote(filename, safe='')}")
+
+
+class StreamBuffer:
+    """Файлоподобный приёмник для ZipFile без поддержки seek.
+
+    ZipFile пишет в него архив, а генератор забирает накопленные байты.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+def user_sections(user):
+    """Пары (имя файла в архиве, итератор строк) с данными пользователя."""
+    return [
+        ('posts.json', Post.objects.filter(author=user)
+         .values(*POST_FIELDS).iterator()),
+        ('archived_posts.json', ArchivedPost.objects.filter(author=user)
+         .values(*POST_FIELDS).iterator()),
+        ('comments.json', Comment.objects.filter(author=user)
+         .values(*COMMENT_FIELDS).iterator()),
+        ('archived_comments.json', ArchivedComment.objects.filter(
+            author=user).values(*COMMENT_FIELDS).iterator()),
+        ('follows.json', Follow.objects.filter(Q(user=user) | Q(author=user))
+         .values('user__username', 'author__username').iterator()),
+    ]
+
+
+def user_images(user):
+    for model in (Post, ArchivedPost):
+        images = (
+            model.objects.filter(author=user).exclude(image='')
+            .values_list('image', flat=True)
+        )
+        yield from images.iterator()
+
+
+def export_archive(user):
+    """Генератор zip-архива с данными пользователя.
+
+    В памяти держится не больше одной порции архива, поэтому размер
+    выгрузки не зависит от числа постов.
+    """
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, rows in user_sections(user):
+            with archive.open(name, 'w') as entry:
+                entry.write(b'[')
+                for index, row in enumerate(rows):
+                    if index:
+                        entry.write(b',\n')
+                    entry.write(json.dumps(
+                        row, default=str, ensure_ascii=False).encode())
+                    if buffer.size >= CHUNK_SIZE:
+                        yield buffer.pop()
+                entry.write(b']')
+            yield buffer.pop()
+        for name in user_images(user):
+            if not default_storage.exists(name):
+                continue
+            with default_storage.open(name) as source, \
+                    archive.open(name, 'w') as entry:
+                for chunk in source.chunks(CHUNK_SIZE):
+                    entry.write(chunk)
+                    if buffer.size >= CHUNK_SIZE:
+                        yield buffer.pop()
+            yield buffer.pop()
+    yield buffer.pop()
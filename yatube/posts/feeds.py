@@ -0,0 +1,89 @@
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .models import Post
+from .utils import ChainedSequence
+
+# порядок лент; id разводит посты с одинаковым временем
+FEED_ORDER = ('-created', '-id')
+
+
+def card_queryset(queryset):
+    return queryset.select_related('author', 'group').order_by(*FEED_ORDER)
+
+
+def index_feed():
+    return [card_queryset(Post.objects.all())]
+
+
+def group_feed(group):
+    return [card_queryset(group.posts.all())]
+
+
+def profile_feed(author):
+    """Горячие посты автора, затем архивные."""
+    return [card_queryset(author.posts.all()),
+            card_queryset(author.archived_posts.all())]
+
+
+def follow_feed(user):
+    return [card_queryset(Post.objects.filter(author__following__user=user))]
+
+
+def feed_sequence(segments):
+    """Лента для пагинатора страниц."""
+    if len(segments) == 1:
+        return segments[0]
+    return ChainedSequence(*segments)
+
+
+def encode_cursor(segment, post):
+    data = [segment, post.created.isoformat(), post.pk]
+    return urlsafe_base64_encode(json.dumps(data).encode())
+
+
+def decode_cursor(cursor, segments):
+    """(сегмент, время, id) из курсора; ValueError, если он испорчен.
+
+    Номер сегмента должен попадать в ленту из segments сегментов.
+    """
+    try:
+        segment, created, pk = json.loads(
+            force_str(urlsafe_base64_decode(cursor)))
+        created = parse_datetime(created)
+    except (TypeError, ValueError) as error:
+        raise ValueError('Неверный курсор') from error
+    if created is None or not isinstance(segment, int) or (
+            not isinstance(pk, int)) or not 0 <= segment < segments:
+        raise ValueError('Неверный курсор')
+    return segment, created, pk
+
+
+def keyset_page(segments, cursor, size):
+    """Страница ленты после курсора и курсор следующей страницы.
+
+    В отличие от номера страницы курсор не сдвигается, когда в начало
+    ленты добавляются новые посты, и не требует OFFSET и COUNT.
+    """
+    start, created, pk = 0, None, None
+    if cursor:
+        start, created, pk = decode_cursor(cursor, len(segments))
+    found = []
+    for index in range(start, len(segments)):
+        queryset = segments[index]
+        if index == start and created is not None:
+            queryset = queryset.filter(
+                Q(created__lt=created) | Q(created=created, id__lt=pk))
+        found += [(index, post)
+                  for post in queryset[:size + 1 - len(found)]]
+        if len(found) > size:
+            break
+    page = found[:size]
+    next_cursor = None
+    if len(found) > size:
+        next_cursor = encode_cursor(*page[-1])
+    return [post for _, post in page], next_cursor
@@ -1,9 +1,25 @@
+import uuid
+from datetime import timedelta
+
 from django import forms
+from django.conf import settings
+from django.utils import timezone
 
 from .models import Comment, Post
+from .simhash import near_duplicates
+from .uploads import finished_upload, open_upload
 
 
 class PostForm(forms.ModelForm):
+    # токен загрузки частями приходит скрытым полем вне списка полей формы
+    UPLOAD_TOKEN = 'upload_token'
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+        self.upload = None
+        self.upload_file = None
+
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
@@ -11,6 +27,77 @@ class PostForm(forms.ModelForm):
             'text': forms.Textarea(attrs={'required': True})
         }
 
+    def clean_text(self):
+        text = self.cleaned_data['text']
+        since = timezone.now() - timedelta(
+            hours=settings.SIMHASH_WINDOW_HOURS)
+        duplicates = near_duplicates(
+            text, exclude=self.instance.pk, since=since)
+        if len(duplicates) >= settings.SIMHASH_MAX_DUPLICATES:
+            raise forms.ValidationError(
+                'Почти такой же текст недавно публиковался несколько раз')
+        return text
+
+    def clean(self):
+        """Картинка, загруженная частями, подставляется по токену."""
+        cleaned_data = super().clean()
+        token = self.data.get(self.UPLOAD_TOKEN)
+        if not token:
+            return cleaned_data
+        try:
+            upload = finished_upload(uuid.UUID(token), self.user)
+        except ValueError:
+            upload = None
+        if upload is None:
+            self.add_error(None, 'Загрузка картинки не найдена или не '
+                                 'завершена')
+            return cleaned_data
+        image = open_upload(upload)
+        try:
+            cleaned_data['image'] = self.fields['image'].clean(
+                image, self.initial.get('image'))
+        except forms.ValidationError as error:
+            image.close()
+            self.add_error('image', error)
+        else:
+            self.upload = upload
+            self.upload_file = image
+        return cleaned_data
+
+    def full_clean(self):
+        super().full_clean()
+        if self._errors and self.upload_file is not None:
+            # форму отклонила другая проверка: загрузка остаётся целой
+            self.upload_file.close()
+            self.upload = self.upload_file = None
+
+    def save(self, commit=True):
+        """С commit=False загрузка удаляется в save_m2m, после поста.
+
+        Пока пост не сохранён, файл загрузки ещё не перенесён в
+        MEDIA_ROOT, и purge_uploads не должен счесть его брошенным.
+        """
+        post = super().save(commit)
+        if self.upload is None:
+            return post
+        if commit:
+            self.forget_upload()
+            return post
+        save_m2m = self.save_m2m
+
+        def save_m2m_and_forget_upload():
+            save_m2m()
+            self.forget_upload()
+
+        self.save_m2m = save_m2m_and_forget_upload
+        return post
+
+    def forget_upload(self):
+        # файл уже перенесён в MEDIA_ROOT вместе с постом
+        self.upload_file.close()
+        self.upload.delete()
+        self.upload = self.upload_file = None
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,203 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Follow
+
+VERSION_KEY = 'follow_graph:version'
+# журнал изменений: запись на каждый сдвиг метки
+CHANGE_KEY = 'follow_graph:change:{}'
+EMPTY = array('q')
+
+
+def contains(items, value):
+    index = bisect_left(items, value)
+    return index < len(items) and items[index] == value
+
+
+def intersect(first, second):
+    """Пересечение двух отсортированных массивов слиянием."""
+    result = array('q')
+    i = j = 0
+    while i < len(first) and j < len(second):
+        if first[i] == second[j]:
+            result.append(first[i])
+            i += 1
+            j += 1
+        elif first[i] < second[j]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def discard(items, value):
+    index = bisect_left(items, value)
+    if index < len(items) and items[index] == value:
+        del items[index]
+
+
+class FollowGraph:
+    """Граф подписок процесса в виде отсортированных массивов id.
+
+    following[user] — на кого подписан пользователь, followers[author] —
+    кто подписан на автора. Версия графа сверяется с меткой в кэше;
+    изменения из других воркеров догоняются по журналу в кэше, а если
+    журнал неполон или слишком длинен, граф перестраивается.
+    """
+
+    def __init__(self):
+        self.following = {}
+        self.followers = {}
+        self.version = None
+        self.lock = threading.RLock()
+
+    def build(self, version):
+        following = defaultdict(lambda: array('q'))
+        followers = defaultdict(lambda: array('q'))
+        rows = (
+            Follow.objects.order_by('user_id', 'author_id')
+            .values_list('user_id', 'author_id')
+        )
+        for user_id, author_id in rows.iterator():
+            following[user_id].append(author_id)
+            # пользователи идут по возрастанию, массивы остаются
+            # отсортированными
+            followers[author_id].append(user_id)
+        with self.lock:
+            self.following = dict(following)
+            self.followers = dict(followers)
+            self.version = version
+
+    def refresh(self, version):
+        """Догоняет метку по журналу, иначе перестраивает граф."""
+        with self.lock:
+            behind = (version - self.version
+                      if self.version is not None else 0)
+            if 0 < behind <= settings.FOLLOW_GRAPH_LOG_SIZE:
+                keys = [CHANGE_KEY.format(number)
+                        for number in range(self.version + 1, version + 1)]
+                changes = cache.get_many(keys)
+                if len(changes) == len(keys):
+                    for key in keys:
+                        user_id, author_id, added = changes[key]
+                        if added:
+                            self.add(user_id, author_id)
+                        else:
+                            self.remove(user_id, author_id)
+                    self.version = version
+                    return
+            self.build(version)
+
+    def follows(self, user_id, author_id):
+        return contains(self.following.get(user_id, EMPTY), author_id)
+
+    def following_of(self, user_id):
+        return self.following.get(user_id, EMPTY)
+
+    def followers_of(self, author_id):
+        return self.followers.get(author_id, EMPTY)
+
+    def following_count(self, user_id):
+        return len(self.following_of(user_id))
+
+    def followers_count(self, author_id):
+        return len(self.followers_of(author_id))
+
+    def mutuals(self, user_id):
+        """Пользователи, подписанные друг на друга с user_id."""
+        return intersect(self.following_of(user_id),
+                         self.followers_of(user_id))
+
+    def add(self, user_id, author_id):
+        with self.lock:
+            following = self.following.setdefault(user_id, array('q'))
+            if not contains(following, author_id):
+                insort(following, author_id)
+                insort(self.followers.setdefault(author_id, array('q')),
+                       user_id)
+
+    def remove(self, user_id, author_id):
+        with self.lock:
+            discard(self.following.get(user_id, array('q')), author_id)
+            discard(self.followers.get(author_id, array('q')), user_id)
+
+
+class DatabaseFollows:
+    """Те же вопросы, что и к графу, но запросами к таблице подписок.
+
+    Без общего кэша граф процесса не узнаёт о подписках из других
+    воркеров, поэтому ответы берутся из базы.
+    """
+
+    def follows(self, user_id, author_id):
+        return Follow.objects.filter(
+            user_id=user_id, author_id=author_id).exists()
+
+    def following_of(self, user_id):
+        return array('q', Follow.objects.filter(user_id=user_id).order_by(
+            'author_id').values_list('author_id', flat=True))
+
+    def followers_of(self, author_id):
+        return array('q', Follow.objects.filter(
+            author_id=author_id).order_by('user_id').values_list(
+                'user_id', flat=True))
+
+    def following_count(self, user_id):
+        return Follow.objects.filter(user_id=user_id).count()
+
+    def followers_count(self, author_id):
+        return Follow.objects.filter(author_id=author_id).count()
+
+    def mutuals(self, user_id):
+        return intersect(self.following_of(user_id),
+                         self.followers_of(user_id))
+
+
+graph = FollowGraph()
+database_follows = DatabaseFollows()
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # после очистки кэша метка начинается с нового значения, чтобы
+        # все воркеры перестроили граф
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def follow_graph():
+    """Граф подписок, догнавший метку; без SHARED_CACHE — запросы к БД."""
+    if not settings.SHARED_CACHE:
+        return database_follows
+    version = current_version()
+    if graph.version != version:
+        graph.refresh(version)
+    return graph
+
+
+def apply_change(user_id, author_id, added):
+    """Сдвигает метку и пишет изменение в журнал под её новым значением.
+
+    Локальный граф догоняет метку сразу, остальные воркеры — при
+    следующем обращении. Подписки, изменённые в обход сигналов, граф
+    не видит, пока метка не сдвинется без записи в журнале.
+    """
+    if not settings.SHARED_CACHE:
+        return
+    try:
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        # метки нет: все воркеры перестроят граф по новой
+        return
+    cache.set(CHANGE_KEY.format(version), (user_id, author_id, added),
+              settings.FOLLOW_GRAPH_LOG_TIMEOUT)
+    if graph.version is not None:
+        graph.refresh(version)
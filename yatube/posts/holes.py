@@ -0,0 +1,40 @@
+from django.template.loader import render_to_string
+
+from core.pagecache import hole
+
+from .forms import CommentForm
+from .graph import follow_graph
+
+
+@hole('feed_tabs')
+def feed_tabs(request):
+    return render_to_string('posts/includes/switcher.html', request=request)
+
+
+@hole('follow_button')
+def follow_button(request, author_id, username):
+    user = request.user
+    context = {
+        'username': username,
+        'is_author': user.pk == author_id,
+        'following': (user.is_authenticated
+                      and follow_graph().follows(user.pk, author_id)),
+    }
+    return render_to_string(
+        'posts/includes/follow_button.html', context, request)
+
+
+@hole('edit_button')
+def edit_button(request, post_id, author_id):
+    context = {'post_id': post_id, 'is_author': request.user.pk == author_id}
+    return render_to_string(
+        'posts/includes/edit_button.html', context, request)
+
+
+@hole('comment_form')
+def comment_form(request, post_id):
+    if not request.user.is_authenticated:
+        return ''
+    context = {'post_id': post_id, 'form': CommentForm()}
+    return render_to_string(
+        'posts/includes/comment_form.html', context, request)
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post, SimHashBand
+from posts.simhash import band_rows
+
+
+class Command(BaseCommand):
+    help = 'Считает SimHash для постов, у которых его ещё нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько постов обрабатывать за один проход')
+
+    def handle(self, *args, **options):
+        posts = (
+            Post.objects.filter(simhash_bands__isnull=True)
+            .order_by('id').values_list('id', 'text')
+        )
+        total = last_id = 0
+        while True:
+            batch = list(
+                posts.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            SimHashBand.objects.bulk_create(
+                row for post_id, text in batch
+                for row in band_rows(post_id, text)
+            )
+            total += len(batch)
+            last_id = batch[-1][0]
+        self.stdout.write(f'Обработано постов: {total}')
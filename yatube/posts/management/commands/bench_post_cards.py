@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+from django.template.loader import get_template
+
+from posts.models import Group, Post, User
+
+# ссылки карточки так, как они строились до кэша адресов
+URL_TAGS = (
+    "{% for post in page_obj %}"
+    "{% url 'posts:profile' post.author.username %}"
+    "{% url 'posts:post_detail' post.pk %}"
+    "{% url 'posts:group_posts' post.group.slug %}"
+    "{% endfor %}"
+)
+CACHED_LINKS = (
+    "{% for post in page_obj %}"
+    "{{ post.author_url }}{{ post.absolute_url }}"
+    "{{ post.group.absolute_url }}"
+    "{% endfor %}"
+)
+
+
+def make_posts(count):
+    """Несохранённые посты: замер не зависит от базы данных."""
+    group = Group(pk=1, title='Группа', slug='bench-group')
+    return [
+        Post(pk=index, text='Текст поста ' * 20, group=group,
+             author=User(pk=index % 10, username=f'author{index % 10}'))
+        for index in range(1, count + 1)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Время построения ссылок и рендеринга одной карточки поста'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=10,
+            help='Сколько карточек на странице')
+        parser.add_argument(
+            '--repeat', type=int, default=200,
+            help='Сколько раз отрендерить страницу')
+
+    def measure(self, template, count, repeat):
+        total = 0
+        for _ in range(repeat):
+            # новые объекты, чтобы cached_property не переживали страницу
+            context = Context({'page_obj': make_posts(count)})
+            start = time.perf_counter()
+            template.render(context)
+            total += time.perf_counter() - start
+        return total / (count * repeat) * 1e6
+
+    def handle(self, *args, **options):
+        count, repeat = options['posts'], options['repeat']
+        results = (
+            ('ссылки через {% url %}', Template(URL_TAGS)),
+            ('ссылки из кэша адресов', Template(CACHED_LINKS)),
+            ('карточка post_cycle.html',
+             get_template('posts/includes/post_cycle.html').template),
+        )
+        for title, template in results:
+            template.render(Context({'page_obj': make_posts(count)}))
+            self.stdout.write(
+                f'{title}: '
+                f'{self.measure(template, count, repeat):.1f} мкс на карточку')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts.related import rebuild_related, update_related
+
+
+class Command(BaseCommand):
+    help = ('Считает похожие посты по TF-IDF '
+            '(по умолчанию только новые и изменённые)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать соседей для всех постов')
+        parser.add_argument(
+            '--top', type=int, default=None,
+            help='Сколько похожих постов хранить для каждого поста')
+        parser.add_argument(
+            '--block-size', type=int, default=None,
+            help='Сколько строк матрицы обрабатывать за один блок')
+
+    def handle(self, *args, **options):
+        build = rebuild_related if options['full'] else update_related
+        total = build(options['top'], options['block_size'])
+        self.stdout.write(f'Обработано постов: {total}')
@@ -0,0 +1,65 @@
+import multiprocessing
+import time
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.snapshot import (copy_asset, export_page, init_worker,
+                            page_fingerprints, read_manifest, remove_pages,
+                            write_manifest)
+
+
+class Command(BaseCommand):
+    help = ('Сохраняет главную, страницы групп, профилей и постов в HTML '
+            'вместе с миниатюрами; по умолчанию только изменившиеся')
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Каталог для веб-сервера')
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help='Сколько процессов рендерят страницы (по умолчанию по '
+                 'числу ядер), 1 — без пула')
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Перерендерить все страницы, например после правки шаблонов')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        start = time.perf_counter()
+        pages = page_fingerprints()
+        exported = {} if options['full'] else read_manifest(output)
+        stale = [path for path, fingerprint in pages.items()
+                 if exported.get(path) != fingerprint]
+        removed = [path for path in exported if path not in pages]
+        remove_pages(output, removed)
+        for path in removed:
+            del exported[path]
+
+        render = partial(export_page, output)
+        processes = options['processes'] or multiprocessing.cpu_count()
+        if processes > 1 and len(stale) > 1:
+            # соединения с БД не должны наследоваться дочерними процессами
+            connections.close_all()
+            with multiprocessing.Pool(processes, init_worker) as pool:
+                results = list(pool.imap_unordered(render, stale, 16))
+        else:
+            results = map(render, stale)
+
+        assets = set()
+        failed = 0
+        for path, status, urls in results:
+            if status == 200:
+                exported[path] = pages[path]
+                assets.update(urls)
+            else:
+                exported.pop(path, None)
+                failed += 1
+                self.stderr.write(f'{status} {path}')
+        copied = sum(copy_asset(output, url) for url in sorted(assets))
+        write_manifest(output, exported)
+        self.stdout.write(
+            f'Страниц: {len(pages)}, отрендерено: {len(stale) - failed}, '
+            f'ошибок: {failed}, удалено: {len(removed)}, '
+            f'скопировано файлов: {copied} '
+            f'за {time.perf_counter() - start:.1f} с')
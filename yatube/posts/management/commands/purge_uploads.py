@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.uploads import expire_uploads
+
+
+class Command(BaseCommand):
+    help = 'Удаляет брошенные загрузки картинок частями'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=int, default=None,
+            help='Возраст загрузки в часах (по умолчанию '
+                 'CHUNKED_UPLOAD_EXPIRE_HOURS)')
+
+    def handle(self, *args, **options):
+        removed = expire_uploads(options['hours'])
+        self.stdout.write(f'Удалено файлов: {removed}')
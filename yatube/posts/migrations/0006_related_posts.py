@@ -0,0 +1,22 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedPosts',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='related', serialize=False, to='posts.Post')),
+                ('neighbours', models.TextField(verbose_name='Похожие посты')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата расчёта')),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_related_posts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimHashBand',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField(verbose_name='Номер полосы')),
+                ('value', models.PositiveIntegerField(verbose_name='Значение полосы')),
+                ('simhash', models.BigIntegerField(verbose_name='SimHash текста')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='simhash_bands', to='posts.Post')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='simhashband',
+            index=models.Index(fields=['band', 'value'], name='posts_simha_band_9260ef_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-19 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_timeline_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='active',
+            field=models.BooleanField(default=True, verbose_name='Опубликован'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='active',
+            field=models.BooleanField(default=True, help_text='Скрытые модератором комментарии не показываются', verbose_name='Опубликован'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'active', '-created'], name='posts_comme_post_id_2b8f5f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['-created', '-id'], name='posts_comme_created_17ca0b_idx'),
+        ),
+    ]
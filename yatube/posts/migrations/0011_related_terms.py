@@ -0,0 +1,47 @@
+# Generated by Django 2.2.16 on 2026-10-19 12:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def mark_stale(apps, schema_editor):
+    """Соседи, посчитанные до появления словаря, будут пересчитаны."""
+    apps.get_model('posts', 'RelatedPosts').objects.update(stale=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_comment_moderation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.CharField(max_length=100, unique=True, verbose_name='Слово')),
+                ('df', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='relatedposts',
+            name='norm',
+            field=models.FloatField(default=0, verbose_name='Норма TF-IDF вектора'),
+        ),
+        migrations.AddField(
+            model_name='relatedposts',
+            name='stale',
+            field=models.BooleanField(default=False, help_text='Пост изменён после расчёта и будет пересчитан', verbose_name='Устарело'),
+        ),
+        migrations.CreateModel(
+            name='RelatedPosting',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tf', models.PositiveIntegerField(verbose_name='Число вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_postings', to='posts.Post')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='posts.RelatedTerm')),
+            ],
+        ),
+        migrations.RunPython(mark_stale, migrations.RunPython.noop),
+    ]
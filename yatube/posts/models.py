@@ -1,12 +1,37 @@
+import os
+import uuid
+
 from core.models import CreatedModel
+from core.reverse import cached_reverse
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils.functional import cached_property
 
 from .validators import validate_empty
 
 User = get_user_model()
 
 
+class AuthorLinkMixin:
+    """Ссылка на профиль автора, вычисляемая один раз на объект."""
+
+    @cached_property
+    def author_url(self):
+        return cached_reverse('posts:profile', self.author.username)
+
+
+class PostLinkMixin(AuthorLinkMixin):
+    """Ссылки карточки поста для шаблонов."""
+
+    @cached_property
+    def absolute_url(self):
+        return cached_reverse('posts:post_detail', self.pk)
+
+    def get_absolute_url(self):
+        return self.absolute_url
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
@@ -15,8 +40,15 @@ class Group(models.Model):
     def __str__(self) -> str:
         return self.title
 
+    @cached_property
+    def absolute_url(self):
+        return cached_reverse('posts:group_posts', self.slug)
+
+    def get_absolute_url(self):
+        return self.absolute_url
 
-class Post(CreatedModel):
+
+class Post(PostLinkMixin, CreatedModel):
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст поста',
@@ -44,14 +76,22 @@ class Post(CreatedModel):
         blank=True
     )
 
+    is_archived = False
+
     def __str__(self):
         return self.text[:15]
 
     class Meta:
         ordering = ['-created']
+        # списки id лент собираются по этим индексам без сортировки
+        indexes = [
+            models.Index(fields=['-created', '-id']),
+            models.Index(fields=['author', '-created', '-id']),
+            models.Index(fields=['group', '-created', '-id']),
+        ]
 
 
-class Comment(CreatedModel):
+class Comment(AuthorLinkMixin, CreatedModel):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -67,9 +107,19 @@ class Comment(CreatedModel):
         max_length=200,
         validators=[validate_empty]
     )
+    active = models.BooleanField(
+        'Опубликован',
+        default=True,
+        help_text='Скрытые модератором комментарии не показываются'
+    )
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            # комментарии поста и иерархия дат в админке
+            models.Index(fields=['post', 'active', '-created']),
+            models.Index(fields=['-created', '-id']),
+        ]
 
 
 class Follow(models.Model):
@@ -86,3 +136,150 @@ class Follow(models.Model):
 
     class Meta:
         unique_together = ['user', 'author']
+
+
+class ArchivedPost(PostLinkMixin, models.Model):
+    """Старый пост, перенесённый из горячей таблицы командой archive_posts.
+
+    Идентификатор сохраняется, поэтому ссылки на пост продолжают работать.
+    """
+    id = models.IntegerField(primary_key=True)
+    created = models.DateTimeField('Дата создания', db_index=True)
+    archived = models.DateTimeField('Дата архивации', auto_now_add=True)
+    text = models.TextField('Текст поста')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='Автор'
+    )
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        related_name='archived_posts',
+        on_delete=models.SET_NULL,
+        verbose_name='Группа',
+    )
+    image = models.ImageField('Картинка', upload_to='posts/', blank=True)
+
+    is_archived = True
+
+    def __str__(self):
+        return self.text[:15]
+
+    class Meta:
+        ordering = ['-created']
+
+
+class ArchivedComment(AuthorLinkMixin, models.Model):
+    id = models.IntegerField(primary_key=True)
+    created = models.DateTimeField('Дата создания')
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments'
+    )
+    text = models.TextField('Текст комментария')
+    active = models.BooleanField('Опубликован', default=True)
+
+    class Meta:
+        ordering = ['-created']
+
+
+class RelatedPosts(models.Model):
+    """Ближайшие по TF-IDF посты, посчитанные командой build_related_posts.
+
+    neighbours хранит JSON-список пар [id поста, косинусная близость].
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='related'
+    )
+    neighbours = models.TextField('Похожие посты')
+    norm = models.FloatField('Норма TF-IDF вектора', default=0)
+    stale = models.BooleanField(
+        'Устарело',
+        default=False,
+        help_text='Пост изменён после расчёта и будет пересчитан'
+    )
+    updated = models.DateTimeField('Дата расчёта', auto_now=True)
+
+
+class RelatedTerm(models.Model):
+    """Слово словаря TF-IDF и число постов, в которых оно встречается."""
+    text = models.CharField('Слово', max_length=100, unique=True)
+    df = models.PositiveIntegerField('Число постов', default=0)
+
+
+class RelatedPosting(models.Model):
+    """Вхождение слова в пост — строка инвертированного индекса TF-IDF."""
+    term = models.ForeignKey(
+        RelatedTerm,
+        on_delete=models.CASCADE,
+        related_name='postings'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='related_postings'
+    )
+    tf = models.PositiveIntegerField('Число вхождений')
+
+
+class SimHashBand(models.Model):
+    """Одна 16-битная полоса 64-битного SimHash текста поста.
+
+    Посты, чьи хэши отличаются не более чем в трёх битах, обязательно
+    совпадают хотя бы в одной из четырёх полос, поэтому поиск похожих
+    сводится к выборке по индексу (band, value).
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='simhash_bands'
+    )
+    band = models.PositiveSmallIntegerField('Номер полосы')
+    value = models.PositiveIntegerField('Значение полосы')
+    simhash = models.BigIntegerField('SimHash текста')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['band', 'value']),
+        ]
+
+
+class ChunkedUpload(CreatedModel):
+    """Картинка, загружаемая частями до создания поста.
+
+    Части дописываются в файл в CHUNKED_UPLOAD_DIR, готовый файл
+    прикрепляется к посту по токену.
+    """
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='chunked_uploads',
+        verbose_name='Пользователь'
+    )
+    filename = models.CharField('Имя файла', max_length=255)
+    size = models.PositiveIntegerField('Размер, байт')
+    offset = models.PositiveIntegerField('Получено, байт', default=0)
+
+    def __str__(self):
+        return self.filename
+
+    @property
+    def path(self):
+        return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{self.token}.part')
+
+    @property
+    def is_complete(self):
+        return self.offset == self.size
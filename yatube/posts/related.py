@@ -0,0 +1,261 @@
+import heapq
+import json
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import Post, RelatedPosting, RelatedPosts, RelatedTerm
+
+TOKEN_RE = re.compile(r'\w{3,}')
+# слишком частые слова не различают посты, но раздувают индекс
+MAX_DF = 0.5
+MAX_TERM = RelatedTerm._meta.get_field('text').max_length
+# SQLite до 3.32 принимает не больше 999 параметров в запросе
+IN_BATCH = 500
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def blocks(indices, size):
+    for start in range(0, len(indices), size):
+        yield indices[start:start + size]
+
+
+def shift_df(counts, sign):
+    """Меняет df слов: counts — {id слова: на сколько постов}.
+
+    Одно UPDATE на каждое различное значение сдвига.
+    """
+    by_shift = defaultdict(list)
+    for term_id, count in counts.items():
+        by_shift[count].append(term_id)
+    for count, term_ids in by_shift.items():
+        for block in blocks(term_ids, IN_BATCH):
+            RelatedTerm.objects.filter(pk__in=block).update(
+                df=F('df') + sign * count)
+
+
+def forget_terms(post_ids):
+    """Убирает посты из словаря перед удалением или переиндексацией."""
+    postings = RelatedPosting.objects.filter(post_id__in=post_ids)
+    shift_df(Counter(postings.values_list('term_id', flat=True)), -1)
+    postings.delete()
+
+
+def known_terms(words):
+    """{слово: id} для слов, уже записанных в словарь."""
+    words = sorted(words)
+    ids = {}
+    for block in blocks(words, IN_BATCH):
+        ids.update(RelatedTerm.objects.filter(
+            text__in=block).values_list('text', 'id'))
+    return ids
+
+
+def term_ids(words):
+    """{слово: id} с добавлением новых слов в словарь."""
+    ids = known_terms(words)
+    RelatedTerm.objects.bulk_create(
+        [RelatedTerm(text=word) for word in words - ids.keys()],
+        ignore_conflicts=True)
+    return known_terms(words)
+
+
+def index_terms(post_ids):
+    """Записывает вхождения слов постов и обновляет df словаря."""
+    forget_terms(post_ids)
+    counts = {
+        post_id: Counter(
+            token for token in tokenize(text) if len(token) <= MAX_TERM)
+        for post_id, text in Post.objects.filter(
+            id__in=post_ids).values_list('id', 'text')
+    }
+    ids = term_ids({token for row in counts.values() for token in row})
+    RelatedPosting.objects.bulk_create(
+        RelatedPosting(term_id=ids[token], post_id=post_id, tf=tf)
+        for post_id, row in counts.items() for token, tf in row.items()
+    )
+    shift_df(Counter(
+        ids[token] for row in counts.values() for token in row), 1)
+
+
+class Weights:
+    """Веса TF-IDF по сохранённому словарю.
+
+    Слова, встречающиеся больше чем в RELATED_POSTING_LIMIT постах или
+    в половине всех постов, не различают посты и пропускаются — так
+    длина читаемого списка вхождений слова ограничена.
+    """
+
+    def __init__(self):
+        self.total = Post.objects.count()
+        self.limit = max(
+            min(settings.RELATED_POSTING_LIMIT, MAX_DF * self.total), 2)
+
+    def weight(self, tf, df):
+        if not 0 < df <= self.limit:
+            return 0
+        return (1 + math.log(tf)) * (
+            math.log((1 + self.total) / (1 + df)) + 1)
+
+    def vectors(self, post_ids):
+        """{id поста: ({id слова: вес}, норма)} по записанным вхождениям."""
+        rows = defaultdict(dict)
+        for post_id, term_id, tf, df in RelatedPosting.objects.filter(
+                post_id__in=post_ids).values_list(
+                    'post_id', 'term_id', 'tf', 'term__df'):
+            weight = self.weight(tf, df)
+            if weight:
+                rows[post_id][term_id] = weight
+        return {
+            post_id: (row, math.sqrt(sum(w * w for w in row.values())))
+            for post_id, row in rows.items()
+        }
+
+
+def similarities(weights, vectors):
+    """Косинусная близость постов vectors ко всем постам с общими словами.
+
+    Возвращает {id поста: {id соседа: близость}} и id соседей, чьи
+    списки уже посчитаны.
+    """
+    terms = sorted(
+        {term_id for row, _ in vectors.values() for term_id in row})
+    columns = defaultdict(list)
+    done = set()
+    for block in blocks(terms, IN_BATCH):
+        for term_id, post_id, tf, df, norm, stale in (
+                RelatedPosting.objects.filter(term_id__in=block).values_list(
+                    'term_id', 'post_id', 'tf', 'term__df',
+                    'post__related__norm', 'post__related__stale')):
+            if norm:
+                columns[term_id].append(
+                    (post_id, weights.weight(tf, df) / norm))
+            if stale is False:
+                done.add(post_id)
+    scores = {}
+    for post_id, (row, norm) in vectors.items():
+        scores[post_id] = defaultdict(float)
+        for term_id, weight in row.items():
+            for other, other_weight in columns[term_id]:
+                if other != post_id:
+                    scores[post_id][other] += weight / norm * other_weight
+    return scores, done
+
+
+def store_norms(weights, post_ids):
+    """Записывает нормы векторов; новые посты получают строку-заготовку."""
+    norms = {post_id: 0 for post_id in post_ids}
+    norms.update(
+        (post_id, norm) for post_id, (_, norm) in
+        weights.vectors(post_ids).items())
+    existing = RelatedPosts.objects.filter(post_id__in=post_ids)
+    rows = []
+    for related in existing:
+        related.norm = norms.pop(related.pk)
+        rows.append(related)
+    RelatedPosts.objects.bulk_update(rows, ['norm'])
+    RelatedPosts.objects.bulk_create(
+        RelatedPosts(post_id=post_id, norm=norm, neighbours='[]', stale=True)
+        for post_id, norm in norms.items())
+
+
+def rebuild_related(top=None, block_size=None):
+    """Полный пересчёт словаря и соседей для всех постов."""
+    with transaction.atomic():
+        RelatedPosts.objects.all().delete()
+        RelatedPosting.objects.all().delete()
+        RelatedTerm.objects.update(df=0)
+    return update_related(top, block_size)
+
+
+def merge_neighbour(neighbours, post_id, score, top):
+    """Вставляет соседа в отсортированный список, если он проходит в топ."""
+    if any(pk == post_id for pk, _ in neighbours):
+        return False
+    if len(neighbours) >= top and score <= neighbours[-1][1]:
+        return False
+    neighbours.append([post_id, score])
+    neighbours.sort(key=lambda item: item[1], reverse=True)
+    del neighbours[top:]
+    return True
+
+
+def update_related(top=None, block_size=None):
+    """Досчитывает соседей новых и изменённых постов.
+
+    Слова этих постов записываются в словарь, затем пересчитываются их
+    нормы, и соседи считаются блоками по инвертированному индексу в БД:
+    остальные посты не перечитываются. Новые посты также попадают
+    в списки старых, если оказываются ближе их текущих соседей.
+    Возвращает число обработанных постов.
+    """
+    top = top or settings.RELATED_POSTS_COUNT
+    block_size = block_size or settings.RELATED_POSTS_BLOCK_SIZE
+    pending = list(
+        Post.objects.exclude(related__stale=False).order_by('id')
+        .values_list('id', flat=True))
+    for block in blocks(pending, block_size):
+        with transaction.atomic():
+            index_terms(block)
+    weights = Weights()
+    for block in blocks(pending, block_size):
+        with transaction.atomic():
+            store_norms(weights, block)
+    for block in blocks(pending, block_size):
+        vectors = weights.vectors(block)
+        scores, done = similarities(weights, vectors)
+        created = []
+        affected = defaultdict(list)
+        for post_id in block:
+            row_scores = scores.get(post_id, {})
+            best = heapq.nlargest(
+                top, row_scores.items(), key=lambda item: item[1])
+            created.append(RelatedPosts(
+                post_id=post_id,
+                norm=vectors.get(post_id, ({}, 0))[1],
+                neighbours=json.dumps([
+                    (other, round(score, 4)) for other, score in best]),
+            ))
+            for other in done.intersection(row_scores):
+                affected[other].append(
+                    (post_id, round(row_scores[other], 4)))
+        with transaction.atomic():
+            RelatedPosts.objects.filter(post_id__in=block).delete()
+            RelatedPosts.objects.bulk_create(created)
+            merge_affected(affected, top)
+    return len(pending)
+
+
+def merge_affected(affected, top):
+    """Добавляет новые посты в списки соседей уже посчитанных."""
+    changed = []
+    for related in RelatedPosts.objects.filter(pk__in=list(affected)):
+        neighbours = json.loads(related.neighbours)
+        updated = [
+            merge_neighbour(neighbours, post_id, score, top)
+            for post_id, score in affected[related.pk]
+        ]
+        if any(updated):
+            related.neighbours = json.dumps(neighbours)
+            changed.append(related)
+    RelatedPosts.objects.bulk_update(changed, ['neighbours'])
+
+
+def related_posts(post):
+    """Похожие посты: один запрос по первичному ключу и один in_bulk."""
+    neighbours = (
+        RelatedPosts.objects.filter(post_id=post.pk)
+        .values_list('neighbours', flat=True).first()
+    )
+    if not neighbours:
+        return []
+    ids = [post_id for post_id, _ in json.loads(neighbours)]
+    posts = Post.objects.in_bulk(ids)
+    return [posts[post_id] for post_id in ids if post_id in posts]
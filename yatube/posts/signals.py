@@ -0,0 +1,148 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from core.tags import invalidate
+
+from .cache_tags import FEED_TAG, author_tag, group_tag, post_tag
+from .graph import apply_change
+from .models import Comment, Follow, Group, Post, RelatedPosts, User
+from .related import forget_terms
+from .simhash import index_post
+from .timelines import add_post, forget_posts, remove_post
+
+# поля автора, которые видны на карточках постов
+CARD_USER_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(post_save, sender=Post)
+def update_simhash(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def mark_related_stale(sender, instance, created, raw=False, **kwargs):
+    """Соседи правленого поста пересчитаются при update_related."""
+    if not created and not raw:
+        RelatedPosts.objects.filter(post_id=instance.pk).update(stale=True)
+
+
+@receiver(pre_delete, sender=Post)
+def forget_related_terms(sender, instance, **kwargs):
+    forget_terms([instance.pk])
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, raw=False, **kwargs):
+    """Запоминает прежнюю группу, чтобы убрать пост из её ленты."""
+    instance._old_group_id = None
+    if instance.pk and not raw:
+        instance._old_group_id = Post.objects.filter(
+            pk=instance.pk).values_list('group_id', flat=True).first()
+
+
+def post_tags(post, *group_ids):
+    tags = [FEED_TAG, post_tag(post.pk), author_tag(post.author_id)]
+    tags.extend(group_tag(group_id) for group_id in group_ids
+                if group_id is not None)
+    return tags
+
+
+@receiver(post_save, sender=Post)
+def add_to_timelines(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old_group_id = getattr(instance, '_old_group_id', None)
+    add_post(instance, old_group_id)
+    invalidate(*post_tags(instance, old_group_id, instance.group_id))
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_timelines(sender, instance, **kwargs):
+    remove_post(instance)
+    invalidate(*post_tags(instance, instance.group_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate(post_tag(instance.post_id))
+
+
+@receiver(pre_save, sender=User)
+def remember_names(sender, instance, raw=False, update_fields=None,
+                   **kwargs):
+    """Запоминает прежние имена автора, которые видны на карточках."""
+    instance._old_names = None
+    if update_fields is not None and not set(update_fields) & set(
+            CARD_USER_FIELDS):
+        instance._old_names = card_names(instance)
+    elif instance.pk and not raw:
+        instance._old_names = User.objects.filter(
+            pk=instance.pk).values_list(*CARD_USER_FIELDS).first()
+
+
+def card_names(user):
+    return tuple(getattr(user, field) for field in CARD_USER_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def forget_author_posts(sender, instance, created, raw=False,
+                        update_fields=None, **kwargs):
+    # вход меняет только last_login, которого нет на страницах
+    if raw or created or (
+            update_fields and set(update_fields) == {'last_login'}):
+        return
+    invalidate(author_tag(instance.pk))
+    # кэш объектов постов хранит только имена автора: пароль, почта
+    # и права его не задевают
+    if getattr(instance, '_old_names', None) != card_names(instance):
+        forget_posts(instance.posts.all())
+
+
+@receiver(post_delete, sender=User)
+def invalidate_author(sender, instance, **kwargs):
+    invalidate(author_tag(instance.pk))
+
+
+@receiver(post_save, sender=Group)
+def forget_group_posts(sender, instance, **kwargs):
+    forget_posts(instance.posts.all())
+    invalidate(group_tag(instance.pk))
+
+
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    # посты теряют группу через SET NULL, минуя сигналы
+    invalidate(group_tag(instance.pk), FEED_TAG)
+
+
+@receiver(post_save, sender=Follow)
+def add_follow_edge(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(
+            apply_change, instance.user_id, instance.author_id, True))
+
+
+@receiver(post_delete, sender=Follow)
+def remove_follow_edge(sender, instance, **kwargs):
+    transaction.on_commit(partial(
+        apply_change, instance.user_id, instance.author_id, False))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_counts(sender, instance, raw=False, **kwargs):
+    """Счётчики подписчиков и подписок на страницах профилей.
+
+    Подключается после правки графа, чтобы сброс после коммита шёл
+    уже по новым счётчикам.
+    """
+    if not raw:
+        invalidate(author_tag(instance.author_id),
+                   author_tag(instance.user_id))
@@ -0,0 +1,157 @@
+import hashlib
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import SimHashBand
+from .related import tokenize
+
+BITS = 64
+BANDS = 4
+BAND_BITS = BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+
+def features(text):
+    """Слова и пары соседних слов текста с их частотами."""
+    tokens = tokenize(text)
+    return Counter(tokens + [
+        f'{first} {second}' for first, second in zip(tokens, tokens[1:])
+    ])
+
+
+def feature_hash(feature):
+    digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def simhash(text):
+    """64-битный SimHash текста (беззнаковый)."""
+    weights = [0] * BITS
+    for feature, weight in features(text).items():
+        value = feature_hash(feature)
+        for bit in range(BITS):
+            weights[bit] += weight if value >> bit & 1 else -weight
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def to_signed(value):
+    """BigIntegerField хранит знаковые 64-битные числа."""
+    return value - (1 << BITS) if value >= 1 << (BITS - 1) else value
+
+
+def to_unsigned(value):
+    return value % (1 << BITS)
+
+
+def distance(first, second):
+    return bin(to_unsigned(first) ^ to_unsigned(second)).count('1')
+
+
+def bands(value):
+    return [(band, value >> band * BAND_BITS & BAND_MASK)
+            for band in range(BANDS)]
+
+
+def band_rows(post_id, text):
+    """Полосы SimHash текста; у текста без слов («ок», эмодзи) их нет."""
+    if not features(text):
+        return []
+    value = simhash(text)
+    return [
+        SimHashBand(post_id=post_id, band=band, value=band_value,
+                    simhash=to_signed(value))
+        for band, band_value in bands(value)
+    ]
+
+
+def index_post(post):
+    """Пересчитывает полосы поста после создания или правки."""
+    SimHashBand.objects.filter(post_id=post.pk).delete()
+    SimHashBand.objects.bulk_create(band_rows(post.pk, post.text))
+
+
+def near_duplicates(text, exclude=None, since=None):
+    """id постов, чей SimHash отличается от текста не больше порога.
+
+    Выборка идёт по четырём точкам индекса (band, value), поэтому её
+    стоимость не зависит от общего числа постов. Короткие тексты без
+    слов не проверяются: у всех них один и тот же нулевой хэш.
+    """
+    if not features(text):
+        return set()
+    value = simhash(text)
+    lookup = Q()
+    for band, band_value in bands(value):
+        lookup |= Q(band=band, value=band_value)
+    candidates = SimHashBand.objects.filter(lookup)
+    if exclude is not None:
+        candidates = candidates.exclude(post_id=exclude)
+    if since is not None:
+        candidates = candidates.filter(post__created__gte=since)
+    return {
+        post_id for post_id, other in
+        candidates.values_list('post_id', 'simhash')
+        if distance(value, other) <= settings.SIMHASH_DISTANCE
+    }
+
+
+def shared_buckets(since):
+    """{(полоса, значение): {simhash: [id постов]}} для полос, общих
+    у нескольких постов не старше since.
+    """
+    recent = SimHashBand.objects.filter(post__created__gte=since)
+    buckets = defaultdict(lambda: defaultdict(list))
+    for band in range(BANDS):
+        shared = (
+            recent.filter(band=band).values('value')
+            .annotate(size=Count('id')).filter(size__gt=1).values('value')
+        )
+        rows = recent.filter(band=band, value__in=shared)
+        for band_value, post_id, value in rows.values_list(
+                'value', 'post_id', 'simhash'):
+            buckets[band, band_value][value].append(post_id)
+    return buckets
+
+
+def bucket_pairs(bucket):
+    """Пары постов одной полосы, которые надо объединить в группу."""
+    for ids in bucket.values():
+        for post_id in ids[1:]:
+            yield post_id, ids[0]
+    values = list(bucket)
+    for index, value in enumerate(values):
+        for other in values[index + 1:]:
+            if distance(value, other) <= settings.SIMHASH_DISTANCE:
+                yield bucket[value][0], bucket[other][0]
+
+
+def duplicate_clusters(limit=50, since=None):
+    """Группы постов-дубликатов, самые крупные первыми.
+
+    Смотрятся только посты за последние SIMHASH_CLUSTER_DAYS дней.
+    Посты с одинаковым хэшем объединяются сразу, попарно сравниваются
+    лишь разные хэши одной полосы.
+    """
+    if since is None:
+        since = timezone.now() - timedelta(
+            days=settings.SIMHASH_CLUSTER_DAYS)
+    parent = {}
+
+    def find(post_id):
+        while parent.setdefault(post_id, post_id) != post_id:
+            post_id = parent[post_id]
+        return post_id
+
+    for bucket in shared_buckets(since).values():
+        for post_id, other_id in bucket_pairs(bucket):
+            parent[find(post_id)] = find(other_id)
+    clusters = defaultdict(list)
+    for post_id in parent:
+        clusters[find(post_id)].append(post_id)
+    result = [sorted(ids) for ids in clusters.values() if len(ids) > 1]
+    result.sort(key=len, reverse=True)
+    return result[:limit]
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.handlers.wsgi import WSGIHandler
+from django.http import QueryDict
+from django.urls import reverse
+
+from yatube.settings import AMOUNT_POSTS_ON_PAGE
+from yatube.warmup import wsgi_request
+
+from .feeds import FEED_ORDER
+from .models import (ArchivedComment, ArchivedPost, Comment, Follow, Group,
+                     Post, RelatedPosts, User)
+
+MANIFEST = 'manifest.json'
+# картинки, миниатюры и статика, на которые ссылаются страницы
+ASSET_RE = re.compile(r'(?:src|href)="((?:{}|{})[^"?#]+)"'.format(
+    re.escape(settings.STATIC_URL), re.escape(settings.MEDIA_URL)))
+
+application = None
+
+
+def digest(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def page_file(path):
+    """Файл снимка для адреса: /group/x/?page=2 → group/x/page-2.html."""
+    parts = urlsplit(path)
+    page = QueryDict(parts.query).get('page', '1')
+    name = 'index.html' if page == '1' else f'page-{page}.html'
+    return os.path.join(parts.path.strip('/'), name)
+
+
+def paged(path, ids, header, cards):
+    """Адреса страниц ленты и отпечатки их содержимого."""
+    chunks = [ids[start:start + AMOUNT_POSTS_ON_PAGE]
+              for start in range(0, len(ids), AMOUNT_POSTS_ON_PAGE)] or [[]]
+    for number, chunk in enumerate(chunks, 1):
+        page_path = path if number == 1 else f'{path}?page={number}'
+        yield page_path, digest(header, number, len(ids),
+                                [cards[post_id] for post_id in chunk])
+
+
+def post_cards(users, groups):
+    """Отпечатки карточек и посты (id, автор, группа) в порядке лент."""
+    fields = ('id', 'created', 'text', 'image', 'author_id', 'group_id')
+    cards, hot, archived = {}, [], []
+    for model, ids in ((Post, hot), (ArchivedPost, archived)):
+        rows = model.objects.order_by(*FEED_ORDER).values_list(*fields)
+        for pk, created, text, image, author_id, group_id in rows.iterator():
+            cards[pk] = digest(pk, created, text, image, users[author_id],
+                               groups.get(group_id))
+            ids.append((pk, author_id, group_id))
+    return cards, hot, archived
+
+
+def post_comments(users):
+    comments = defaultdict(list)
+    for model in (Comment, ArchivedComment):
+        rows = model.objects.filter(active=True).order_by(
+            'post_id', 'created').values_list('post_id', 'text', 'author_id')
+        for post_id, text, author_id in rows.iterator():
+            comments[post_id].append((text, users[author_id][0]))
+    return comments
+
+
+def page_fingerprints():
+    """{адрес страницы: отпечаток} для всех публичных страниц.
+
+    Отпечаток складывается из того, что страница показывает: текстов,
+    картинок, авторов и групп постов, комментариев и счётчиков. Его
+    считают по нескольким проходам по таблицам, не рендеря страниц.
+    """
+    users = {
+        pk: (username, first_name, last_name)
+        for pk, username, first_name, last_name in User.objects.values_list(
+            'id', 'username', 'first_name', 'last_name').iterator()
+    }
+    groups = {
+        pk: (slug, title, description)
+        for pk, slug, title, description in Group.objects.values_list(
+            'id', 'slug', 'title', 'description').iterator()
+    }
+    cards, hot, archived = post_cards(users, groups)
+    comments = post_comments(users)
+    neighbours = dict(RelatedPosts.objects.values_list(
+        'post_id', 'neighbours').iterator())
+    followers = Counter(Follow.objects.values_list('author_id', flat=True))
+    following = Counter(Follow.objects.values_list('user_id', flat=True))
+
+    by_author, by_group = defaultdict(list), defaultdict(list)
+    for pk, author_id, group_id in hot:
+        by_author[author_id].append(pk)
+        if group_id is not None:
+            by_group[group_id].append(pk)
+    archived_by_author = defaultdict(list)
+    for pk, author_id, _ in archived:
+        archived_by_author[author_id].append(pk)
+
+    pages = dict(paged(reverse('posts:index'),
+                       [pk for pk, _, _ in hot], None, cards))
+    for group_id, group in groups.items():
+        pages.update(paged(
+            reverse('posts:group_posts', args=(group[0],)),
+            by_group[group_id], group, cards))
+    for author_id, user in users.items():
+        pages.update(paged(
+            reverse('posts:profile', args=(user[0],)),
+            by_author[author_id] + archived_by_author[author_id],
+            (user, followers[author_id], following[author_id]), cards))
+    for pk, author_id, _ in hot + archived:
+        related = [post_id for post_id, _ in json.loads(
+            neighbours.get(pk) or '[]') if post_id in cards]
+        pages[reverse('posts:post_detail', args=(pk,))] = digest(
+            cards[pk], comments[pk], [cards[post_id] for post_id in related],
+            len(by_author[author_id]))
+    return pages
+
+
+def write_atomic(path, data):
+    """Пишет файл целиком или не трогает прежний."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handle, temp = tempfile.mkstemp(dir=os.path.dirname(path),
+                                    prefix='.tmp-')
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            file.write(data)
+        os.chmod(temp, 0o644)
+        os.replace(temp, path)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+
+def init_worker():
+    """Приложение и соединение с БД у каждого процесса пула свои."""
+    global application
+    application = WSGIHandler()
+
+
+def export_page(output, path):
+    """Рендерит страницу в файл; код ответа и ссылки на файлы."""
+    if application is None:
+        init_worker()
+    status, body = wsgi_request(application, path)
+    if status != 200:
+        return path, status, []
+    write_atomic(os.path.join(output, page_file(path)), body)
+    return path, status, ASSET_RE.findall(body.decode())
+
+
+def asset_source(url):
+    if url.startswith(settings.MEDIA_URL):
+        path = os.path.join(settings.MEDIA_ROOT,
+                            url[len(settings.MEDIA_URL):])
+        return path if os.path.isfile(path) else None
+    relative = url[len(settings.STATIC_URL):]
+    if settings.STATIC_ROOT:
+        path = os.path.join(settings.STATIC_ROOT, relative)
+        if os.path.isfile(path):
+            return path
+    return finders.find(relative)
+
+
+def copy_asset(output, url):
+    """Копирует миниатюру или статику, если её копия устарела."""
+    if '..' in url.split('/'):
+        return False
+    source = asset_source(url)
+    if source is None:
+        return False
+    target = os.path.join(output, url.lstrip('/'))
+    if os.path.exists(target) and (
+            os.path.getsize(target) == os.path.getsize(source)
+            and os.path.getmtime(target) >= os.path.getmtime(source)):
+        return False
+    with open(source, 'rb') as file:
+        write_atomic(target, file.read())
+    return True
+
+
+def read_manifest(output):
+    try:
+        with open(os.path.join(output, MANIFEST), encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(output, pages):
+    write_atomic(os.path.join(output, MANIFEST),
+                 json.dumps(pages, sort_keys=True).encode())
+
+
+def remove_pages(output, paths):
+    for path in paths:
+        try:
+            os.remove(os.path.join(output, page_file(path)))
+        except FileNotFoundError:
+            pass
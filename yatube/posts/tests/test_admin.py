@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core.paginator import EstimatedCountPaginator, refresh_estimates
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@yatube.ru', password='admin')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        cache.clear()
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def add_rows(self, count):
+        for _ in range(count):
+            author = User.objects.create_user(
+                username=f'user{User.objects.count()}')
+            post = Post.objects.create(
+                text='Пост', author=author, group=self.group)
+            Comment.objects.create(post=post, author=author, text='Текст')
+            Follow.objects.create(user=author, author=self.admin)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.admin_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_queries_do_not_grow_with_rows(self):
+        """Авторы, группы и посты строк берутся одним запросом."""
+        urls = [reverse(f'admin:posts_{model}_changelist')
+                for model in ('post', 'comment', 'follow')]
+        self.add_rows(2)
+        before = [self.count_queries(url) for url in urls]
+        self.add_rows(5)
+        self.assertEqual([self.count_queries(url) for url in urls], before)
+
+    @override_settings(ADMIN_ACTION_BATCH_SIZE=2)
+    def test_moderation_actions_hide_and_approve(self):
+        self.add_rows(3)
+        post = Post.objects.first()
+        url = reverse('posts:post_detail', args=(post.pk,))
+        self.assertContains(self.admin_client.get(url), 'Текст')
+        self.admin_client.post(
+            reverse('admin:posts_comment_changelist'),
+            {'action': 'hide_comments',
+             '_selected_action': list(
+                 Comment.objects.values_list('pk', flat=True))})
+        self.assertFalse(Comment.objects.filter(active=True).exists())
+        self.assertNotContains(self.admin_client.get(url), 'Текст')
+        self.admin_client.post(
+            reverse('admin:posts_comment_changelist'),
+            {'action': 'approve_comments',
+             '_selected_action': [post.comments.get().pk]})
+        self.assertEqual(Comment.objects.filter(active=True).count(), 1)
+        self.assertContains(self.admin_client.get(url), 'Текст')
+
+    @override_settings(ADMIN_COUNT_LIMIT=2)
+    def test_estimated_count(self):
+        """Без фильтров — оценка по статистике, с фильтром — до предела."""
+        self.add_rows(4)
+        Post.objects.first().delete()
+        paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+        self.assertEqual(paginator.count, 2)
+        self.assertTrue(paginator.capped)
+        refresh_estimates(Post)
+        paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+        self.assertEqual(paginator.count, 3)
+        self.assertTrue(paginator.estimated)
+        paginator = EstimatedCountPaginator(
+            Post.objects.filter(group=self.group), 10)
+        self.assertEqual(paginator.count, 2)
+
+    @override_settings(ADMIN_COUNT_LIMIT=2)
+    def test_pages_past_limit(self):
+        """За пределом счёта страницы открываются, пока есть строки."""
+        self.add_rows(5)
+        paginator = EstimatedCountPaginator(
+            Post.objects.filter(group=self.group).order_by('pk'), 1)
+        self.assertEqual(paginator.num_pages, 2)
+        self.assertEqual(len(paginator.page(4)), 1)
+        self.assertEqual(paginator.num_pages, 5)
+        self.assertTrue(paginator.page(4).has_next())
+        self.assertFalse(paginator.page(5).has_next())
+        with self.assertRaises(EmptyPage):
+            paginator.page(6)
+        response = self.admin_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'Пост'})
+        self.assertContains(response, '2+ ')
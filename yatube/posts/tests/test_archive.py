@@ -0,0 +1,57 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from posts.models import ArchivedComment, ArchivedPost, Comment, Post
+
+User = get_user_model()
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.old_post = Post.objects.create(text='old_text', author=cls.user)
+        cls.new_post = Post.objects.create(text='new_text', author=cls.user)
+        Comment.objects.create(
+            post=cls.old_post, author=cls.user, text='old_comment')
+        Post.objects.filter(pk=cls.old_post.pk).update(
+            created=timezone.now() - timedelta(days=400))
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        call_command('archive_posts', days=365, stdout=StringIO())
+
+    def test_old_posts_moved_with_comments(self):
+        """Старый пост и его комментарии переезжают в архив."""
+        self.assertFalse(Post.objects.filter(pk=self.old_post.pk).exists())
+        self.assertTrue(Post.objects.filter(pk=self.new_post.pk).exists())
+        archived = ArchivedPost.objects.get(pk=self.old_post.pk)
+        self.assertEqual(archived.text, 'old_text')
+        self.assertLess(
+            archived.created, timezone.now() - timedelta(days=365))
+        self.assertEqual(
+            ArchivedComment.objects.get().post_id, self.old_post.pk)
+
+    def test_post_detail_falls_through_to_archive(self):
+        """Архивный пост по-прежнему открывается по своему адресу."""
+        response = self.guest_client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.old_post.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'old_text')
+        self.assertContains(response, 'old_comment')
+
+    def test_profile_lists_archived_posts_last(self):
+        """Профиль показывает архивные посты после свежих."""
+        response = self.guest_client.get(reverse(
+            'posts:profile', kwargs={'username': self.user.username}))
+        texts = [post.text for post in response.context['page_obj']]
+        self.assertEqual(texts, ['new_text', 'old_text'])
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
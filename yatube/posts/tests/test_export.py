@@ -0,0 +1,86 @@
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Follow, Post
+
+small_gif = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B')
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.post = Post.objects.create(
+            text='текст для выгрузки',
+            author=cls.user,
+            image=SimpleUploadedFile('export.gif', small_gif, 'image/gif'),
+        )
+        Comment.objects.create(post=cls.post, author=cls.user, text='мой')
+        Follow.objects.create(user=cls.user, author=cls.other)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.url = reverse(
+            'posts:profile_export', kwargs={'username': self.user.username})
+
+    def test_export_streams_zip(self):
+        """Выгрузка отдаётся потоком и содержит данные и картинки."""
+        response = self.authorized_client.get(self.url)
+        self.assertTrue(response.streaming)
+        archive = zipfile.ZipFile(
+            io.BytesIO(b''.join(response.streaming_content)))
+        posts = json.loads(archive.read('posts.json'))
+        self.assertEqual(posts[0]['text'], 'текст для выгрузки')
+        comments = json.loads(archive.read('comments.json'))
+        self.assertEqual(comments[0]['text'], 'мой')
+        follows = json.loads(archive.read('follows.json'))
+        self.assertEqual(follows[0]['author__username'], 'other')
+        self.assertEqual(archive.read(self.post.image.name), small_gif)
+
+    def test_export_forbidden_for_others(self):
+        """Чужие данные выгрузить нельзя."""
+        other_client = Client()
+        other_client.force_login(self.other)
+        response = other_client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_export_filename_for_unicode_username(self):
+        """Имя файла с кириллицей отдаётся в filename* и ASCII-заменой."""
+        user = User.objects.create_user(username='автор')
+        client = Client()
+        client.force_login(user)
+        response = client.get(reverse(
+            'posts:profile_export', kwargs={'username': user.username}))
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="_____.zip"; '
+            "filename*=UTF-8''%D0%B0%D0%B2%D1%82%D0%BE%D1%80.zip")
@@ -0,0 +1,87 @@
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from posts.feeds import encode_cursor
+from posts.models import ArchivedPost, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedFragmentTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {index}', author=cls.user, group=cls.group)
+            for index in range(settings.AMOUNT_POSTS_ON_PAGE + 3)
+        )
+        # одинаковое время: порядок держится на id
+        Post.objects.update(created=timezone.now())
+        ArchivedPost.objects.create(
+            id=10_000, text='Архивный пост', author=cls.user,
+            created=timezone.now())
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def collect(self, client, url):
+        """Тексты всех постов ленты, пройденной по курсорам."""
+        texts, cursor, pages = [], None, 0
+        while True:
+            data = client.get(
+                url, {'cursor': cursor} if cursor else {}).json()
+            texts += re.findall(r'<p>(.*?)</p>', data['html'])
+            pages += 1
+            cursor = data['next']
+            if cursor is None:
+                return texts, pages
+
+    def test_fragments_walk_whole_feed(self):
+        """Курсоры проходят ленту без пропусков и повторов."""
+        expected = [post.text for post in Post.objects.order_by('-id')]
+        for url in (reverse('posts:index_fragment'),
+                    reverse('posts:group_fragment', args=('group',))):
+            with self.subTest(url=url):
+                texts, pages = self.collect(self.guest_client, url)
+                self.assertEqual(texts, expected)
+                self.assertEqual(pages, 2)
+        texts, _ = self.collect(self.reader_client,
+                                reverse('posts:follow_fragment'))
+        self.assertEqual(texts, expected)
+
+    def test_profile_fragment_continues_into_archive(self):
+        texts, _ = self.collect(
+            self.guest_client, reverse('posts:profile_fragment',
+                                       args=('auth',)))
+        self.assertEqual(texts[-1], 'Архивный пост')
+        self.assertEqual(len(texts), Post.objects.count() + 1)
+
+    def test_fragment_is_smaller_than_page(self):
+        page = self.guest_client.get(reverse('posts:index'))
+        fragment = self.guest_client.get(reverse('posts:index_fragment'))
+        self.assertLess(len(fragment.content), len(page.content))
+        self.assertNotIn('<nav', fragment.json()['html'])
+
+    def test_bad_cursor(self):
+        post = Post.objects.first()
+        for cursor in ('broken', encode_cursor(-1, post),
+                       encode_cursor(2, post)):
+            with self.subTest(cursor=cursor):
+                response = self.guest_client.get(
+                    reverse('posts:profile_fragment', args=('auth',)),
+                    {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+
+    def test_follow_fragment_requires_login(self):
+        response = self.guest_client.get(reverse('posts:follow_fragment'))
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from posts.graph import CHANGE_KEY, VERSION_KEY, follow_graph
+from posts.models import Follow
+
+User = get_user_model()
+
+
+class FollowGraphTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.first = User.objects.create_user(username='first')
+        self.second = User.objects.create_user(username='second')
+        self.third = User.objects.create_user(username='third')
+        Follow.objects.create(user=self.first, author=self.second)
+        Follow.objects.create(user=self.second, author=self.first)
+        Follow.objects.create(user=self.third, author=self.first)
+        self.client = Client()
+        self.client.force_login(self.first)
+
+    def test_graph_queries(self):
+        """Проверка подписки, счётчики и взаимные подписки."""
+        graph = follow_graph()
+        self.assertTrue(graph.follows(self.first.pk, self.second.pk))
+        self.assertFalse(graph.follows(self.first.pk, self.third.pk))
+        self.assertEqual(graph.followers_count(self.first.pk), 2)
+        self.assertEqual(graph.following_count(self.first.pk), 1)
+        self.assertEqual(list(graph.mutuals(self.first.pk)),
+                         [self.second.pk])
+
+    def test_follow_views_update_graph_in_place(self):
+        """Подписка и отписка меняют граф без перестроения."""
+        graph = follow_graph()
+        version = graph.version
+        self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'third'}))
+        self.assertEqual(graph.version, version + 1)
+        self.assertTrue(graph.follows(self.first.pk, self.third.pk))
+        self.client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'second'}))
+        self.assertFalse(graph.follows(self.first.pk, self.second.pk))
+        self.assertEqual(graph.mutuals(self.first.pk).tolist(),
+                         [self.third.pk])
+
+    def test_profile_uses_graph(self):
+        """Профиль не обращается к таблице подписок."""
+        follow_graph()
+        url = reverse('posts:profile', kwargs={'username': 'second'})
+        response = self.client.get(url)
+        self.assertTrue(response.context['following'])
+        self.assertEqual(response.context['followers_count'], 1)
+
+    def test_foreign_change_triggers_rebuild(self):
+        """Сдвиг метки другим воркером приводит к перестроению."""
+        graph = follow_graph()
+        Follow.objects.bulk_create(
+            [Follow(user=self.third, author=self.second)])
+        cache.incr(VERSION_KEY)
+        self.assertTrue(follow_graph().follows(
+            self.third.pk, self.second.pk))
+        self.assertIs(follow_graph(), graph)
+
+    def test_foreign_change_applied_from_log(self):
+        """Подписка из другого воркера догоняется по журналу без БД."""
+        graph = follow_graph()
+        version = cache.incr(VERSION_KEY)
+        cache.set(CHANGE_KEY.format(version),
+                  (self.third.pk, self.second.pk, True))
+        with self.assertNumQueries(0):
+            self.assertTrue(follow_graph().follows(
+                self.third.pk, self.second.pk))
+        self.assertEqual(graph.version, version)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_database_used_without_shared_cache(self):
+        """Без общего кэша подписки берутся из таблицы."""
+        Follow.objects.bulk_create(
+            [Follow(user=self.first, author=self.third)])
+        url = reverse('posts:profile', kwargs={'username': 'third'})
+        response = self.client.get(url)
+        self.assertTrue(response.context['following'])
+        self.assertContains(response, 'Отписаться')
+        self.assertEqual(response.context['following_count'], 1)
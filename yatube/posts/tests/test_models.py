@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
 from posts.models import Group, Post
 
 User = get_user_model()
@@ -39,6 +40,17 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(field, expected_value)
 
+    def test_post_links(self):
+        """Ссылки поста совпадают с reverse()."""
+        group = Group.objects.create(title='Группа', slug='links')
+        self.assertEqual(self.post.absolute_url,
+                         reverse('posts:post_detail', args=(self.post.pk,)))
+        self.assertEqual(self.post.get_absolute_url(), self.post.absolute_url)
+        self.assertEqual(self.post.author_url,
+                         reverse('posts:profile', args=('auth',)))
+        self.assertEqual(group.get_absolute_url(),
+                         reverse('posts:group_posts', args=('links',)))
+
 
 class GroupModelTest(TestCase):
     @classmethod
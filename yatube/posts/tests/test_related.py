@@ -0,0 +1,87 @@
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Post, RelatedPosts, RelatedTerm
+from posts.related import rebuild_related, update_related
+
+User = get_user_model()
+
+
+class RelatedPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        texts = [
+            'рецепт борща со свёклой и капустой',
+            'борщ без свёклы: рецепт с капустой',
+            'обзор нового смартфона и его камеры',
+            'камера смартфона против зеркальной камеры',
+            'погода на выходные в горах',
+        ]
+        cls.posts = [
+            Post.objects.create(text=text, author=cls.user) for text in texts
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def neighbours(self, post):
+        related = RelatedPosts.objects.get(post=post)
+        return [post_id for post_id, _ in json.loads(related.neighbours)]
+
+    def test_rebuild_finds_similar_texts(self):
+        """Ближайший сосед поста про борщ — другой пост про борщ."""
+        self.assertEqual(rebuild_related(top=2, block_size=2), 5)
+        self.assertEqual(self.neighbours(self.posts[0])[0], self.posts[1].pk)
+        self.assertEqual(self.neighbours(self.posts[2])[0], self.posts[3].pk)
+
+    def test_incremental_update(self):
+        """Новый пост обрабатывается без полного пересчёта и попадает
+        в списки старых постов.
+        """
+        rebuild_related(top=2)
+        new_post = Post.objects.create(
+            text='ещё один рецепт борща с капустой', author=self.user)
+        self.assertEqual(update_related(top=2), 1)
+        self.assertIn(self.posts[0].pk, self.neighbours(new_post))
+        self.assertIn(new_post.pk, self.neighbours(self.posts[0]))
+        self.assertEqual(update_related(top=2), 0)
+
+    def test_edited_post_reindexed(self):
+        """Правленый пост пересчитывается, словарь следует за текстами."""
+        rebuild_related(top=2)
+        weather = Post.objects.get(pk=self.posts[4].pk)
+        weather.text = 'рецепт борща с капустой'
+        weather.save()
+        self.assertEqual(update_related(top=2), 1)
+        self.assertEqual(RelatedTerm.objects.get(text='погода').df, 0)
+        self.assertEqual(RelatedTerm.objects.get(text='борща').df, 2)
+        self.assertIn(self.posts[0].pk, self.neighbours(weather))
+        Post.objects.filter(pk=self.posts[0].pk).delete()
+        self.assertEqual(RelatedTerm.objects.get(text='борща').df, 1)
+
+    def test_large_vocabulary(self):
+        """Словарь больше лимита параметров SQLite читается частями."""
+        words = ' '.join(f'слово{number}' for number in range(1200))
+        big = Post.objects.create(text=words, author=self.user)
+        with mock.patch('posts.related.IN_BATCH', 7):
+            self.assertEqual(rebuild_related(top=2), 6)
+        self.assertEqual(RelatedTerm.objects.get(text='слово1199').df, 1)
+        self.assertEqual(self.neighbours(self.posts[0])[0], self.posts[1].pk)
+        self.assertEqual(RelatedPosts.objects.get(post=big).stale, False)
+
+    def test_post_detail_shows_related(self):
+        """Страница поста показывает похожие записи."""
+        rebuild_related(top=2)
+        url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.posts[0].pk})
+        response = self.guest_client.get(url)
+        self.assertEqual(
+            response.context['related_posts'][0], self.posts[1])
+        self.assertContains(response, 'Похожие записи')
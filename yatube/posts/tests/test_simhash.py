@@ -0,0 +1,88 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from posts.forms import PostForm
+from posts.models import Post, SimHashBand
+from posts.simhash import (distance, duplicate_clusters, near_duplicates,
+                           simhash)
+
+User = get_user_model()
+
+SPAM = 'Купите лучшие часы со скидкой прямо сейчас на нашем сайте'
+
+
+class SimHashTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@yatube.ru', password='admin')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_similar_texts_have_close_hashes(self):
+        """Тексты с мелкими правками близки, разные тексты далеки."""
+        self.assertLessEqual(
+            distance(simhash(SPAM), simhash(SPAM + '!')), 3)
+        self.assertGreater(distance(
+            simhash(SPAM), simhash('Отчёт о походе по Алтаю в июле')), 3)
+
+    def test_bands_written_on_save(self):
+        """При сохранении поста записываются четыре полосы."""
+        post = Post.objects.create(text=SPAM, author=self.user)
+        self.assertEqual(post.simhash_bands.count(), 4)
+        self.assertEqual(near_duplicates(SPAM), {post.pk})
+        self.assertEqual(near_duplicates(SPAM, exclude=post.pk), set())
+
+    def test_post_create_rejects_flood(self):
+        """Волна одинаковых постов останавливается формой."""
+        for _ in range(3):
+            Post.objects.create(text=SPAM, author=self.user)
+        response = self.authorized_client.post(
+            reverse('posts:post_create'), {'text': SPAM})
+        self.assertFormError(
+            response, 'form', 'text',
+            'Почти такой же текст недавно публиковался несколько раз')
+        self.assertEqual(Post.objects.count(), 3)
+
+    def test_backfill_and_admin_clusters(self):
+        """Бэкфилл заполняет индекс, админка показывает группы."""
+        for _ in range(2):
+            Post.objects.create(text=SPAM, author=self.user)
+        SimHashBand.objects.all().delete()
+        call_command('backfill_simhash', stdout=StringIO())
+        self.assertEqual(SimHashBand.objects.count(), 8)
+        admin_client = Client()
+        admin_client.force_login(self.admin)
+        response = admin_client.get(reverse('admin:posts_post_duplicates'))
+        self.assertEqual(len(response.context['clusters']), 1)
+        self.assertEqual(len(response.context['clusters'][0]), 2)
+
+    def test_texts_without_words_not_checked(self):
+        """Короткие тексты без слов не индексируются и не считаются спамом."""
+        for _ in range(3):
+            Post.objects.create(text='😀', author=self.user)
+        self.assertFalse(SimHashBand.objects.exists())
+        self.assertTrue(PostForm({'text': 'no'}, user=self.user).is_valid())
+
+    def test_clusters_limited_to_recent_posts(self):
+        """Старые дубликаты не попадают в группы."""
+        old, new = (
+            Post.objects.create(text=SPAM, author=self.user)
+            for _ in range(2))
+        Post.objects.filter(pk=old.pk).update(
+            created=timezone.now() - timedelta(days=30))
+        self.assertEqual(duplicate_clusters(), [])
+        self.assertEqual(
+            duplicate_clusters(since=timezone.now() - timedelta(days=31)),
+            [[old.pk, new.pk]])
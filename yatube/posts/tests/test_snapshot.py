@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Group, Post
+from posts.snapshot import page_file
+
+small_gif = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B')
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ExportStaticTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.output = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.user = User.objects.create_user(username='author')
+        self.group = Group.objects.create(title='Группа', slug='static')
+        self.other = Group.objects.create(title='Другая', slug='other')
+        self.post = Post.objects.create(
+            text='Пост с картинкой', author=self.user, group=self.group,
+            image=SimpleUploadedFile('small.gif', small_gif, 'image/gif'))
+        self.other_post = Post.objects.create(
+            text='Другой пост', author=self.user, group=self.other)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий')
+
+    def tearDown(self):
+        shutil.rmtree(self.output, ignore_errors=True)
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def export(self, **options):
+        out = StringIO()
+        call_command('export_static', self.output, processes=1, stdout=out,
+                     **options)
+        return out.getvalue()
+
+    def read(self, path):
+        with open(os.path.join(self.output, page_file(path)),
+                  encoding='utf-8') as file:
+            return file.read()
+
+    def test_pages_and_thumbnails_exported(self):
+        self.assertIn('отрендерено: 6', self.export())
+        detail = self.read(reverse('posts:post_detail', args=(self.post.pk,)))
+        self.assertIn('Комментарий', detail)
+        self.assertIn('Войти', detail)
+        self.assertIn('Другой пост', self.read(reverse('posts:index')))
+        self.assertIn('Пост с картинкой', self.read(
+            reverse('posts:group_posts', args=(self.group.slug,))))
+        thumbnails = [
+            name for _, _, files in os.walk(
+                os.path.join(self.output, 'media')) for name in files]
+        self.assertEqual(len(thumbnails), 1)
+        self.assertTrue(os.path.isfile(os.path.join(
+            self.output, 'static', 'css', 'bootstrap.min.css')))
+        self.assertEqual(page_file('/group/static/?page=2'),
+                         os.path.join('group', 'static', 'page-2.html'))
+
+    def test_only_changed_pages_rendered(self):
+        self.export()
+        self.assertIn('отрендерено: 0', self.export())
+        self.other_post.text = 'Новый текст'
+        self.other_post.save()
+        # главная, группа, профиль и сам пост
+        self.assertIn('отрендерено: 4', self.export())
+        self.assertIn('Новый текст', self.read(reverse('posts:index')))
+        path = reverse('posts:post_detail', args=(self.other_post.pk,))
+        self.other_post.delete()
+        self.assertIn('удалено: 1', self.export())
+        self.assertFalse(os.path.exists(
+            os.path.join(self.output, page_file(path))))
+        self.assertIn('отрендерено: 5', self.export(full=True))
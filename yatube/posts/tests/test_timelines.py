@@ -0,0 +1,139 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.feeds import card_queryset
+from posts.models import Group, Post
+from posts.timelines import (POST_KEY, author_timeline, global_timeline,
+                             group_timeline, timeline_key)
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.first = Group.objects.create(title='Первая', slug='first')
+        cls.second = Group.objects.create(title='Вторая', slug='second')
+
+    def setUp(self):
+        cache.clear()
+
+    def ids(self, timeline):
+        return [post.pk for post in timeline[:len(timeline)]]
+
+    def group_timeline(self, group):
+        return group_timeline(group, card_queryset(group.posts.all()))
+
+    def test_cold_rebuild_is_one_query(self):
+        """Холодный список собирается одним запросом, объекты — вторым."""
+        posts = [Post.objects.create(text=f'Пост {index}', author=self.user)
+                 for index in range(3)]
+        cache.clear()
+        timeline = author_timeline(
+            self.user, card_queryset(self.user.posts.all()))
+        with self.assertNumQueries(2):
+            self.assertEqual(self.ids(timeline),
+                             [post.pk for post in reversed(posts)])
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.ids(timeline)), 3)
+
+    def test_save_and_delete_update_lists_in_place(self):
+        old = Post.objects.create(text='Старый', author=self.user)
+        timeline = global_timeline(card_queryset(Post.objects.all()))
+        self.assertEqual(self.ids(timeline), [old.pk])
+        new = Post.objects.create(text='Новый', author=self.user)
+        self.assertEqual(cache.get(timeline_key('global'))['entries'][0][1],
+                         new.pk)
+        old.delete()
+        self.assertEqual(
+            [pk for _, pk in cache.get(timeline_key('global'))['entries']],
+            [new.pk])
+
+    def test_author_rename_forgets_cached_posts(self):
+        """Кэш постов сбрасывается при смене имени автора, но не пароля."""
+        author = User.objects.create_user(username='writer')
+        post = Post.objects.create(text='Пост', author=author)
+        key = POST_KEY.format(post.pk)
+        cache.set(key, post)
+        author.set_password('new_password_123')
+        author.save()
+        self.assertIsNotNone(cache.get(key))
+        author.first_name = 'Лев'
+        author.save()
+        self.assertIsNone(cache.get(key))
+
+    def test_group_change_moves_post(self):
+        post = Post.objects.create(
+            text='Пост', author=self.user, group=self.first)
+        self.assertEqual(self.ids(self.group_timeline(self.first)), [post.pk])
+        self.assertEqual(self.ids(self.group_timeline(self.second)), [])
+        post.group = self.second
+        post.save()
+        self.assertEqual(self.ids(self.group_timeline(self.first)), [])
+        self.assertEqual(self.ids(self.group_timeline(self.second)),
+                         [post.pk])
+
+    def test_stale_ids_are_dropped(self):
+        """Пост, перенесённый в обход сигналов, исчезает из списка."""
+        posts = [Post.objects.create(
+            text=f'Пост {index}', author=self.user, group=self.first)
+            for index in range(2)]
+        self.ids(self.group_timeline(self.first))
+        Post.objects.filter(pk=posts[1].pk).update(group=None)
+        cache.delete(f'post:{posts[1].pk}')
+        self.assertEqual(self.ids(self.group_timeline(self.first)),
+                         [posts[0].pk])
+        key = timeline_key('group', self.first.pk)
+        self.assertEqual(len(cache.get(key)['entries']), 1)
+
+    @override_settings(TIMELINE_SIZE=2)
+    def test_capped_list_falls_back_to_queryset(self):
+        posts = [Post.objects.create(text=f'Пост {index}', author=self.user)
+                 for index in range(4)]
+        cache.clear()
+        timeline = global_timeline(card_queryset(Post.objects.all()))
+        self.assertEqual(len(timeline), 4)
+        self.assertEqual(self.ids(timeline),
+                         [post.pk for post in reversed(posts)])
+        self.assertEqual(len(cache.get(timeline_key('global'))['entries']),
+                         2)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_database_used_without_shared_cache(self):
+        """Пост, добавленный другим воркером, виден сразу."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        Post.objects.bulk_create([Post(text='Из другого воркера',
+                                       author=self.user)])
+        self.assertContains(self.client.get(url), 'Из другого воркера')
+        self.assertIsNone(cache.get(timeline_key('global')))
+
+    @override_settings(PAGE_CACHE=False)
+    def test_pages_served_from_timeline(self):
+        """Повторная страница группы не сортирует посты в базе."""
+        Post.objects.create(text='Пост', author=self.user, group=self.first)
+        url = reverse('posts:group_posts', args=(self.first.slug,))
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['page_obj']), 1)
+
+    @override_settings(TIMELINE_SIZE=2)
+    def test_count_cached_until_post_added(self):
+        """Число постов неполной ленты считается один раз до новой записи."""
+        for index in range(3):
+            Post.objects.create(text=f'Пост {index}', author=self.user)
+        url = reverse('posts:index')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse(any('COUNT' in query['sql']
+                             for query in queries.captured_queries))
+        Post.objects.create(text='Новый', author=self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 4)
@@ -0,0 +1,156 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.forms import PostForm
+from posts.models import ChunkedUpload, Post
+from posts.uploads import OffsetMismatch, expire_uploads, write_chunk
+
+small_gif = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B')
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_UPLOAD_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT,
+                   CHUNKED_UPLOAD_DIR=TEMP_UPLOAD_DIR,
+                   CHUNKED_UPLOAD_CHUNK_SIZE=16)
+class ChunkedUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(TEMP_UPLOAD_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def start(self, size=len(small_gif)):
+        response = self.authorized_client.post(
+            reverse('posts:upload_start'),
+            {'filename': 'small.gif', 'size': size})
+        self.assertEqual(response.status_code, 201)
+        return reverse('posts:upload_chunk', args=(response.json()['token'],))
+
+    def put(self, url, offset, data, checksum=None):
+        return self.authorized_client.put(
+            url, data, content_type='application/octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset),
+            HTTP_X_CHUNK_SHA256=checksum or hashlib.sha256(data).hexdigest())
+
+    def upload(self):
+        url = self.start()
+        for offset in range(0, len(small_gif), 16):
+            response = self.put(url, offset, small_gif[offset:offset + 16])
+        self.assertTrue(response.json()['complete'])
+        return response.json()['token']
+
+    def test_resume_after_broken_chunk(self):
+        """Повреждённая часть отклоняется, загрузка продолжается с offset."""
+        url = self.start()
+        self.put(url, 0, small_gif[:16])
+        response = self.put(url, 16, small_gif[16:32], checksum='0' * 64)
+        self.assertEqual(response.status_code, 400)
+        response = self.put(url, 32, small_gif[32:])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 16)
+        self.assertEqual(self.authorized_client.get(url).json()['offset'], 16)
+        self.put(url, 16, small_gif[16:32])
+        response = self.put(url, 32, small_gif[32:])
+        self.assertTrue(response.json()['complete'])
+        upload = ChunkedUpload.objects.get()
+        with open(upload.path, 'rb') as file:
+            self.assertEqual(file.read(), small_gif)
+
+    def test_parallel_chunk_with_same_offset_rejected(self):
+        """Вторая часть с той же позиции не затирает уже записанную."""
+        url = self.start()
+        upload = ChunkedUpload.objects.get()
+        self.put(url, 0, small_gif[:16])
+        with self.assertRaises(OffsetMismatch):
+            write_chunk(upload, 0, io.BytesIO(b'x' * 16), 16)
+        self.assertEqual(upload.offset, 16)
+        with open(upload.path, 'rb') as file:
+            self.assertEqual(file.read(), small_gif[:16])
+
+    def test_chunk_size_and_extension_limits(self):
+        url = self.start(size=64)
+        self.assertEqual(self.put(url, 0, b'x' * 17).status_code, 413)
+        response = self.authorized_client.post(
+            reverse('posts:upload_start'),
+            {'filename': 'script.sh', 'size': 10})
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_created_with_upload_token(self):
+        """Готовая загрузка становится картинкой нового поста."""
+        token = self.upload()
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост с картинкой', 'upload_token': token})
+        self.assertRedirects(
+            response, reverse('posts:profile', args=('auth',)))
+        post = Post.objects.get()
+        self.assertEqual(post.image.name, 'posts/small.gif')
+        self.assertTrue(os.path.exists(post.image.path))
+        self.assertFalse(ChunkedUpload.objects.exists())
+
+    def test_upload_kept_until_post_saved(self):
+        """Загрузка удаляется только после сохранения поста."""
+        token = self.upload()
+        form = PostForm({'text': 'Пост', 'upload_token': token},
+                        user=self.user)
+        self.assertTrue(form.is_valid())
+        post = form.save(commit=False)
+        self.assertTrue(ChunkedUpload.objects.exists())
+        post.author = self.user
+        post.save()
+        form.save_m2m()
+        self.assertFalse(ChunkedUpload.objects.exists())
+        self.assertTrue(os.path.exists(post.image.path))
+
+    def test_rejected_form_closes_upload(self):
+        """Отклонённая форма закрывает файл и не трогает загрузку."""
+        token = self.upload()
+        form = PostForm({'text': '', 'upload_token': token}, user=self.user)
+        self.assertFalse(form.is_valid())
+        self.assertIsNone(form.upload_file)
+        self.assertTrue(ChunkedUpload.objects.exists())
+
+    def test_foreign_or_unfinished_token_rejected(self):
+        token = self.upload()
+        other_client = Client()
+        other_client.force_login(self.other)
+        response = other_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Чужая картинка', 'upload_token': token})
+        self.assertFormError(response, 'form', None,
+                             'Загрузка картинки не найдена или не завершена')
+        self.assertFalse(Post.objects.exists())
+
+    def test_expire_uploads(self):
+        self.start()
+        ChunkedUpload.objects.update(created='2000-01-01T00:00Z')
+        os.utime(ChunkedUpload.objects.get().path, (0, 0))
+        self.assertEqual(expire_uploads(), 1)
+        self.assertFalse(ChunkedUpload.objects.exists())
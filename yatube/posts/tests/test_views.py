@@ -1,11 +1,16 @@
 import time
+import warnings
 from string import ascii_letters
 
 from django import forms
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
 from django.test import Client, TestCase
 from django.urls import reverse
+from core.tags import tag_versions
+from posts.cache_tags import group_tag, page_tags
 from posts.models import Follow, Group, Post
 
 from yatube.settings import AMOUNT_POSTS_ON_PAGE, AMOUNT_POSTS_ON_SECOND_PAGE
@@ -155,7 +160,7 @@ class CacheTests(TestCase):
         self.authorized_client.force_login(self.user)
 
     def test_cache_after_delete_post(self):
-        """Проверка работы кеша и наличия удаленного поста в течении 20 сек."""
+        """Удаление поста сбрасывает закэшированные карточки главной."""
         post2 = Post.objects.create(
             text='cache_text',
             author=self.user,
@@ -163,9 +168,35 @@ class CacheTests(TestCase):
             id=81,
         )
         before = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(before, 'cache_text')
         post2.delete()
         after = self.authorized_client.get(reverse('posts:index'))
-        self.assertEqual(after.content, before.content)
+        self.assertNotContains(after, 'cache_text')
+
+    def test_cards_cached_until_tag_bumped(self):
+        """Карточки берутся из кэша, пока не изменились их теги."""
+        url = reverse('posts:group_posts', args=(self.group.slug,))
+        self.guest_client.get(url)
+        # правка в обход сигналов не видна, пока кэш не сброшен
+        Post.objects.filter(pk=self.post.pk).update(text='new_text')
+        self.assertNotContains(self.guest_client.get(url), 'new_text')
+        self.user.first_name = 'Имя'
+        self.user.save()
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'new_text')
+        self.assertContains(response, 'Имя')
+
+    def test_page_tags_without_select_related(self):
+        """Теги карточек не требуют загрузки групп постов."""
+        posts = list(Post.objects.in_bulk([self.post.pk]).values())
+        with self.assertNumQueries(0):
+            self.assertIn(group_tag(self.group.pk), page_tags(posts))
+
+    def test_group_tag_is_valid_cache_key(self):
+        """Тег группы годится в ключ кэша без предупреждений."""
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            tag_versions([group_tag(self.group.pk)])
 
     def test_cache_time(self):
         """Проверка работы кеша."""
@@ -182,6 +213,57 @@ class CacheTests(TestCase):
         self.assertGreater(first_req, second_req)
 
 
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='page_text', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_guest_page_served_without_queries(self):
+        url = reverse('posts:profile', args=(self.user.username,))
+        self.guest_client.get(url)
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url)
+        self.assertContains(response, 'page_text')
+        self.assertContains(response, 'Подписаться')
+        self.assertNotContains(response, '<!--hole:')
+
+    def test_users_share_page_with_own_fragments(self):
+        """Вошедшие получают общую страницу со своей шапкой и кнопками."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.assertNotContains(self.guest_client.get(url), 'csrfmiddleware')
+        # правка в обход сигналов показывает, что страница из кэша
+        Post.objects.filter(pk=self.post.pk).update(text='new_text')
+        response = self.reader_client.get(url)
+        self.assertContains(response, 'page_text')
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+        self.assertNotContains(response, 'active" ')
+        response = self.author_client.get(reverse(
+            'posts:profile', args=(self.user.username,)))
+        self.assertContains(response, 'Скачать мои данные')
+        self.assertContains(response, 'Пользователь: auth')
+
+    def test_page_invalidated_by_tags(self):
+        url = reverse('posts:profile', args=(self.reader.username,))
+        self.guest_client.get(url)
+        Post.objects.create(text='fresh_text', author=self.reader)
+        self.assertContains(self.guest_client.get(url), 'fresh_text')
+        self.assertContains(self.author_client.get(url), 'Подписаться')
+        self.assertContains(self.reader_client.get(url), 'Скачать мои данные')
+
+
 class PaginatorViewsTest(TestCase):
     @classmethod
     def setUpClass(cls):
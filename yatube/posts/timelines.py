@@ -0,0 +1,195 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Post
+
+POST_KEY = 'post:{}'
+
+
+def timeline_key(kind, owner_id=None):
+    return f'timeline:{kind}' if owner_id is None else (
+        f'timeline:{kind}:{owner_id}')
+
+
+def post_timelines(author_id, group_id):
+    """Ключи лент, в которые входит пост с такими автором и группой."""
+    keys = [timeline_key('global'), timeline_key('author', author_id)]
+    if group_id is not None:
+        keys.append(timeline_key('group', group_id))
+    return keys
+
+
+def entry(post):
+    return [post.created.timestamp(), post.pk]
+
+
+def get_posts(ids):
+    """Посты по id через кэш объектов; промахи добираются одним in_bulk."""
+    keys = {post_id: POST_KEY.format(post_id) for post_id in ids}
+    cached = cache.get_many(keys.values())
+    posts = {post_id: cached[key] for post_id, key in keys.items()
+             if key in cached}
+    missing = [post_id for post_id in ids if post_id not in posts]
+    if missing:
+        loaded = Post.objects.select_related('author', 'group').in_bulk(
+            missing)
+        cache.set_many(
+            {keys[post_id]: post for post_id, post in loaded.items()},
+            settings.POST_CACHE_TIMEOUT)
+        posts.update(loaded)
+    return posts
+
+
+class Timeline:
+    """Список последних id постов ленты, хранимый в кэше.
+
+    В кэше лежат пары [время создания, id] в порядке ленты, не больше
+    TIMELINE_SIZE. Если постов больше, complete=False, и страницы за
+    пределами списка берутся из queryset. Сигналы правят списки на
+    месте; холодный список собирается одним запросом по индексу.
+    """
+
+    def __init__(self, key, queryset, matches=None):
+        self.key = key
+        self.queryset = queryset
+        # проверка, что пост из кэша всё ещё относится к этой ленте
+        self.matches = matches or (lambda post: True)
+        self.data = None
+
+    def load(self):
+        if self.data is None:
+            self.data = cache.get(self.key)
+        if self.data is None:
+            self.data = self.rebuild()
+        return self.data
+
+    def rebuild(self):
+        size = settings.TIMELINE_SIZE
+        rows = self.queryset.values_list('created', 'id')[:size]
+        data = {
+            'entries': [[created.timestamp(), pk] for created, pk in rows],
+        }
+        data['complete'] = len(data['entries']) < size
+        cache.set(self.key, data, settings.TIMELINE_TIMEOUT)
+        return data
+
+    def count(self):
+        data = self.load()
+        if data['complete']:
+            return len(data['entries'])
+        return self.queryset.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        entries = self.load()['entries']
+        start, stop = index.start or 0, index.stop
+        ids = [pk for _, pk in entries[start:stop]]
+        posts = get_posts(ids)
+        result = [posts[pk] for pk in ids
+                  if pk in posts and self.matches(posts[pk])]
+        if len(result) < len(ids):
+            # список пережил изменения базы в обход сигналов
+            found = {post.pk for post in result}
+            update_timeline(self.key, lambda entries: [
+                item for item in entries
+                if item[1] not in ids or item[1] in found])
+        if not self.data['complete'] and (
+                stop is None or stop > len(entries)):
+            result += list(self.queryset[max(start, len(entries)):stop])
+        return result
+
+
+def timeline(key, queryset, matches=None):
+    """Лента из кэша; без SHARED_CACHE — сам queryset.
+
+    Списки в кэше процесса не узнают о постах из других воркеров,
+    поэтому без общего кэша страницы читаются из базы.
+    """
+    if not settings.SHARED_CACHE:
+        return queryset
+    return Timeline(key, queryset, matches)
+
+
+def global_timeline(queryset):
+    return timeline(timeline_key('global'), queryset)
+
+
+def author_timeline(author, queryset):
+    return timeline(timeline_key('author', author.pk), queryset,
+                    lambda post: post.author_id == author.pk)
+
+
+def group_timeline(group, queryset):
+    return timeline(timeline_key('group', group.pk), queryset,
+                    lambda post: post.group_id == group.pk)
+
+
+def update_timeline(key, change):
+    """Правит список в кэше; холодный список не трогается.
+
+    Чтение и запись не атомарны: гонка двух воркеров может потерять
+    правку, поэтому у списков ограничен срок жизни.
+    """
+    data = cache.get(key)
+    if data is None:
+        return
+    data['entries'] = change(data['entries'])
+    cache.set(key, data, settings.TIMELINE_TIMEOUT)
+
+
+def insert_entry(entries, item):
+    """Вставляет пару [время, id] с сохранением порядка ленты.
+
+    Возвращает новый список и признак того, что хвост был обрезан.
+    """
+    entries = [old for old in entries if old[1] != item[1]]
+    position = 0
+    while position < len(entries) and entries[position] > item:
+        position += 1
+    entries.insert(position, item)
+    return (entries[:settings.TIMELINE_SIZE],
+            len(entries) > settings.TIMELINE_SIZE)
+
+
+def add_post(post, old_group_id=None):
+    """Вставляет пост в ленты после сохранения."""
+    cache.delete(POST_KEY.format(post.pk))
+    if old_group_id not in (None, post.group_id):
+        remove_entry(timeline_key('group', old_group_id), post.pk)
+    item = entry(post)
+    for key in post_timelines(post.author_id, post.group_id):
+        data = cache.get(key)
+        if data is None:
+            continue
+        entries = data['entries']
+        if not data['complete'] and entries and item < entries[-1]:
+            # пост старше хвоста неполного списка: его отдаст queryset
+            continue
+        data['entries'], truncated = insert_entry(entries, item)
+        if truncated:
+            data['complete'] = False
+        cache.set(key, data, settings.TIMELINE_TIMEOUT)
+
+
+def remove_entry(key, post_id):
+    update_timeline(key, lambda entries: [
+        item for item in entries if item[1] != post_id])
+
+
+def remove_post(post):
+    cache.delete(POST_KEY.format(post.pk))
+    for key in post_timelines(post.author_id, post.group_id):
+        remove_entry(key, post.pk)
+
+
+def forget_posts(queryset):
+    """Сбрасывает кэш объектов постов.
+
+    Нужно после смены имени автора или названия группы.
+    """
+    cache.delete_many([POST_KEY.format(pk)
+                       for pk in queryset.values_list('id', flat=True)])
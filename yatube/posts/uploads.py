@@ -0,0 +1,137 @@
+import hashlib
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.validators import validate_image_file_extension
+from django.utils import timezone
+
+from core.sqlite import WriteLock
+
+from .models import ChunkedUpload
+
+# сколько байт читать из запроса за раз
+READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """Часть файла не принята; status — код ответа клиенту."""
+    status = 400
+
+
+class OffsetMismatch(UploadError):
+    status = 409
+
+
+class ChunkTooLarge(UploadError):
+    status = 413
+
+
+class UploadedPart(File):
+    """Собранный файл загрузки.
+
+    temporary_file_path позволяет хранилищу перенести файл в MEDIA_ROOT
+    без копирования, а ImageField — проверить его без чтения в память.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def start_upload(user, filename, size):
+    filename = os.path.basename(filename)
+    if not filename or size <= 0:
+        raise UploadError('Нужны имя файла и его размер')
+    if size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+        raise ChunkTooLarge('Файл слишком большой')
+    try:
+        validate_image_file_extension(File(None, name=filename))
+    except ValidationError as error:
+        raise UploadError(error.messages[0])
+    upload = ChunkedUpload.objects.create(
+        user=user, filename=filename, size=size)
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    open(upload.path, 'wb').close()
+    return upload
+
+
+def write_chunk(upload, offset, stream, length, checksum=None):
+    """Дописывает часть с позиции offset и возвращает новую позицию.
+
+    Позиция должна совпадать с уже полученным объёмом: после обрыва
+    клиент узнаёт её запросом GET и продолжает с неё. Если контрольная
+    сумма не сошлась, файл обрезается обратно. Части одной загрузки
+    пишутся под блокировкой её файла, позиция сверяется с базой уже под
+    ней: из двух параллельных частей с одной позиции пишется одна.
+    """
+    if length > settings.CHUNKED_UPLOAD_CHUNK_SIZE:
+        raise ChunkTooLarge('Часть слишком большая')
+    with WriteLock(upload.path):
+        upload.refresh_from_db(fields=['offset'])
+        if offset != upload.offset:
+            raise OffsetMismatch('Неверная позиция части')
+        if offset + length > upload.size:
+            raise UploadError('Часть выходит за размер файла')
+        append_part(upload.path, offset, stream, length, checksum)
+        ChunkedUpload.objects.filter(pk=upload.pk).update(
+            offset=offset + length)
+    upload.offset = offset + length
+    return upload.offset
+
+
+def append_part(path, offset, stream, length, checksum):
+    digest = hashlib.sha256()
+    received = 0
+    with open(path, 'r+b') as file:
+        file.seek(offset)
+        file.truncate()
+        while received < length:
+            data = stream.read(min(READ_SIZE, length - received))
+            if not data:
+                break
+            digest.update(data)
+            file.write(data)
+            received += len(data)
+        if received != length or (
+                checksum and checksum.lower() != digest.hexdigest()):
+            file.truncate(offset)
+            raise UploadError('Часть получена не полностью или повреждена')
+
+
+def finished_upload(token, user):
+    """Завершённая загрузка пользователя или None."""
+    upload = ChunkedUpload.objects.filter(token=token, user=user).first()
+    if upload is None or not upload.is_complete:
+        return None
+    return upload
+
+
+def open_upload(upload):
+    return UploadedPart(open(upload.path, 'rb'), name=upload.filename)
+
+
+def expire_uploads(hours=None):
+    """Удаляет брошенные загрузки и файлы без записи в базе.
+
+    Возвращает число удалённых файлов.
+    """
+    hours = hours or settings.CHUNKED_UPLOAD_EXPIRE_HOURS
+    ChunkedUpload.objects.filter(
+        created__lt=timezone.now() - timedelta(hours=hours)).delete()
+    if not os.path.isdir(settings.CHUNKED_UPLOAD_DIR):
+        return 0
+    alive = {
+        f'{token}.part'
+        for token in ChunkedUpload.objects.values_list('token', flat=True)
+    }
+    deadline = time.time() - hours * 3600
+    removed = 0
+    for entry in os.scandir(settings.CHUNKED_UPLOAD_DIR):
+        if entry.name in alive or entry.stat().st_mtime > deadline:
+            continue
+        os.remove(entry.path)
+        removed += 1
+    return removed
@@ -10,6 +10,8 @@ urlpatterns = [
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
+    path('uploads/', views.upload_start, name='upload_start'),
+    path('uploads/<uuid:token>/', views.upload_chunk, name='upload_chunk'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/', views.add_comment,
          name='add_comment'),
@@ -18,4 +20,12 @@ urlpatterns = [
          name='profile_follow'),
     path('profile/<str:username>/unfollow/', views.profile_unfollow,
          name='profile_unfollow'),
+    path('fragments/index/', views.index_fragment, name='index_fragment'),
+    path('fragments/group/<slug:slug>/', views.group_fragment,
+         name='group_fragment'),
+    path('fragments/profile/<str:username>/', views.profile_fragment,
+         name='profile_fragment'),
+    path('fragments/follow/', views.follow_fragment, name='follow_fragment'),
+    path('profile/<str:username>/export/', views.profile_export,
+         name='profile_export'),
 ]
@@ -1,8 +1,72 @@
+from django.conf import settings
 from django.core.paginator import Paginator
+from django.utils.functional import cached_property
 
+from core.caching import get_or_compute
 
-def easy_paginator(sequence, request, amount_posts=10):
-    paginator = Paginator(sequence, amount_posts)
+
+class CachedCountPaginator(Paginator):
+    """Пагинатор, который берёт число объектов из кэша.
+
+    Число сбрасывается при смене tags; пересчитывает его один запрос.
+    """
+
+    def __init__(self, object_list, per_page, count_key, tags=(),
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.tags = tags
+
+    @cached_property
+    def count(self):
+        return get_or_compute(
+            self.count_key, lambda: Paginator.count.func(self),
+            settings.COUNT_CACHE_TIMEOUT, self.tags)
+
+
+def easy_paginator(sequence, request, amount_posts=10, count_key=None,
+                   tags=()):
+    if count_key is None:
+        paginator = Paginator(sequence, amount_posts)
+    else:
+        paginator = CachedCountPaginator(
+            sequence, amount_posts, count_key, tags)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+class ChainedSequence:
+    """Несколько querysets подряд как одна последовательность.
+
+    Пагинатор запрашивает из каждого только попавший на страницу срез.
+    """
+
+    def __init__(self, *sequences):
+        self.sequences = sequences
+
+    @cached_property
+    def sizes(self):
+        return [len(seq) if isinstance(seq, list) else seq.count()
+                for seq in self.sequences]
+
+    def count(self):
+        return sum(self.sizes)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop, _ = index.indices(self.count())
+        result = []
+        offset = 0
+        for sequence, size in zip(self.sequences, self.sizes):
+            if stop <= offset:
+                break
+            low, high = max(start - offset, 0), min(stop - offset, size)
+            if low < high:
+                result.extend(sequence[low:high])
+            offset += size
+        return result
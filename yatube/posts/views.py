@@ -1,76 +1,113 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-# from django.views.decorators.cache import cache_page
+from django.template.loader import render_to_string
+from django.views.decorators.http import require_http_methods, require_POST
 
+from core.caching import add_tags, cache_tagged
+from core.sqlite import serialized_write
 from yatube.settings import AMOUNT_POSTS_ON_PAGE
 
+from .archive import get_post_or_archived
+from .cache_tags import (FEED_TAG, author_tag, group_tag, page_tags,
+                         post_tag)
+from .export import content_disposition, export_archive
+from .feeds import (feed_sequence, follow_feed, group_feed, index_feed,
+                    keyset_page, profile_feed)
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import easy_paginator
+from .graph import follow_graph
+from .models import ChunkedUpload, Follow, Group, Post, User
+from .related import related_posts
+from .timelines import author_timeline, global_timeline, group_timeline
+from .uploads import UploadError, start_upload, write_chunk
+from .utils import ChainedSequence, easy_paginator
 
 
-# @cache_page(60 * 0)
 def index(request):
-    post_list = Post.objects.all()
-    page_obj = easy_paginator(post_list, request, AMOUNT_POSTS_ON_PAGE)
+    post_list = global_timeline(*index_feed())
+    page_obj = easy_paginator(post_list, request, AMOUNT_POSTS_ON_PAGE,
+                              'count:index', [FEED_TAG])
     context = {
         'page_obj': page_obj,
+        'cache_tags': [FEED_TAG, *page_tags(page_obj)],
     }
+    add_tags(request, *context['cache_tags'])
     return render(request, 'posts/index.html', context)
 
 
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    group_post_list = Post.objects.filter(group=group)
-    page_obj = easy_paginator(group_post_list, request, AMOUNT_POSTS_ON_PAGE)
+    group_post_list = group_timeline(group, *group_feed(group))
+    page_obj = easy_paginator(
+        group_post_list, request, AMOUNT_POSTS_ON_PAGE,
+        f'count:group:{group.pk}', [group_tag(group.pk)])
 
     context = {
         'group': group,
         'page_obj': page_obj,
+        'cache_tags': [group_tag(group.pk), *page_tags(page_obj)],
     }
+    add_tags(request, *context['cache_tags'])
     return render(request, 'posts/group_list.html', context)
 
 
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    profile_post_list = author.posts.all()
+    hot, archived = profile_feed(author)
+    profile_post_list = ChainedSequence(
+        author_timeline(author, hot), archived)
     page_obj = easy_paginator(profile_post_list, request, AMOUNT_POSTS_ON_PAGE)
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(user=request.user,
-                                          author=author).exists()
-    else:
-        following = False
+    graph = follow_graph()
+    following = (request.user.is_authenticated
+                 and graph.follows(request.user.pk, author.pk))
     context = {
         'author': author,
+        'author_page': True,
         'page_obj': page_obj,
+        'cache_tags': [author_tag(author.pk), *page_tags(page_obj)],
         'following': following,
+        'followers_count': graph.followers_count(author.pk),
+        'following_count': graph.following_count(author.pk),
     }
+    add_tags(request, *context['cache_tags'])
     return render(request, 'posts/profile.html', context)
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_post_or_archived(post_id)
     form = CommentForm(request.POST or None)
+    comments = post.comments.filter(active=True).select_related('author')
     context = {
         'post': post,
         'form': form,
+        'comments': comments,
+        'related_posts': related_posts(post),
     }
+    add_tags(request, *page_tags([post]),
+             *{author_tag(comment.author_id) for comment in comments},
+             *(post_tag(related.pk) for related in context['related_posts']))
     return render(request, 'posts/post_detail.html', context)
 
 
 @login_required
+@serialized_write
 def post_create(request):
     form = PostForm(request.POST or None,
-                    files=request.FILES or None)
+                    files=request.FILES or None,
+                    user=request.user)
     if form.is_valid():
         new_post = form.save(commit=False)
         new_post.author = request.user
         new_post.save()
+        form.save_m2m()
         return redirect('posts:profile', request.user)
     return render(request, 'posts/post_create.html', {'form': form})
 
 
 @login_required
+@serialized_write
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     if not post_id and post.author != request.user:
@@ -78,7 +115,8 @@ def post_edit(request, post_id):
     if post.author == request.user:
         form = PostForm(request.POST or None,
                         files=request.FILES or None,
-                        instance=post)
+                        instance=post,
+                        user=request.user)
         if form.is_valid():
             form.save()
             return redirect('posts:post_detail', post_id)
@@ -89,6 +127,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@serialized_write
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -102,7 +141,7 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_foll_list = Post.objects.filter(author__following__user=request.user)
+    post_foll_list = feed_sequence(follow_feed(request.user))
     context = {
         'page_obj': easy_paginator(post_foll_list, request,),
     }
@@ -110,6 +149,7 @@ def follow_index(request):
 
 
 @login_required
+@serialized_write(methods=('GET', 'POST'))
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
@@ -121,7 +161,114 @@ def profile_follow(request, username):
 
 
 @login_required
+@serialized_write(methods=('GET', 'POST'))
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=author)
+
+
+@login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if request.user != author and not request.user.is_staff:
+        raise PermissionDenied
+    response = StreamingHttpResponse(
+        export_archive(author), content_type='application/zip')
+    response['Content-Disposition'] = content_disposition(
+        f'{author.username}.zip')
+    return response
+
+
+def upload_state(upload):
+    return {
+        'token': str(upload.token),
+        'offset': upload.offset,
+        'size': upload.size,
+        'complete': upload.is_complete,
+        'chunk_size': settings.CHUNKED_UPLOAD_CHUNK_SIZE,
+    }
+
+
+@login_required
+@require_POST
+def upload_start(request):
+    """Начинает загрузку картинки частями."""
+    try:
+        upload = start_upload(request.user, request.POST.get('filename', ''),
+                              int(request.POST.get('size', 0)))
+    except ValueError:
+        return JsonResponse({'error': 'Неверный размер'}, status=400)
+    except UploadError as error:
+        return JsonResponse({'error': str(error)}, status=error.status)
+    return JsonResponse(upload_state(upload), status=201)
+
+
+@login_required
+@require_http_methods(['GET', 'PUT', 'POST'])
+def upload_chunk(request, token):
+    """GET — сколько уже получено, PUT/POST — очередная часть.
+
+    Позиция части передаётся в заголовке Upload-Offset, SHA-256 части —
+    в X-Chunk-SHA256.
+    """
+    upload = get_object_or_404(ChunkedUpload, token=token, user=request.user)
+    if request.method == 'GET':
+        return JsonResponse(upload_state(upload))
+    try:
+        write_chunk(
+            upload,
+            int(request.META.get('HTTP_UPLOAD_OFFSET', -1)),
+            request,
+            int(request.META.get('CONTENT_LENGTH') or 0),
+            request.META.get('HTTP_X_CHUNK_SHA256'),
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Неверные заголовки'}, status=400)
+    except UploadError as error:
+        upload.refresh_from_db()
+        return JsonResponse({'error': str(error), **upload_state(upload)},
+                            status=error.status)
+    return JsonResponse(upload_state(upload))
+
+
+def feed_fragment(request, segments, author_page=False):
+    """Карточки очередной страницы ленты без обвязки base.html."""
+    try:
+        posts, next_cursor = keyset_page(
+            segments, request.GET.get('cursor'), AMOUNT_POSTS_ON_PAGE)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    add_tags(request, *page_tags(posts))
+    html = ''
+    if posts:
+        html = render_to_string('posts/includes/post_cycle.html', {
+            'page_obj': posts,
+            'author_page': author_page,
+        })
+    return JsonResponse({'html': html, 'next': next_cursor},
+                        json_dumps_params={'ensure_ascii': False})
+
+
+@cache_tagged(60 * 10, lambda request: [FEED_TAG])
+def index_fragment(request):
+    return feed_fragment(request, index_feed())
+
+
+@cache_tagged(60 * 10)
+def group_fragment(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    add_tags(request, group_tag(group.pk))
+    return feed_fragment(request, group_feed(group))
+
+
+@cache_tagged(60 * 10)
+def profile_fragment(request, username):
+    author = get_object_or_404(User, username=username)
+    add_tags(request, author_tag(author.pk))
+    return feed_fragment(request, profile_feed(author), author_page=True)
+
+
+@login_required
+def follow_fragment(request):
+    return feed_fragment(request, follow_feed(request.user))
@@ -0,0 +1,93 @@
+// Загрузка картинки поста частями с докачкой после обрыва связи.
+(function () {
+  var input = document.getElementById('id_image');
+  var tokenInput = document.getElementById('id_upload_token');
+  var status = document.getElementById('upload-status');
+  if (!input || !tokenInput || !window.fetch) {
+    return;
+  }
+  var form = input.form;
+  var startUrl = form.dataset.uploadUrl;
+  var csrf = form.querySelector('[name=csrfmiddlewaretoken]').value;
+  var retries = 5;
+
+  function sha256(buffer) {
+    if (!window.crypto || !window.crypto.subtle) {
+      return Promise.resolve(null);
+    }
+    return window.crypto.subtle.digest('SHA-256', buffer).then(function (hash) {
+      return Array.from(new Uint8Array(hash)).map(function (byte) {
+        return byte.toString(16).padStart(2, '0');
+      }).join('');
+    });
+  }
+
+  function request(url, options) {
+    options.headers = Object.assign({'X-CSRFToken': csrf}, options.headers);
+    options.credentials = 'same-origin';
+    return fetch(url, options).then(function (response) {
+      return response.json().then(function (data) {
+        data.ok = response.ok;
+        return data;
+      });
+    });
+  }
+
+  function send(file, url, state, attempt) {
+    if (state.complete) {
+      tokenInput.value = state.token;
+      input.value = '';
+      status.textContent = 'Картинка загружена';
+      return Promise.resolve();
+    }
+    status.textContent = 'Загружено ' +
+      Math.floor(state.offset * 100 / state.size) + '%';
+    var chunk = file.slice(state.offset, state.offset + state.chunk_size);
+    return chunk.arrayBuffer().then(function (buffer) {
+      return sha256(buffer).then(function (checksum) {
+        var headers = {'Upload-Offset': String(state.offset)};
+        if (checksum) {
+          headers['X-Chunk-SHA256'] = checksum;
+        }
+        return request(url, {method: 'PUT', headers: headers, body: buffer});
+      });
+    }).then(function (next) {
+      if (!next.ok && (next.offset === undefined || attempt >= retries)) {
+        throw new Error(next.error);
+      }
+      return send(file, url, next, next.ok ? 0 : attempt + 1);
+    }, function () {
+      if (attempt >= retries) {
+        throw new Error('Связь потеряна');
+      }
+      // после обрыва узнаём, сколько сервер успел получить
+      return new Promise(function (resolve) {
+        setTimeout(resolve, 1000 * (attempt + 1));
+      }).then(function () {
+        return request(url, {method: 'GET'});
+      }).then(function (current) {
+        return send(file, url, current, attempt + 1);
+      });
+    });
+  }
+
+  input.addEventListener('change', function () {
+    var file = input.files[0];
+    tokenInput.value = '';
+    if (!file) {
+      return;
+    }
+    var body = new FormData();
+    body.append('filename', file.name);
+    body.append('size', file.size);
+    request(startUrl, {method: 'POST', body: body}).then(function (state) {
+      if (!state.ok) {
+        throw new Error(state.error);
+      }
+      return send(file, startUrl + state.token + '/', state, 0);
+    }).catch(function (error) {
+      status.textContent = 'Не удалось загрузить: ' + error.message +
+        '. Картинка будет отправлена вместе с формой.';
+    });
+  });
+})();
@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model,
+    load_backend,
+)
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.crypto import constant_time_compare
+
+User = get_user_model()
+
+USER_CACHE_KEY = 'auth:user:v2:{}'
+# поля снимка: всё, что нужно для шапки. Хэша пароля среди них нет:
+# для проверки сессии в снимке лежит get_session_auth_hash()
+SNAPSHOT_FIELDS = (
+    'id', 'last_login', 'is_superuser', 'username', 'first_name',
+    'last_name', 'email', 'is_staff', 'is_active', 'date_joined',
+)
+
+
+def user_cache_key(user_id):
+    return USER_CACHE_KEY.format(user_id)
+
+
+def load_user(user_id):
+    """Пользователь и хэш его сессии из снимка в кэше или из БД.
+
+    Поле password у пользователя отложено и читается из БД, только если
+    к нему обратятся. Возвращает (None, None), если пользователя нет.
+    """
+    key = user_cache_key(user_id)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        user = User.objects.only(*SNAPSHOT_FIELDS, 'password').filter(
+            pk=user_id).first()
+        if user is None:
+            return None, None
+        snapshot = (
+            tuple(getattr(user, field) for field in SNAPSHOT_FIELDS),
+            user.get_session_auth_hash(),
+        )
+        cache.set(key, snapshot, settings.USER_CACHE_TIMEOUT)
+    values, session_hash = snapshot
+    return User.from_db(DEFAULT_DB_ALIAS, SNAPSHOT_FIELDS, values), (
+        session_hash)
+
+
+def invalidate_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def get_user(request):
+    """Аналог django.contrib.auth.get_user, читающий снимок из кэша."""
+    try:
+        user_id = User._meta.pk.to_python(request.session[SESSION_KEY])
+        backend_path = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+    backend = load_backend(backend_path)
+    user, user_hash = load_user(user_id)
+    can_authenticate = getattr(
+        backend, 'user_can_authenticate', lambda user: True)
+    if user is None or not can_authenticate(user):
+        return AnonymousUser()
+    session_hash = request.session.get(HASH_SESSION_KEY)
+    if not (session_hash and constant_time_compare(
+            session_hash, user_hash)):
+        request.session.flush()
+        return AnonymousUser()
+    return user
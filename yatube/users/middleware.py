@@ -0,0 +1,17 @@
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from .cache import get_user
+
+
+def get_cached_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = get_user(request)
+    return request._cached_user
+
+
+class CachedAuthenticationMiddleware(MiddlewareMixin):
+    """Замена AuthenticationMiddleware со снимком пользователя в кэше."""
+
+    def process_request(self, request):
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model, user_logged_out
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_user
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_user_snapshot(sender, instance, **kwargs):
+    """Смена пароля, вход и правка профиля сохраняют пользователя."""
+    invalidate_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def drop_user_snapshot_on_logout(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate_user(user.pk)
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from users.cache import user_cache_key
+
+User = get_user_model()
+
+MIDDLEWARE = [
+    'users.middleware.CachedAuthenticationMiddleware'
+    if name == 'django.contrib.auth.middleware.AuthenticationMiddleware'
+    else name
+    for name in settings.MIDDLEWARE
+]
+
+
+@override_settings(
+    MIDDLEWARE=MIDDLEWARE,
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class CachedAuthTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth', password='abc123abc')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_no_queries_on_warm_cache(self):
+        """Сессия и пользователь читаются из кэша без запросов к БД."""
+        url = reverse('about:author')
+        self.authorized_client.get(url)
+        with self.assertNumQueries(0):
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.context['user'].username, 'auth')
+
+    def test_password_hash_not_cached(self):
+        """В снимке нет хэша пароля, только производный хэш сессии."""
+        self.authorized_client.get(reverse('about:author'))
+        user = User.objects.get(pk=self.user.pk)
+        snapshot = cache.get(user_cache_key(user.pk))
+        self.assertNotIn(user.password, repr(snapshot))
+        self.assertEqual(snapshot[1], user.get_session_auth_hash())
+
+    def test_password_change_logs_out_other_sessions(self):
+        """Смена пароля сбрасывает снимок и старые сессии."""
+        url = reverse('about:author')
+        self.authorized_client.get(url)
+        self.user.set_password('new_password_123')
+        self.user.save()
+        response = self.authorized_client.get(url)
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_logout_drops_snapshot(self):
+        """После выхода пользователь становится анонимным."""
+        self.authorized_client.get(reverse('about:author'))
+        self.authorized_client.get(reverse('users:logout'))
+        response = self.authorized_client.get(reverse('about:author'))
+        self.assertFalse(response.context['user'].is_authenticated)
@@ -1,4 +1,6 @@
 import os
+import sys
+import tempfile
 
 from dotenv import load_dotenv
 
@@ -26,11 +28,34 @@ ALLOWED_HOSTS = [
     'testserver',
 ]
 
+# Файлы, которые проект создаёт во время работы: общий кэш, метрики,
+# блокировки. Каталог не хранится в git.
+VAR_DIR = os.getenv('VAR_DIR', default=os.path.join(BASE_DIR, 'var'))
+
+# manage.py test и pytest идут в одном процессе
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
+# Кэш, общий для всех воркеров: на нём держатся ленты, граф подписок,
+# версии тегов и кэш страниц. По умолчанию это файл SQLite. В тестах
+# хватает кэша процесса, а файл пережил бы прогон. SHARED_CACHE=0 даёт
+# каждому процессу свой кэш и отключает всё, что требует общей
+# инвалидации.
+SHARED_CACHE = os.getenv('SHARED_CACHE', default='1') == '1'
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.LocMemMetricsCache',
+        'OPTIONS': {'ALIAS': 'default'},
     }
 }
+if SHARED_CACHE and not TESTING:
+    CACHES['default'] = {
+        'BACKEND': 'core.cache.SQLiteMetricsCache',
+        'LOCATION': os.getenv(
+            'SHARED_CACHE_PATH',
+            default=os.path.join(VAR_DIR, 'cache.sqlite3')),
+        'TIMEOUT': 60 * 5,
+        'OPTIONS': {'ALIAS': 'default', 'MAX_ENTRIES': 100_000},
+    }
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -53,22 +78,41 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.slowlog.SlowQueryMiddleware',
+    'core.memory.MemoryTrackingMiddleware',
+    'core.hot.HotUrlMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # профиль снимается и с ответов из кэша страниц
+    'core.profiler.ProfilerMiddleware',
+    'core.pagecache.PageCacheMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Сессия и снимок пользователя берутся из кэша, а не из БД.
+# Нужен общий для всех воркеров кэш (SHARED_CACHE), иначе выход
+# из аккаунта будет виден только в одном процессе.
+CACHED_AUTH = os.getenv('CACHED_AUTH', default='0') == '1'
+if CACHED_AUTH:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    MIDDLEWARE[MIDDLEWARE.index(
+        'django.contrib.auth.middleware.AuthenticationMiddleware'
+    )] = 'users.middleware.CachedAuthenticationMiddleware'
+# время жизни снимка пользователя в кэше, сек
+USER_CACHE_TIMEOUT = 60 * 15
+
 ROOT_URLCONF = 'yatube.urls'
 
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.templates.MetricsDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -93,9 +137,30 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # соединение живёт между запросами, PRAGMA выполняются один раз
+        'CONN_MAX_AGE': 60 * 10,
     }
 }
 
+# PRAGMA для каждого нового соединения с SQLite: WAL не блокирует
+# читателей на время записи, busy_timeout — сколько ждать занятую базу, мс
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+# файл межпроцессной блокировки, через которую идут изменяющие запросы;
+# тесты берут его во временной директории, как и метрики
+SQLITE_WRITE_LOCK = os.getenv('SQLITE_WRITE_LOCK', default=(
+    os.path.join(tempfile.gettempdir(), 'yatube-test-write.lock') if TESTING
+    else os.path.join(VAR_DIR, 'locks', 'sqlite-write.lock')))
+# сколько раз повторять запрос при database is locked и первая пауза, сек
+SQLITE_WRITE_RETRIES = 3
+SQLITE_WRITE_RETRY_DELAY = 0.05
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -143,12 +208,155 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
-# Подключаем движок сохранения писем оффлайн
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма складываются в очередь и отправляются командой send_queued_mail
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+# Движок, через который воркер очереди доставляет письма
+QUEUED_EMAIL_DELIVERY_BACKEND = os.getenv(
+    'QUEUED_EMAIL_DELIVERY_BACKEND',
+    default='django.core.mail.backends.filebased.EmailBackend')
 # Директория где будут храниться письма
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+# кол-во писем, отправляемых за один проход воркера
+QUEUED_EMAIL_BATCH_SIZE = 50
+# после стольких неудачных попыток письмо помечается ошибочным
+QUEUED_EMAIL_MAX_ATTEMPTS = 5
+# задержка перед повтором (удваивается с каждой попыткой) и её предел, сек
+QUEUED_EMAIL_RETRY_DELAY = 60
+QUEUED_EMAIL_MAX_DELAY = 60 * 60
+# на сколько секунд воркер арендует письмо перед отправкой
+QUEUED_EMAIL_LEASE = 5 * 60
+
+# Очередь задач в БД, её разбирает команда run_workers
+TASK_WORKERS = 2
+# кол-во задач, которые воркер забирает за один проход
+TASK_BATCH_SIZE = 10
+TASK_MAX_ATTEMPTS = 5
+# задержка перед повтором (удваивается с каждой попыткой) и её предел, сек
+TASK_RETRY_DELAY = 30
+TASK_MAX_DELAY = 60 * 60
+# на сколько секунд воркер арендует задачу; упавшая задача вернётся
+# в очередь по истечении аренды
+TASK_LEASE = 5 * 60
+# пауза воркера при пустой очереди, сек
+TASK_POLL_INTERVAL = 1
+
+# Загрузка картинок частями: незавершённые файлы лежат вне MEDIA_ROOT
+CHUNKED_UPLOAD_DIR = os.getenv('CHUNKED_UPLOAD_DIR', default=(
+    os.path.join(tempfile.gettempdir(), 'yatube-test-uploads') if TESTING
+    else os.path.join(VAR_DIR, 'uploads')))
+# предельный размер одной части и всего файла, байт
+CHUNKED_UPLOAD_CHUNK_SIZE = 1024 * 1024
+CHUNKED_UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+# через сколько часов брошенная загрузка удаляется командой purge_uploads
+CHUNKED_UPLOAD_EXPIRE_HOURS = 24
+
+# Админка больших таблиц: до стольких строк число считается точно,
+# дальше без фильтров берётся оценка, с фильтрами — не больше этого
+ADMIN_COUNT_LIMIT = 10_000
+# сколько строк меняет одна транзакция массового действия
+ADMIN_ACTION_BATCH_SIZE = 1000
 
 # кол-во постов на странице пагинатора
 AMOUNT_POSTS_ON_PAGE = 10
 # кол-во постов на 2 странице пагинатора - для тестов
 AMOUNT_POSTS_ON_SECOND_PAGE = 3
+
+# Пересчёт закэшированных значений: блокировка одного пересчёта на ключ
+# и сколько секунд её ждать, если прежнего значения нет
+CACHE_LOCK_TIMEOUT = 30
+CACHE_LOCK_WAIT = 2
+CACHE_LOCK_POLL = 0.05
+# сколько секунд после срока значение ещё отдаётся, пока его пересчитывают
+CACHE_STALE_TIMEOUT = 60 * 5
+# коэффициент раннего вероятностного обновления (XFetch), 0 — отключить
+CACHE_EARLY_REFRESH_BETA = 1.0
+# время жизни закэшированного числа постов в ленте, сек
+COUNT_CACHE_TIMEOUT = 60 * 5
+
+# Страницы, которые считает HotUrlMiddleware и прогревает warm_cache
+WARM_CACHE_VIEWS = (
+    'posts:index',
+    'posts:group_posts',
+    'posts:profile',
+    'posts:post_detail',
+)
+# воркер складывает свой счётчик в общий кэш раз в столько запросов
+HOT_URLS_FLUSH_EVERY = 100
+# сколько самых посещаемых адресов хранить и сколько секунд
+HOT_URLS_KEEP = 500
+HOT_URLS_TIMEOUT = 60 * 60 * 24
+
+# Кэш целых страниц (PageCacheMiddleware): одна страница на адрес для
+# всех посетителей, шапка, кнопки и форма комментария подставляются
+# для каждого запроса из {% hole %}
+PAGE_CACHE = SHARED_CACHE and os.getenv('PAGE_CACHE', default='1') == '1'
+PAGE_CACHE_VIEWS = WARM_CACHE_VIEWS
+# куки, от которых зависит общая часть страницы
+PAGE_CACHE_VARY_COOKIES = ('django_language',)
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+# Граф подписок в памяти воркера догоняет чужие подписки по журналу
+# в кэше; при отставании больше чем на столько записей он перестраивается
+FOLLOW_GRAPH_LOG_SIZE = 1000
+# сколько секунд хранится запись журнала
+FOLLOW_GRAPH_LOG_TIMEOUT = 60 * 60
+
+# Ленты: в кэше хранятся id последних постов (глобально, по авторам и
+# группам), сигналы правят их на месте; сколько id держать в списке
+TIMELINE_SIZE = 1000
+# время жизни списка id и кэша объектов постов, сек
+TIMELINE_TIMEOUT = 60 * 60
+POST_CACHE_TIMEOUT = 60 * 10
+
+# посты старше стольких дней переносятся в архив командой archive_posts
+ARCHIVE_AFTER_DAYS = 365
+
+# сколько похожих постов показывать на странице поста
+RELATED_POSTS_COUNT = 5
+# сколько постов обрабатывается за один блок при расчёте похожих
+RELATED_POSTS_BLOCK_SIZE = 256
+# слова из большего числа постов не различают их и не используются
+RELATED_POSTING_LIMIT = 1000
+
+# посты, чьи SimHash отличаются не более чем в стольких битах, — дубликаты
+SIMHASH_DISTANCE = 3
+# со стольких дубликатов за последние часы новый пост считается спамом
+SIMHASH_MAX_DUPLICATES = 3
+SIMHASH_WINDOW_HOURS = 24
+# админка ищет группы дубликатов среди постов за столько последних дней
+SIMHASH_CLUSTER_DAYS = 7
+
+# Метрики: каждый воркер сбрасывает свои значения в файл в этой директории,
+# /metrics/ суммирует файлы всех воркеров. Тесты пишут во временную
+# директорию: последний сброс при выходе идёт уже после их очистки
+METRICS_DIR = os.getenv('METRICS_DIR', default=(
+    os.path.join(tempfile.gettempdir(), 'yatube-test-metrics') if TESTING
+    else os.path.join(VAR_DIR, 'metrics')))
+# как часто воркер сбрасывает метрики на диск, сек
+METRICS_FLUSH_INTERVAL = 5
+THUMBNAIL_BACKEND = 'core.thumbnails.MetricsThumbnailBackend'
+
+# Запросы дольше порога (мс) пишутся в лог вместе с EXPLAIN, None — выключено
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', default=(
+    os.path.join(tempfile.gettempdir(), 'yatube-test-slow-queries.log')
+    if TESTING else os.path.join(VAR_DIR, 'logs', 'slow_queries.log')))
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
+
+# Профили запросов (.prof и HTML-флеймграфы), снятые сотрудниками
+PROFILES_DIR = os.getenv('PROFILES_DIR', default=(
+    os.path.join(tempfile.gettempdir(), 'yatube-test-profiles') if TESTING
+    else os.path.join(VAR_DIR, 'profiles')))
+
+# Замеры памяти tracemalloc по URL, заметно замедляют воркер
+MEMORY_TRACKING = os.getenv('MEMORY_TRACKING', default='0') == '1'
+# глубина стека, сохраняемая для каждого выделения памяти
+MEMORY_TRACE_FRAMES = 1
+# раз в столько запросов снимок памяти сравнивается с первым
+MEMORY_SNAPSHOT_INTERVAL = 100
+
+# Прогрев воркера в yatube.wsgi: сколько первых страниц главной и сколько
+# самых больших групп отрендерить до приёма запросов
+WARMUP_FEED_PAGES = 3
+WARMUP_GROUPS = 5
@@ -0,0 +1,151 @@
+import logging
+import os
+import sys
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+from django.template import TemplateSyntaxError, engines
+from django.test import RequestFactory
+from django.urls import get_resolver, reverse
+from django.utils.functional import empty
+
+from core.hot import WARMUP_HEADER
+from posts.models import Group
+
+logger = logging.getLogger('yatube.warmup')
+
+
+def compile_templates():
+    """Загружает все шаблоны из DIRS, чтобы их разбор не ждал запроса."""
+    count = 0
+    for engine in engines.all():
+        for directory in engine.engine.dirs:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    if not name.endswith(('.html', '.txt')):
+                        continue
+                    path = os.path.relpath(os.path.join(root, name),
+                                           directory)
+                    try:
+                        engine.get_template(path)
+                    except TemplateSyntaxError as error:
+                        logger.warning('Шаблон %s не собран: %s', path, error)
+                        continue
+                    count += 1
+    return count
+
+
+def populate_resolver(resolver=None):
+    """Заполняет словари reverse() всех вложенных схем URL."""
+    resolver = resolver or get_resolver()
+    count = len(resolver.reverse_dict)
+    for _, nested in resolver.namespace_dict.values():
+        count += populate_resolver(nested)
+    return count
+
+
+def prepare_thumbnails():
+    """Импортирует бэкенд sorl и хранилище миниатюр."""
+    from sorl.thumbnail import default
+
+    lazy = (default.backend, default.kvstore, default.engine, default.storage)
+    for obj in lazy:
+        if obj._wrapped is empty:
+            obj._setup()
+    return len(lazy)
+
+
+def open_connection():
+    connection.ensure_connection()
+    return 1
+
+
+def feed_paths():
+    paths = [
+        f"{reverse('posts:index')}?page={page}"
+        for page in range(1, settings.WARMUP_FEED_PAGES + 1)
+    ]
+    groups = (
+        Group.objects.annotate(total=Count('posts')).order_by('-total')
+        .values_list('slug', flat=True)[:settings.WARMUP_GROUPS]
+    )
+    paths += [reverse('posts:group_posts', args=(slug,)) for slug in groups]
+    return paths
+
+
+def wsgi_request(application, path):
+    """GET-запрос через приложение целиком; код ответа и тело.
+
+    Запрос помечен заголовком прогрева и не попадает в счётчик
+    посещаемых страниц.
+    """
+    host = next(
+        (host for host in settings.ALLOWED_HOSTS if '*' not in host),
+        'localhost')
+    environ = RequestFactory(SERVER_NAME=host.lstrip('.')).get(
+        path, **{WARMUP_HEADER: '1'}).environ
+    statuses = []
+    response = application(
+        environ, lambda status, headers: statuses.append(status))
+    # ответ нужно дочитать и закрыть, чтобы отработал request_finished
+    body = b''.join(response)
+    response.close()
+    return int(statuses[0].split()[0]), body
+
+
+def wsgi_get(application, path):
+    """GET-запрос через приложение целиком; возвращает код ответа."""
+    return wsgi_request(application, path)[0]
+
+
+def render_feeds(application):
+    """Прогоняет первые страницы лент через приложение целиком.
+
+    Заодно заполняются кэши страниц, миниатюр и графа подписок.
+    """
+    count = 0
+    for path in feed_paths():
+        wsgi_get(application, path)
+        count += 1
+    return count
+
+
+def warm_up(application=None):
+    """Прогрев воркера перед приёмом запросов.
+
+    Возвращает список (шаг, число объектов, секунды) и пишет его в лог.
+    Ошибка одного шага не мешает остальным и запуску воркера.
+    """
+    steps = [
+        ('templates', compile_templates),
+        ('urls', populate_resolver),
+        ('thumbnails', prepare_thumbnails),
+    ]
+    if application is not None:
+        steps.append(('feeds', lambda: render_feeds(application)))
+    # после лент: request_finished закрывает соединение с БД
+    steps.append(('database', open_connection))
+    report = []
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            count = step()
+        except Exception:
+            logger.exception('Прогрев: шаг %s не выполнен', name)
+            count = None
+        duration = time.perf_counter() - start
+        report.append((name, count, duration))
+        logger.info('Прогрев: %s — %s за %.3f с', name, count, duration)
+    return report
+
+
+def configure_logging():
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter(
+            f'[%(asctime)s] [{os.getpid()}] %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
@@ -5,3 +5,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# WSGI_WARMUP=0 отключает прогрев, например для отладки запуска
+if os.getenv('WSGI_WARMUP', default='1') == '1':
+    from .warmup import configure_logging, warm_up
+
+    configure_logging()
+    warm_up(application)